@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Concurrency benchmark for the async verification endpoints.
+
+Simulates a slow SMTP server (SMTP_DELAY seconds per send) and compares:
+  * the WSGI path - one sync worker serves requests one at a time
+  * the ASGI path - one event loop serves CONCURRENCY requests at once
+
+Usage: python benchmarks/bench_async_views.py [requests] [smtp_delay_seconds]
+"""
+
+import asyncio
+import json
+import sys
+import time
+
+from common import Timer, print_header, setup_django
+
+from django.core.mail.backends.base import BaseEmailBackend
+
+
+class SlowSMTPBackend(BaseEmailBackend):
+    """Email backend that sleeps like a slow SMTP round-trip"""
+    delay = 0.2
+
+    def send_messages(self, email_messages):
+        time.sleep(self.delay)
+        return len(email_messages)
+
+
+def _payload(i, prefix):
+    return json.dumps({
+        'email': f'{prefix}{i}@bench.example.com',
+        'user_type': 'borrower',
+        'user_data': {'firstName': 'Bench', 'lastName': 'User'},
+    })
+
+
+def run_wsgi(count):
+    from django.test import Client
+    client = Client()
+    with Timer() as t:
+        for i in range(count):
+            response = client.post('/api/auth/send-verification-email', _payload(i, 'wsgi'),
+                                   content_type='application/json')
+            assert response.status_code == 200, response.content
+    return t.elapsed
+
+
+def run_asgi(count):
+    from django.test import AsyncClient
+    client = AsyncClient()
+
+    async def one(i):
+        response = await client.post('/api/auth/send-verification-email', _payload(i, 'asgi'),
+                                     content_type='application/json')
+        assert response.status_code == 200, response.content
+
+    async def all_requests():
+        await asyncio.gather(*(one(i) for i in range(count)))
+
+    with Timer() as t:
+        asyncio.run(all_requests())
+    return t.elapsed
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    SlowSMTPBackend.delay = float(sys.argv[2]) if len(sys.argv) > 2 else 0.2
+
+    setup_django()
+    from django.conf import settings
+    settings.EMAIL_BACKEND = '__main__.SlowSMTPBackend'
+    # Every request comes from one client IP; measure the views, not the throttle
+    settings.RATELIMIT_ENABLED = False
+
+    print_header(f"SEND VERIFICATION EMAIL: {count} requests, SMTP delay {SlowSMTPBackend.delay:.3f}s")
+    wsgi_elapsed = run_wsgi(count)
+    asgi_elapsed = run_asgi(count)
+
+    for label, elapsed in (('WSGI (1 sync worker)', wsgi_elapsed), ('ASGI (1 event loop)', asgi_elapsed)):
+        print(f"{label:<22} {elapsed:7.2f}s  {count / elapsed:8.1f} req/s")
+    print(f"Speedup: {wsgi_elapsed / asgi_elapsed:.1f}x")
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Location queries: latency of server.geo's radius and bounding-box searches
+over a large book of pools.
+
+Seeds pools at generated points - clustered around a few dozen metro
+centres across the continental US, as real listings are - with their
+geohashes, then times nearby() for growing radii around one centre and
+in_box() for a city- and a state-sized map viewport, reporting median and
+p95 and how many pools each returns.
+
+Usage: python benchmarks/bench_geo.py [pools] [runs]
+       (defaults 200000 and 20; set DATABASE_URL to run against Postgres)
+"""
+
+import statistics
+import sys
+
+from common import Timer, print_header, setup_django
+
+AUSTIN = (30.27, -97.74)
+
+QUERIES = [
+    ('radius 5 km', 'nearby', {'lat': AUSTIN[0], 'lon': AUSTIN[1], 'radiusKm': 5}),
+    ('radius 25 km', 'nearby', {'lat': AUSTIN[0], 'lon': AUSTIN[1], 'radiusKm': 25}),
+    ('radius 100 km', 'nearby', {'lat': AUSTIN[0], 'lon': AUSTIN[1], 'radiusKm': 100}),
+    ('radius 500 km', 'nearby', {'lat': AUSTIN[0], 'lon': AUSTIN[1], 'radiusKm': 500}),
+    ('city viewport', 'in_box', {'south': 30.1, 'west': -97.95, 'north': 30.45, 'east': -97.55}),
+    ('state viewport', 'in_box', {'south': 26.0, 'west': -106.5, 'north': 36.5, 'east': -93.5}),
+]
+
+
+def seed(count):
+    import numpy as np
+    from server.geo import geohashes
+    from server.models import Borrower, Pool
+
+    gen = np.random.default_rng(0)
+    centres = np.column_stack([gen.uniform(26, 48, 40), gen.uniform(-122, -72, 40)])
+    centres[0] = AUSTIN
+    borrower = Borrower.objects.create(first_name='Bench', last_name='Mark', email='bench@example.com',
+                                       phone='5555555555', date_of_birth='1990-01-01', password_hash='x')
+    for start in range(0, count, 5000):
+        n = min(5000, count - start)
+        points = centres[gen.integers(0, len(centres), n)] + gen.normal(0, 0.4, (n, 2))
+        hashes = geohashes(points[:, 0], points[:, 1]).tolist()
+        Pool.objects.bulk_create([
+            Pool(borrower=borrower, pool_type='equity', status='active', first_name='B', last_name='M',
+                 email='bench@example.com', phone='1', date_of_birth='1990-01-01', ssn='1', address_line_1='1',
+                 mailing_city='c', mailing_state='s', mailing_zip_code='1', address_line='1', city='c', state='s',
+                 zip_code='1', percent_owned=100, amount=100_000, roi_rate=8,
+                 latitude=lat, longitude=lon, geohash=code)
+            for (lat, lon), code in zip(points.tolist(), hashes)
+        ])
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    setup_django()
+    from django.db import connection
+    from server import geo
+
+    print_header(f"LOCATION QUERIES: {count:,} pools ({connection.vendor})")
+    with Timer() as timer:
+        seed(count)
+    print(f"  seeded in {timer.elapsed:.1f} s")
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    for label, name, params in QUERIES:
+        query = getattr(geo, name)
+        params = {key: str(value) for key, value in params.items()}
+        query(params)  # warm up
+        times = []
+        for _ in range(runs):
+            with Timer() as timer:
+                matches = query(params)
+            times.append(timer.elapsed * 1000)
+        times.sort()
+        print(f"  {label:<15} median {statistics.median(times):8.2f} ms   "
+              f"p95 {times[int(len(times) * 0.95) - 1]:8.2f} ms   ({len(matches):,} pools)")
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Thumbnail throughput: photos/second rendered by server.images at different
+process-pool sizes, on a generated corpus of camera-sized JPEGs.
+
+Each photo becomes 3 sizes x 2 formats (see images.SIZES and FORMATS),
+exactly as photos.py does after an upload; storage and the database are
+left out so the number is the CPU-bound part that the pool parallelizes.
+
+Usage: python benchmarks/bench_images.py [photos] [workers,workers,...]
+"""
+
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from common import SERVER_DIR, Timer, print_header
+
+sys.path.insert(0, SERVER_DIR)
+from server import images  # noqa: E402  (Django-free, no setup needed)
+
+
+def make_corpus(directory, count, size=(4032, 3024)):
+    """Noisy gradients with some shapes: JPEGs that compress like photos, not like flat colour"""
+    from PIL import Image, ImageDraw, ImageFilter
+    rng = random.Random(0)
+    paths = []
+    for n in range(count):
+        base = Image.linear_gradient('L').resize(size).convert('RGB')
+        noise = Image.effect_noise(size, 40).convert('RGB')
+        photo = Image.blend(base, noise, 0.35)
+        draw = ImageDraw.Draw(photo)
+        for _ in range(30):
+            x, y = rng.randrange(size[0]), rng.randrange(size[1])
+            draw.rectangle((x, y, x + rng.randrange(200, 900), y + rng.randrange(200, 900)),
+                           fill=tuple(rng.randrange(256) for _ in range(3)))
+        photo = photo.filter(ImageFilter.GaussianBlur(1))
+        path = os.path.join(directory, f'photo{n}.jpg')
+        photo.save(path, 'JPEG', quality=90)
+        paths.append(path)
+    return paths
+
+
+def run(paths, workers):
+    executor = ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'),
+                                   initializer=images.init_worker)
+    with executor:
+        # Start every worker before timing; the pool otherwise spawns them on demand
+        list(executor.map(time.sleep, [0.5] * workers))
+        with Timer() as timer:
+            outputs = list(executor.map(images.render, paths))
+    return timer.elapsed, outputs
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+    cpus = os.cpu_count() or 1
+    if len(sys.argv) > 2:
+        worker_counts = [int(w) for w in sys.argv[2].split(',')]
+    else:
+        worker_counts = sorted({1, cpus} | {2 ** i for i in range(1, 8) if 2 ** i < cpus})
+
+    corpus = tempfile.mkdtemp(prefix='bench-images-')
+    try:
+        paths = make_corpus(corpus, count)
+        source_mb = sum(os.path.getsize(p) for p in paths) / 2 ** 20
+        print_header(f"THUMBNAILS: {count} photos 4032x3024 ({source_mb:.0f} MB), {cpus} CPUs")
+        print(f"  {'workers':>7} {'photos/s':>9} {'speedup':>8} {'ms/photo':>9}")
+        baseline = None
+        for workers in worker_counts:
+            elapsed, outputs = run(paths, workers)
+            rate = count / elapsed
+            baseline = baseline or rate
+            print(f"  {workers:>7} {rate:9.1f} {rate / baseline:7.2f}x {1000 * elapsed / count * workers:9.0f}")
+        sizes = {key: statistics.mean(len(out[key]) for out in outputs) / 1024 for key in outputs[0]}
+        print("\n  average output size (KB): " +
+              ", ".join(f"{size}.{fmt} {kb:.0f}" for (size, fmt), kb in sizes.items()))
+    finally:
+        shutil.rmtree(corpus, ignore_errors=True)
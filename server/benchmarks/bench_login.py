@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Login throughput per password hasher configuration.
+
+For each configuration, fires REQUESTS borrower logins at the ASGI handler
+CONCURRENCY at a time and reports logins/second, login latency, how many
+were turned away with 503, and the latency of /api/health/live requests
+made during the burst (the "does a login burst starve the worker" number).
+
+Usage: python benchmarks/bench_login.py [requests] [concurrency]
+"""
+
+import asyncio
+import json
+import statistics
+import sys
+import time
+
+from common import print_header, setup_django
+
+CONFIGS = [
+    ('pbkdf2 600k (Django default)', {'PASSWORD_HASHER': 'pbkdf2'}),
+    ('pbkdf2 210k', {'PASSWORD_HASHER': 'pbkdf2', 'PASSWORD_PBKDF2_ITERATIONS': 210000}),
+    ('scrypt N=2^14 r=8 p=1', {'PASSWORD_HASHER': 'scrypt'}),
+    ('argon2 t=2 m=19MiB p=1', {'PASSWORD_HASHER': 'argon2', 'PASSWORD_ARGON2_TIME_COST': 2,
+                                'PASSWORD_ARGON2_MEMORY_COST': 19456, 'PASSWORD_ARGON2_PARALLELISM': 1}),
+]
+
+HASHER_CLASSES = {
+    'pbkdf2': 'server.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'server.hashers.ScryptPasswordHasher',
+    'argon2': 'server.hashers.Argon2PasswordHasher',
+}
+
+
+async def burst(client, email, count, concurrency):
+    body = json.dumps({'email': email, 'password': 'password123'})
+    login_ms, probe_ms, statuses = [], [], []
+    pending = iter(range(count))
+    done = False
+
+    async def login_worker():
+        for _ in pending:
+            start = time.perf_counter()
+            response = await client.post('/api/borrowers/login', body, content_type='application/json')
+            login_ms.append((time.perf_counter() - start) * 1000)
+            statuses.append(response.status_code)
+
+    async def prober():
+        while not done:
+            start = time.perf_counter()
+            await client.get('/api/health/live')
+            probe_ms.append((time.perf_counter() - start) * 1000)
+            await asyncio.sleep(0.02)
+
+    probe = asyncio.ensure_future(prober())
+    start = time.perf_counter()
+    await asyncio.gather(*(login_worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    done = True
+    await probe
+    return elapsed, login_ms, probe_ms, statuses
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+
+    setup_django()
+    from django.conf import settings
+    from django.test import AsyncClient, override_settings
+    from server.models import Borrower
+
+    print_header(f"LOGIN THROUGHPUT: {count} logins, {concurrency} concurrent, "
+                 f"{settings.PASSWORD_HASH_WORKERS} hash workers + {settings.PASSWORD_HASH_QUEUE} queued")
+    print(f"  {'hasher':<30} {'logins/s':>9} {'p50 ms':>8} {'503s':>5} {'probe p50/max ms':>17}")
+    for n, (label, overrides) in enumerate(CONFIGS):
+        hasher = overrides['PASSWORD_HASHER']
+        hashers = [HASHER_CLASSES[hasher]] + [p for k, p in HASHER_CLASSES.items() if k != hasher]
+        # One client hammering one account; measure the hasher, not the throttle
+        with override_settings(PASSWORD_HASHERS=hashers, RATELIMIT_ENABLED=False, **overrides):
+            email = f'login{n}@bench.example.com'
+            borrower = Borrower(first_name='Bench', last_name='User', email=email,
+                                phone='5550100', date_of_birth='1990-01-01')
+            borrower.set_password('password123')
+            borrower.save()
+            elapsed, login_ms, probe_ms, statuses = asyncio.run(
+                burst(AsyncClient(), email, count, concurrency))
+        ok = statuses.count(200)
+        print(f"  {label:<30} {ok / elapsed:9.1f} {statistics.median(login_ms):8.1f} "
+              f"{statuses.count(503):5d} {statistics.median(probe_ms):8.1f}/{max(probe_ms):<8.1f}")
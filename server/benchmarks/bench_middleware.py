@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Per-request middleware overhead: flat MIDDLEWARE vs RouteAwareMiddleware.
+
+Requests go straight into a handler built from each middleware setting and
+hit a trivial view, so the timings are the middleware stack alone (session
+load/save included; the test database is in-memory SQLite unless
+DATABASE_URL is set). Clients are assumed to send the session cookie along
+with the bearer token, as a browser with credentials: 'include' does.
+
+Usage: python benchmarks/bench_middleware.py [requests]
+"""
+
+import statistics
+import sys
+
+from common import setup_django, print_header, Timer
+
+setup_django()
+
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.handlers.base import BaseHandler
+from django.http import JsonResponse
+from django.test import RequestFactory, override_settings
+from django.urls import path
+from django.views.decorators.csrf import csrf_exempt
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+FLAT_MIDDLEWARE = [
+    'corsheaders.middleware.CorsMiddleware',
+    'django.middleware.security.SecurityMiddleware',
+    *settings.BROWSER_MIDDLEWARE[:2],
+    'django.middleware.common.CommonMiddleware',
+    *settings.BROWSER_MIDDLEWARE[2:],
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+
+@csrf_exempt
+def ping(request):
+    return JsonResponse({'ok': True})
+
+
+urlpatterns = [path('api/ping', ping)]
+
+
+def build_handler(middleware):
+    with override_settings(MIDDLEWARE=middleware, ROOT_URLCONF=__name__):
+        handler = BaseHandler()
+        handler.load_middleware()
+    return handler
+
+
+def run(handler, headers, cookies):
+    factory = RequestFactory()
+    for name, value in cookies.items():
+        factory.cookies[name] = value
+    samples = []
+    with override_settings(ROOT_URLCONF=__name__):
+        for _ in range(N):
+            request = factory.get('/api/ping', headers=headers)
+            with Timer() as t:
+                response = handler.get_response(request)
+            assert response.status_code == 200, response.status_code
+            samples.append(t.elapsed * 1e6)
+    return statistics.median(samples), statistics.mean(samples)
+
+
+if __name__ == '__main__':
+    session = SessionStore()
+    session['borrower_id'] = 1
+    session.save()
+    cookie = {settings.SESSION_COOKIE_NAME: session.session_key}
+    bearer = {'Authorization': 'Bearer benchmark-token'}
+
+    cases = [
+        ('no middleware', [], bearer, cookie),
+        ('flat stack, cookie session', FLAT_MIDDLEWARE, {}, cookie),
+        ('flat stack, bearer + cookie', FLAT_MIDDLEWARE, bearer, cookie),
+        ('route-aware, cookie session', settings.MIDDLEWARE, {}, cookie),
+        ('route-aware, bearer + cookie', settings.MIDDLEWARE, bearer, cookie),
+    ]
+    print_header(f"MIDDLEWARE OVERHEAD PER REQUEST ({N} requests, microseconds)")
+    print(f"  {'case':<32} {'median':>8} {'mean':>8}")
+    for label, middleware, headers, cookies in cases:
+        median, mean = run(build_handler(middleware), headers, cookies)
+        print(f"  {label:<32} {median:8.1f} {mean:8.1f}")
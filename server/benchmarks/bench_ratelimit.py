@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Cost of a rate-limit decision, allowed and throttled, per backend.
+
+Calls the decorated view directly with a RequestFactory request, so the
+numbers are the decorator plus a trivial view. The cache backend uses
+whatever CACHES is configured (local memory unless REDIS_URL is set).
+
+Usage: python benchmarks/bench_ratelimit.py [iterations]
+"""
+
+import statistics
+import sys
+import time
+
+from common import print_header, setup_django
+
+setup_django(create_db=False)
+
+from django.http import JsonResponse
+from django.test import RequestFactory
+
+from server import ratelimit
+
+N = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+
+
+def view(request):
+    return JsonResponse({'ok': True})
+
+
+def measure(backend_name, limited_view, request):
+    ratelimit._backend = ratelimit._backends[backend_name]()
+    samples = []
+    for _ in range(N):
+        start = time.perf_counter()
+        limited_view(request)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+
+if __name__ == '__main__':
+    factory = RequestFactory()
+    request = factory.get('/api/validate/email', {'email': 'someone@example.com'})
+    allowed = ratelimit.ratelimit('bench-allowed', ip=f'{N * 10}/s', account=f'{N * 10}/s')(view)
+    throttled = ratelimit.ratelimit('bench-throttled', ip='1/d')(view)
+
+    print_header(f"RATE LIMIT DECISION ({N} calls, median microseconds)")
+    print(f"  {'':<10} {'view only':>10} {'allowed':>10} {'throttled':>10}")
+    bare = measure('memory', view, request)
+    for backend_name in ('memory', 'cache'):
+        print(f"  {backend_name:<10} {bare:10.1f} {measure(backend_name, allowed, request):10.1f} "
+              f"{measure(backend_name, throttled, request):10.1f}")
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Pool search: first-page latency of server.search over a large book of pools.
+
+Seeds pools with generated addresses (300 cities across twenty
+states, realistic ZIP prefixes), then times search_pools() for typical
+queries - a city, a city as it's typed, city + state, a ZIP prefix, a
+street, a misspelling - reporting median and p95 over repeated runs.
+
+Usage: python benchmarks/bench_search.py [pools] [runs]
+       (defaults 200000 and 50; set DATABASE_URL to run against Postgres)
+"""
+
+import random
+import statistics
+import sys
+
+from common import Timer, print_header, setup_django
+
+STATES = ['AL', 'AZ', 'CA', 'CO', 'FL', 'GA', 'IL', 'MA', 'MI', 'NC', 'NJ', 'NV', 'NY', 'OH', 'OR', 'PA', 'TN',
+          'TX', 'VA', 'WA']
+STREETS = ['Main St', 'Oak Ave', 'Pine Rd', 'Maple Dr', 'Cedar Ln', 'Elm St', 'Park Ave', 'Lake Rd', 'Hill St',
+           'Sunset Blvd', 'Washington Ave', 'River Rd', 'Church St', 'Mill Rd', 'Highland Ave']
+SYLLABLES = ['aus', 'tin', 'dal', 'las', 'ber', 'ville', 'spring', 'field', 'port', 'land', 'wood', 'ford', 'mont',
+             'view', 'green', 'bay', 'ridge', 'brook', 'dale', 'ston']
+
+QUERIES = {
+    'city': 'austin',
+    'city, typing': 'aust',
+    'city + state': 'austin tx',
+    'zip prefix': '787',
+    'street + city': 'oak austin',
+    'misspelled': 'austn tx',
+}
+
+
+def cities(rng, count=300):
+    """(city, state, ZIP prefix) triples; Austin, TX 787xx is one of them, for QUERIES"""
+    names = set()
+    while len(names) < count - 1:
+        names.add(''.join(rng.sample(SYLLABLES, 2)).capitalize())
+    names.discard('Austin')
+    return [('Austin', 'TX', '787')] + [(name, rng.choice(STATES), f'{rng.randrange(100, 999)}') for name in sorted(names)]
+
+
+def seed(count, rng):
+    from server.models import Borrower, Pool, PoolSearch
+    from server.search import document
+    places = cities(rng)
+    borrower = Borrower.objects.create(first_name='Bench', last_name='Mark', email='bench@example.com',
+                                       phone='5555555555', date_of_birth='1990-01-01', password_hash='x')
+    for start in range(0, count, 5000):
+        pools = []
+        for _ in range(min(5000, count - start)):
+            city, state, zip3 = rng.choice(places)
+            pools.append(Pool(
+                borrower=borrower, pool_type='equity', status=rng.choice(['active'] * 4 + ['funded']),
+                first_name='B', last_name='M', email='bench@example.com', phone='1', date_of_birth='1990-01-01',
+                ssn='1', address_line_1='1', mailing_city='c', mailing_state='s', mailing_zip_code='1',
+                address_line=f'{rng.randrange(1, 9999)} {rng.choice(STREETS)}', city=city, state=state,
+                zip_code=f'{zip3}{rng.randrange(0, 99):02d}', percent_owned=100, amount=100_000, roi_rate=8,
+            ))
+        Pool.objects.bulk_create(pools)  # bulk_create skips signals, so index them here
+        PoolSearch.objects.bulk_create([
+            PoolSearch(pool=pool, document=document((pool.address_line, pool.city, pool.state, pool.zip_code)),
+                       active=pool.status == 'active')
+            for pool in pools
+        ])
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    rng = random.Random(0)
+
+    setup_django()
+    from django.db import connection
+    from server.search import search_pools
+
+    print_header(f"POOL SEARCH: {count:,} pools ({connection.vendor})")
+    with Timer() as timer:
+        seed(count, rng)
+    print(f"  seeded in {timer.elapsed:.1f} s")
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    for label, query in QUERIES.items():
+        search_pools(query, 21)  # warm up
+        times = []
+        for _ in range(runs):
+            with Timer() as timer:
+                matches = search_pools(query, 21)
+            times.append(timer.elapsed * 1000)
+        times.sort()
+        print(f"  {label:<14} {query!r:<13} median {statistics.median(times):7.2f} ms   "
+              f"p95 {times[int(len(times) * 0.95) - 1]:7.2f} ms   ({len(matches)} on page 1)")
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Serializer throughput: objects per second through server.serializers.
+
+  render      POOL.renderer() over pools already in memory, for the investor
+              list shape, the borrower detail columns (no child rows) and a
+              four-field sparse fieldset, against a hand-written dict of the
+              list shape as the views used to build it
+  end to end  the same shapes fetched with POOL.prepare() and rendered:
+              what ?fields= saves in columns read and rows decoded
+
+Usage: python benchmarks/bench_serializers.py [pools] [runs]
+       (defaults 20000 and 5; set DATABASE_URL to run against Postgres)
+"""
+
+import random
+import sys
+
+from common import Timer, print_header, setup_django
+
+SPARSE = ('id', 'amount', 'roiRate', 'city')
+
+
+def seed(count, rng):
+    from server.models import Borrower, Pool
+    borrower = Borrower.objects.create(first_name='Bench', last_name='Mark', email='bench@example.com',
+                                       phone='5555555555', date_of_birth='1990-01-01', password_hash='x')
+    for start in range(0, count, 5000):
+        Pool.objects.bulk_create([
+            Pool(borrower=borrower, pool_type='equity', status='active', first_name='B', last_name='M',
+                 email='bench@example.com', phone='1', date_of_birth='1990-01-01', ssn='1', address_line_1='1',
+                 mailing_city='c', mailing_state='s', mailing_zip_code='1', address_line='1 Main St',
+                 city='Austin', state='TX', zip_code='78701', percent_owned=100,
+                 amount=rng.randrange(10_000, 250_000), roi_rate=rng.randrange(4, 14),
+                 property_value=rng.randrange(150_000, 2_000_000), mortgage_balance=rng.randrange(0, 900_000),
+                 ltv=rng.randrange(0, 90), cltv=rng.randrange(0, 95), equity_available=rng.randrange(0, 900_000),
+                 latitude=30.27, longitude=-97.74, geohash=0)
+            for _ in range(min(5000, count - start))
+        ])
+
+
+def hand_built(pool):
+    """The investor list payload as a hand-written dict"""
+    return {
+        'id': pool.id,
+        'poolType': pool.pool_type,
+        'amount': str(pool.amount),
+        'roiRate': str(pool.roi_rate),
+        'term': pool.term,
+        'termMonths': pool.term_months,
+        'status': pool.status,
+        'fundingProgress': pool.funding_progress,
+        'createdAt': pool.created_at.isoformat(),
+        'address': f"{pool.address_line}, {pool.city}, {pool.state} {pool.zip_code}",
+        'propertyValue': str(pool.property_value) if pool.property_value is not None else None,
+        'mortgageBalance': str(pool.mortgage_balance) if pool.mortgage_balance is not None else None,
+        'borrowerName': pool.borrower.full_name,
+        'percentOwned': str(pool.percent_owned),
+        'underwriting': {
+            'ltv': str(pool.ltv) if pool.ltv is not None else None,
+            'cltv': str(pool.cltv) if pool.cltv is not None else None,
+            'equityAvailable': str(pool.equity_available) if pool.equity_available is not None else None,
+            'dti': str(pool.dti) if pool.dti is not None else None,
+        },
+        'location': {'latitude': pool.latitude, 'longitude': pool.longitude} if pool.geohash is not None else None,
+        'coverPhoto': pool.cover_photo,
+    }
+
+
+def best(runs, fn):
+    times = []
+    for _ in range(runs):
+        with Timer() as timer:
+            fn()
+        times.append(timer.elapsed)
+    return min(times)
+
+
+if __name__ == '__main__':
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20_000
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    rng = random.Random(0)
+
+    setup_django()
+    from django.db import connection
+    from server.models import Pool
+    from server.serializers import OPPORTUNITY, POOL, POOL_UPDATED
+
+    shapes = [
+        ('investor list', OPPORTUNITY),
+        ('borrower detail', POOL_UPDATED),
+        (f'{len(SPARSE)} fields', SPARSE),
+    ]
+
+    print_header(f"SERIALIZER RENDER: {count:,} pools in memory")
+    with Timer() as timer:
+        seed(count, rng)
+    print(f"  seeded in {timer.elapsed:.1f} s")
+    pools = list(POOL.prepare(Pool.objects.all(), (*OPPORTUNITY, *POOL_UPDATED)))
+    elapsed = best(runs, lambda: [hand_built(pool) for pool in pools])
+    print(f"  {'hand-built list':<16} {count / elapsed:>12,.0f} objects/s")
+    for label, names in shapes:
+        render = POOL.renderer(names)
+        elapsed = best(runs, lambda: [render(pool) for pool in pools])
+        print(f"  {label:<16} {count / elapsed:>12,.0f} objects/s")
+
+    print_header(f"SERIALIZER END TO END: {count:,} pools ({connection.vendor})")
+    for label, names in shapes:
+        render = POOL.renderer(names)
+        queryset = POOL.prepare(Pool.objects.all(), names)
+        elapsed = best(runs, lambda: [render(pool) for pool in queryset.all()])
+        columns = len(queryset.query.get_compiler(queryset.db).get_select()[0])
+        print(f"  {label:<16} {count / elapsed:>12,.0f} objects/s   ({columns} columns)")
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Cold-start profile: import time report and boot-to-first-response time.
+
+Each run spawns a fresh interpreter that builds the WSGI app and serves
+GET /api/health/live, which is what a scaled-to-zero instance does on its
+first request. Uses the local SQLite database unless DATABASE_URL is set.
+
+Usage: python benchmarks/bench_startup.py [settings_module ...]
+       (default: server.settings server.settings_api)
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from common import SERVER_DIR, print_header
+
+BOOT = """
+import io
+from django.core.wsgi import get_wsgi_application
+app = get_wsgi_application()
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/health/live', 'QUERY_STRING': '',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '8000', 'HTTP_HOST': 'localhost',
+    'wsgi.input': io.BytesIO(), 'wsgi.url_scheme': 'http', 'wsgi.errors': io.StringIO(),
+}
+status = []
+b''.join(app(environ, lambda s, h: status.append(s)))
+assert status[0].startswith('200'), status
+"""
+
+RUNS = 7
+
+
+def _run(settings_module, *python_args):
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module)
+    return subprocess.run(
+        [sys.executable, *python_args, '-c', BOOT],
+        cwd=SERVER_DIR, env=env, capture_output=True, text=True, check=True,
+    )
+
+
+def import_profile(settings_module, top=12):
+    """Self import time (ms) aggregated by package (two dotted levels), from -X importtime"""
+    stderr = _run(settings_module, '-X', 'importtime').stderr
+    by_package = defaultdict(float)
+    total = 0.0
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_field, _, name = line[len('import time:'):].split('|')
+        self_us = int(self_field)
+        name = name.strip()
+        by_package['.'.join(name.split('.')[:2])] += self_us / 1000
+        total += self_us / 1000
+    ranked = sorted(by_package.items(), key=lambda item: item[1], reverse=True)[:top]
+    return total, ranked
+
+
+def first_response_times(settings_module, runs=RUNS):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _run(settings_module)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+if __name__ == '__main__':
+    modules = sys.argv[1:] or ['server.settings', 'server.settings_api']
+    results = {}
+    for settings_module in modules:
+        print_header(f"IMPORT PROFILE: {settings_module}")
+        total, ranked = import_profile(settings_module)
+        for package, ms in ranked:
+            print(f"  {package:<28} {ms:8.1f} ms")
+        print(f"  {'total imports':<28} {total:8.1f} ms")
+        results[settings_module] = (total, first_response_times(settings_module))
+
+    print_header(f"BOOT TO FIRST RESPONSE (median of {RUNS} cold processes)")
+    for settings_module, (total, times) in results.items():
+        print(f"  {settings_module:<28} {statistics.median(times):8.1f} ms   (imports {total:.1f} ms)")
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Underwriting recompute: how long server.underwriting takes over a large book.
+
+  kernel      compute_metrics() on generated arrays of 1M pools, against the
+              same formulas as a per-pool Python loop over Decimals
+  end to end  underwrite() over pools in the test database: fetch, child
+              table sums, compute and write back, reported as pools/second
+
+Usage: python benchmarks/bench_underwriting.py [pools_in_db] [kernel_pools]
+       (defaults 100000 and 1000000; set DATABASE_URL to run against Postgres)
+"""
+
+import random
+import sys
+from decimal import Decimal
+
+from common import Timer, print_header, setup_django
+
+
+def columns(n):
+    import numpy as np
+    gen = np.random.default_rng(0)
+    cols = {
+        'property_value': gen.uniform(150_000, 2_000_000, n).round(2),
+        'mortgage_balance': gen.uniform(0, 900_000, n).round(2),
+        'amount': gen.uniform(10_000, 250_000, n).round(2),
+        'roi_rate': gen.uniform(4, 14, n).round(2),
+        'monthly_debt_payments': gen.uniform(0, 3000, n).round(2),
+        'monthly_income': gen.uniform(2000, 30_000, n).round(2),
+        'loan_balances': gen.uniform(0, 100_000, n).round(2),
+        'liability_payments': gen.uniform(0, 2000, n).round(2),
+    }
+    for name in ('mortgage_balance', 'monthly_debt_payments', 'monthly_income'):
+        cols[name][gen.random(n) < 0.1] = np.nan  # optional inputs left blank
+    return cols
+
+
+def python_loop(cols, n):
+    """The same metrics one pool at a time, as a view computing them inline would"""
+    out = []
+    for i in range(n):
+        row = {k: (None if v[i] != v[i] else Decimal(str(v[i]))) for k, v in cols.items()}
+        mortgage = row['mortgage_balance'] or Decimal(0)
+        liens = mortgage + row['loan_balances']
+        value, income = row['property_value'], row['monthly_income']
+        debts = row['monthly_debt_payments'] if row['monthly_debt_payments'] is not None else row['liability_payments']
+        payment = row['amount'] * row['roi_rate'] / 1200
+        out.append((
+            mortgage / value * 100 if value else None,
+            (liens + row['amount']) / value * 100 if value else None,
+            value - liens,
+            (debts + payment) / income * 100 if income else None,
+        ))
+    return out
+
+
+def seed(count, rng):
+    from server.models import Borrower, Pool, PoolExistingLoan, PoolLiability
+    borrower = Borrower.objects.create(first_name='Bench', last_name='Mark', email='bench@example.com',
+                                       phone='5555555555', date_of_birth='1990-01-01', password_hash='x')
+    for start in range(0, count, 5000):
+        pools = Pool.objects.bulk_create([
+            Pool(borrower=borrower, pool_type='equity', status='active', first_name='B', last_name='M',
+                 email='bench@example.com', phone='1', date_of_birth='1990-01-01', ssn='1', address_line_1='1',
+                 mailing_city='c', mailing_state='s', mailing_zip_code='1', address_line='1', city='c',
+                 state='s', zip_code='1', percent_owned=100, amount=rng.randrange(10_000, 250_000),
+                 roi_rate=rng.randrange(4, 14), property_value=rng.randrange(150_000, 2_000_000),
+                 mortgage_balance=rng.randrange(0, 900_000), monthly_income=rng.randrange(2000, 30_000))
+            for _ in range(min(5000, count - start))
+        ])
+        PoolLiability.objects.bulk_create([
+            PoolLiability(pool=pool, position=n, type='card', amount=rng.randrange(0, 20_000),
+                          monthly_payment=rng.randrange(0, 600))
+            for pool in pools for n in range(rng.randrange(0, 3))
+        ])
+        PoolExistingLoan.objects.bulk_create([
+            PoolExistingLoan(pool=pool, position=0, remaining_balance=rng.randrange(0, 100_000))
+            for pool in pools if rng.random() < 0.3
+        ])
+
+
+if __name__ == '__main__':
+    in_db = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    kernel = int(sys.argv[2]) if len(sys.argv) > 2 else 1_000_000
+    rng = random.Random(0)
+
+    setup_django()
+    from server.underwriting import compute_metrics, underwrite
+
+    print_header(f"UNDERWRITING KERNEL: {kernel:,} pools")
+    cols = columns(kernel)
+    with Timer() as timer:
+        compute_metrics(cols)
+    print(f"  numpy         {timer.elapsed * 1000:8.1f} ms")
+    sample = min(kernel, 100_000)
+    with Timer() as timer:
+        python_loop(cols, sample)
+    loop = timer.elapsed * kernel / sample
+    print(f"  python loop   {loop * 1000:8.1f} ms (extrapolated from {sample:,} pools)")
+
+    print_header(f"UNDERWRITING END TO END: {in_db:,} pools in the database")
+    with Timer() as timer:
+        seed(in_db, rng)
+    print(f"  seeded in {timer.elapsed:.1f} s")
+    for run in ('first', 'again'):
+        with Timer() as timer:
+            count = underwrite()
+        print(f"  {run:<6} {count:,} pools in {timer.elapsed:.2f} s ({count / timer.elapsed:,.0f} pools/s, "
+              f"~{1_000_000 / (count / timer.elapsed):.1f} s per million)")
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Memory and throughput of a large appraisal upload.
+
+Drives the WSGI handler directly with a request body generated on the fly,
+so the only copies of the file in memory are the ones the server makes.
+Reports peak Python heap (tracemalloc) and MB/s for:
+
+  chunked    UPLOAD_CHUNK_BYTES chunks through /api/uploads/<id>
+  one PUT    the whole file as a single chunk (still streamed)
+  buffered   the same body read through request.body, for comparison
+
+then uploads the same bytes again to show deduplication skipping storage.
+
+Usage: python benchmarks/bench_uploads.py [megabytes]
+"""
+
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import tracemalloc
+
+from common import Timer, print_header, setup_django
+
+PATTERN = os.urandom(1024 * 1024)
+
+
+class GeneratedBody:
+    """wsgi.input producing `size` bytes of PATTERN without holding them"""
+
+    def __init__(self, size, offset=0):
+        self.remaining = size
+        self.position = offset
+
+    def read(self, size=-1):
+        size = self.remaining if size < 0 else min(size, self.remaining)
+        pieces, wanted = [], size
+        while wanted:
+            start = self.position % len(PATTERN)
+            piece = PATTERN[start:start + wanted]  # whole-PATTERN slices are not copies
+            pieces.append(piece)
+            self.position += len(piece)
+            wanted -= len(piece)
+        self.remaining -= size
+        return b''.join(pieces)
+
+    readline = read  # LimitedStream wants one; only read() is used here
+
+
+def environ(method, path, token, body=b'', stream=None, length=None, **headers):
+    env = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'SERVER_NAME': 'testserver',
+        'SERVER_PORT': '80',
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': stream if stream is not None else GeneratedBody(0),
+        'CONTENT_LENGTH': str(length if length is not None else len(body)),
+        'CONTENT_TYPE': 'application/json' if body else 'application/octet-stream',
+        'HTTP_AUTHORIZATION': f'Bearer {token}',
+    }
+    if body:
+        env['wsgi.input'] = io.BytesIO(body)
+    env.update(headers)
+    return env
+
+
+def call(app, env):
+    status = []
+    response = b''.join(app(env, lambda s, h: status.append(s)))
+    return int(status[0].split()[0]), json.loads(response) if response else None
+
+
+def upload(app, token, pool_id, size, chunk):
+    body = json.dumps({'kind': 'appraisal_doc', 'filename': 'appraisal.pdf', 'size': size}).encode()
+    _, opened = call(app, environ('POST', f'/api/pools/{pool_id}/uploads', token, body))
+    offset, result = 0, None
+    while offset < size:
+        length = min(chunk, size - offset)
+        env = environ('PUT', f"/api/uploads/{opened['uploadId']}", token,
+                      stream=GeneratedBody(length, offset), length=length,
+                      HTTP_CONTENT_RANGE=f'bytes {offset}-{offset + length - 1}/{size}')
+        status, result = call(app, env)
+        assert status == 200, result
+        offset += length
+    return result
+
+
+def measure(func):
+    tracemalloc.start()
+    with Timer() as timer:
+        result = func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timer.elapsed, peak, result
+
+
+if __name__ == '__main__':
+    megabytes = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    size = megabytes * 1024 * 1024
+
+    media_root = tempfile.mkdtemp(prefix='bench-uploads-')
+    os.environ['MEDIA_ROOT'] = media_root
+    setup_django()
+    from django.conf import settings
+    from django.core.handlers.wsgi import WSGIHandler, WSGIRequest
+    from server.accounts import create_account
+    from server.models import Pool
+
+    borrower, token = create_account('borrower', {
+        'first_name': 'Bench', 'last_name': 'User', 'email': 'uploads@bench.example.com',
+        'phone': '5550100000', 'date_of_birth': '1990-01-01', 'password': 'password123',
+    })
+    pool = Pool.objects.create(
+        borrower=borrower, pool_type='equity', first_name='Bench', last_name='User',
+        email=borrower.email, phone=borrower.phone, date_of_birth='1990-01-01', ssn='000-00-0000',
+        address_line_1='1 Main St', mailing_city='Austin', mailing_state='TX', mailing_zip_code='78701',
+        address_line='1 Main St', city='Austin', state='TX', zip_code='78701',
+        percent_owned=100, amount=50000, roi_rate=8,
+    )
+    app = WSGIHandler()
+
+    print_header(f"UPLOAD: {megabytes} MB appraisal, storage={settings.UPLOAD_STORAGE}")
+    print(f"  {'mode':<34} {'seconds':>8} {'MB/s':>8} {'peak heap MB':>13}")
+
+    def report(label, elapsed, peak):
+        print(f"  {label:<34} {elapsed:8.2f} {megabytes / elapsed:8.1f} {peak / 2**20:13.1f}")
+
+    try:
+        chunk = settings.UPLOAD_CHUNK_BYTES
+        elapsed, peak, result = measure(lambda: upload(app, token, pool.id, size, chunk))
+        report(f'chunked ({chunk // 2**20} MiB chunks)', elapsed, peak)
+        stored_at = os.path.join(media_root, result['path'])
+        assert os.path.getsize(stored_at) == size
+
+        # Different bytes, so this one is stored rather than deduplicated
+        PATTERN = os.urandom(len(PATTERN))
+        elapsed, peak, _ = measure(lambda: upload(app, token, pool.id, size, size))
+        report('one PUT (streamed)', elapsed, peak)
+
+        def buffered():
+            return len(WSGIRequest(environ('PUT', '/', token, stream=GeneratedBody(size), length=size)).body)
+        settings.DATA_UPLOAD_MAX_MEMORY_SIZE = None
+        elapsed, peak, _ = measure(buffered)
+        report('request.body (not used; baseline)', elapsed, peak)
+
+        elapsed, peak, result = measure(lambda: upload(app, token, pool.id, size, chunk))
+        report('repeat upload (deduplicated)', elapsed, peak)
+        stored = sum(len(files) for _, _, files in os.walk(media_root))
+        print(f"\n  objects in storage after 3 uploads: {stored}")
+    finally:
+        shutil.rmtree(media_root, ignore_errors=True)
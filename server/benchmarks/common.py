@@ -0,0 +1,44 @@
+"""
+Shared setup for the benchmark scripts in this directory.
+
+Every benchmark runs against a throwaway test database (in-memory SQLite unless
+DATABASE_URL points at Postgres), so it is safe to run next to a dev database.
+"""
+
+import os
+import sys
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def setup_django(settings_module='server.settings', create_db=True):
+    """Configure Django and build a fresh test database"""
+    sys.path.insert(0, SERVER_DIR)
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+    from django.test.utils import setup_test_environment
+    setup_test_environment()
+
+    if create_db:
+        from django.db import connection
+        connection.creation.create_test_db(verbosity=0)
+
+
+class Timer:
+    """Context manager recording wall-clock seconds in ``elapsed``"""
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+def print_header(title):
+    print("=" * 60)
+    print(title)
+    print("=" * 60)
@@ -6,8 +6,8 @@ echo "Starting deployment..."
 # Change to server directory
 cd server
 
-# Run migrations
-python manage.py migrate --noinput
+# Run migrations (no-op if up to date; locked against concurrent deploys)
+python manage.py migrate_if_needed
 
 # Collect static files
 python manage.py collectstatic --noinput
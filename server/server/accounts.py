@@ -0,0 +1,209 @@
+"""
+Account creation shared by the signup endpoints and email verification.
+
+clean_signup() validates a signup payload once, with precompiled patterns,
+and returns model fields. create_account() hashes the password before
+opening the transaction (callers that already hold one hash it first with
+hash_signup_password()), then writes the account, its RegisteredEmail row
+(signals.py), its auth token and - for direct signups - the session in one
+transaction: five statements on a fresh session, no read-back.
+"""
+
+import re
+import uuid
+from datetime import datetime, timedelta
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AuthToken, Borrower, Investor
+
+NAME_RE = re.compile(r"[A-Za-zÀ-ÖØ-öø-ÿ'\- ]{1,100}")
+FULL_NAME_RE = re.compile(r"[A-Za-zÀ-ÖØ-öø-ÿ'\- ]{2,255}")
+PHONE_RE = re.compile(r"[\d\-\+\(\)\s]{10,20}")
+
+BORROWER_FIELDS = {"firstName", "lastName", "email", "phone", "dateOfBirth", "password"}
+INVESTOR_FIELDS = {"fullName", "email", "dateOfBirth", "phone", "ssn", "address1", "city", "state", "zip", "country", "password"}
+
+DATE_FORMATS = ("%Y-%m-%d", "%b %d %Y", "%B %d %Y")
+
+
+class SignupError(Exception):
+    """Signup data failed validation; the message is safe to return to the client"""
+
+
+def parse_date(date_str):
+    for fmt in DATE_FORMATS:  # allow multiple formats
+        try:
+            return datetime.strptime(date_str, fmt).date()
+        except (TypeError, ValueError):
+            continue
+    raise SignupError("Invalid date format; expected YYYY-MM-DD")
+
+
+def _require_adult(dob):
+    today = timezone.now().date()
+    try:
+        eighteenth_birthday = dob.replace(year=dob.year + 18)
+    except ValueError:
+        # Handle Feb 29 edge-case by subtracting one day before adding 18 years
+        eighteenth_birthday = (dob - timedelta(days=1)).replace(year=dob.year + 18)
+    if eighteenth_birthday > today:
+        raise SignupError("You must be at least 18 years old")
+
+
+def _clean_email_and_password(data, email):
+    email = (email if email is not None else data.get("email", "")).lower().strip()
+    password = data.get("password")
+    if not email or "@" not in email:
+        raise SignupError("Valid email required")
+    if not password or len(password) < 8:
+        raise SignupError("Password must be at least 8 characters")
+    return email, password
+
+
+def clean_borrower(data, email=None):
+    """Validated Borrower fields plus 'password'; email overrides data['email'] (verified flows)"""
+    missing = BORROWER_FIELDS - set(data.keys()) - ({"email"} if email is not None else set())
+    if missing:
+        raise SignupError(f"Missing fields: {', '.join(sorted(missing))}")
+
+    first_name = data.get("firstName", "").strip()
+    middle_name = data.get("middleName", "").strip()  # Optional
+    last_name = data.get("lastName", "").strip()
+    phone = data.get("phone", "").strip()
+
+    if not first_name:
+        raise SignupError("First name required")
+    if not last_name:
+        raise SignupError("Last name required")
+    if not phone:
+        raise SignupError("Phone number required")
+    if not NAME_RE.fullmatch(first_name):
+        raise SignupError("First name contains invalid characters")
+    if not NAME_RE.fullmatch(last_name):
+        raise SignupError("Last name contains invalid characters")
+    if middle_name and not NAME_RE.fullmatch(middle_name):
+        raise SignupError("Middle name contains invalid characters")
+    if not PHONE_RE.fullmatch(phone):
+        raise SignupError("Invalid phone number format")
+    email, password = _clean_email_and_password(data, email)
+    dob = parse_date(data.get("dateOfBirth"))
+    _require_adult(dob)
+
+    return {
+        "first_name": first_name,
+        "middle_name": middle_name,
+        "last_name": last_name,
+        "email": email,
+        "phone": phone,
+        "date_of_birth": dob,
+        "password": password,
+    }
+
+
+def clean_investor(data, email=None):
+    """Validated Investor fields plus 'password'; email overrides data['email'] (verified flows)"""
+    missing = INVESTOR_FIELDS - set(data.keys()) - ({"email"} if email is not None else set())
+    if missing:
+        raise SignupError(f"Missing fields: {', '.join(sorted(missing))}")
+
+    full_name = data.get("fullName", "").strip()
+    fields = {
+        "phone": data.get("phone", "").strip(),
+        "ssn": data.get("ssn", "").strip(),
+        "address1": data.get("address1", "").strip(),
+        "address2": data.get("address2", "").strip(),
+        "city": data.get("city", "").strip(),
+        "state": data.get("state", "").strip(),
+        "zip_code": data.get("zip", "").strip(),
+        "country": data.get("country", "United States").strip(),
+    }
+
+    if not full_name:
+        raise SignupError("Full name required")
+    # Require first and last name and validate characters
+    if len(full_name.split()) < 2:
+        raise SignupError("Please enter your full name (first and last)")
+    if not FULL_NAME_RE.fullmatch(full_name):
+        raise SignupError("Name contains invalid characters")
+    email, password = _clean_email_and_password(data, email)
+    for field, label in (("phone", "Phone number"), ("ssn", "SSN"), ("address1", "Address"),
+                         ("city", "City"), ("state", "State"), ("zip_code", "ZIP code")):
+        if not fields[field]:
+            raise SignupError(f"{label} required")
+    dob = parse_date(data.get("dateOfBirth"))
+    _require_adult(dob)
+
+    return {"full_name": full_name, "email": email, "date_of_birth": dob, "password": password, **fields}
+
+
+def clean_signup(role, data, email=None):
+    return clean_borrower(data, email) if role == 'borrower' else clean_investor(data, email)
+
+
+def _attach_session(request, user, role):
+    other_key = 'investor_id' if role == 'borrower' else 'borrower_id'
+    request.session[f'{role}_id'] = user.id
+    request.session['role'] = role
+    request.session.pop(other_key, None)
+    request.session.save()
+
+
+def hash_signup_password(fields):
+    """clean_signup() output with 'password' replaced by 'password_hash'"""
+    fields = dict(fields)
+    fields["password_hash"] = make_password(fields.pop("password"))
+    return fields
+
+
+def create_account(role, fields, request=None, email_verified=False, before_commit=None):
+    """Create a borrower or investor from clean_signup() output and return (user, token).
+
+    With a request, the new user is also logged into its session. before_commit
+    runs inside the transaction (e.g. to consume a verification code).
+    Raises IntegrityError when the email is taken.
+    """
+    if "password" in fields:
+        fields = hash_signup_password(fields)  # CPU-heavy; keep it outside the transaction
+    model = Borrower if role == 'borrower' else Investor
+    with transaction.atomic():
+        if before_commit is not None:
+            before_commit()
+        user = model(**fields, email_verified=email_verified)
+        user.save(force_insert=True)
+        # Brand-new account, so there are no old tokens to clear
+        token = AuthToken.objects.create(token=str(uuid.uuid4()), **{role: user})
+        if request is not None:
+            _attach_session(request, user, role)
+    return user, token.token
+
+
+def account_payload(user, role, token):
+    """Signup response body shared by both signup paths"""
+    if role == 'borrower':
+        payload = {
+            "id": user.id,
+            "firstName": user.first_name,
+            "middleName": user.middle_name,
+            "lastName": user.last_name,
+            "fullName": user.full_name,  # Keep for compatibility
+            "email": user.email,
+            "phone": user.phone,
+            "dateOfBirth": user.date_of_birth.isoformat(),
+        }
+    else:
+        payload = {
+            "id": user.id,
+            "fullName": user.full_name,
+            "email": user.email,
+            "dateOfBirth": user.date_of_birth.isoformat(),
+        }
+    payload.update({
+        "createdAt": user.created_at.isoformat(),
+        "role": role,
+        "token": token,
+        "authenticated": True,
+    })
+    return payload
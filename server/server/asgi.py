@@ -3,6 +3,9 @@ ASGI config for server project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Run it with uvicorn workers so the async views can overlap slow I/O:
+    gunicorn server.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/asgi/
 """
@@ -14,3 +17,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
 
 application = get_asgi_application()
+
+# Load registered emails into this worker's Bloom filter while it starts serving
+from server.email_registry import start_filter_build  # noqa: E402
+
+start_filter_build()
@@ -0,0 +1,9 @@
+from django.db.backends.postgresql import base
+
+from ...instrumentation import InstrumentedDatabaseWrapperMixin
+from ...pool import PooledDatabaseWrapperMixin
+
+
+# Pooling sits outside instrumentation so only real handshakes are timed.
+class DatabaseWrapper(PooledDatabaseWrapperMixin, InstrumentedDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
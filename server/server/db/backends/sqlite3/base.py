@@ -0,0 +1,9 @@
+from django.db.backends.sqlite3 import base
+
+from ...instrumentation import InstrumentedDatabaseWrapperMixin
+from ...pool import PooledDatabaseWrapperMixin
+
+
+# As for PostgreSQL; lets DB_POOL_MODE=pool run against the local SQLite file
+class DatabaseWrapper(PooledDatabaseWrapperMixin, InstrumentedDatabaseWrapperMixin, base.DatabaseWrapper):
+    pass
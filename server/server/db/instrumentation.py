@@ -0,0 +1,93 @@
+"""
+Connection instrumentation shared by the custom database backends.
+
+Counters are per process and per database alias:
+  acquisitions          units of work (requests, management commands) that used the alias
+  reuses                acquisitions served by an already-open or pooled connection
+  connects              new physical connections (full TCP/TLS/auth handshake)
+  handshake_ms_total    time spent establishing those connections
+  health_check_failures stale connections discarded by a health check
+"""
+
+import threading
+import time
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def _bucket(alias):
+    return _stats.setdefault(alias, {
+        'acquisitions': 0,
+        'reuses': 0,
+        'connects': 0,
+        'handshake_ms_total': 0.0,
+        'handshake_ms_max': 0.0,
+        'health_check_failures': 0,
+    })
+
+
+def record(alias, counter, amount=1):
+    with _lock:
+        _bucket(alias)[counter] += amount
+
+
+def record_connect(alias, seconds):
+    ms = seconds * 1000
+    with _lock:
+        bucket = _bucket(alias)
+        bucket['connects'] += 1
+        bucket['handshake_ms_total'] += ms
+        bucket['handshake_ms_max'] = max(bucket['handshake_ms_max'], ms)
+
+
+def connection_stats():
+    """Snapshot of the counters with derived reuse ratio and average handshake"""
+    with _lock:
+        snapshot = {alias: dict(bucket) for alias, bucket in _stats.items()}
+    for bucket in snapshot.values():
+        bucket['reuse_ratio'] = round(bucket['reuses'] / bucket['acquisitions'], 4) if bucket['acquisitions'] else None
+        bucket['handshake_ms_avg'] = round(bucket['handshake_ms_total'] / bucket['connects'], 3) if bucket['connects'] else None
+        bucket['handshake_ms_total'] = round(bucket['handshake_ms_total'], 3)
+        bucket['handshake_ms_max'] = round(bucket['handshake_ms_max'], 3)
+    return snapshot
+
+
+def reset_connection_stats():
+    with _lock:
+        _stats.clear()
+
+
+class InstrumentedDatabaseWrapperMixin:
+    """Counts acquisitions/reuses and times handshakes for a DatabaseWrapper"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._acquired = False
+
+    def ensure_connection(self):
+        if not self._acquired:
+            self._acquired = True
+            record(self.alias, 'acquisitions')
+            if self.connection is not None:
+                record(self.alias, 'reuses')
+        super().ensure_connection()
+
+    def get_new_connection(self, conn_params):
+        start = time.perf_counter()
+        connection = super().get_new_connection(conn_params)
+        record_connect(self.alias, time.perf_counter() - start)
+        return connection
+
+    def close_if_unusable_or_obsolete(self):
+        # Called by Django at request start and end; marks a unit-of-work boundary.
+        # The autocommit check in here touches the connection, which is not an acquisition.
+        self._acquired = True
+        super().close_if_unusable_or_obsolete()
+        self._acquired = False
+
+    def close_if_health_check_failed(self):
+        had_connection = self.connection is not None
+        super().close_if_health_check_failed()
+        if had_connection and self.connection is None:
+            record(self.alias, 'health_check_failures')
@@ -0,0 +1,79 @@
+"""
+Out-of-band migration helpers.
+
+``pending_migrations`` compares migration files on disk with the
+django_migrations table in one query, without importing any migration module
+or building the migration graph, so it is cheap enough to run on every boot.
+``migrate_if_needed`` only runs the real ``migrate`` when something is
+pending, and does it under a PostgreSQL advisory lock so instances starting
+together don't race each other.
+"""
+
+import os
+import pkgutil
+import zlib
+from contextlib import contextmanager
+from importlib import import_module
+
+from django.apps import apps
+from django.core.management import call_command
+from django.db import DEFAULT_DB_ALIAS, connections
+
+# Stable across processes and deploys
+MIGRATION_LOCK_ID = zlib.crc32(b'equipool:migrate')
+
+
+def migration_files_on_disk():
+    """{(app_label, migration_name)} for every installed app with a migrations package"""
+    names = set()
+    for app_config in apps.get_app_configs():
+        try:
+            package = import_module(f'{app_config.name}.migrations')
+        except ImportError:
+            continue
+        for module in pkgutil.iter_modules(package.__path__):
+            if not module.ispkg and not module.name.startswith('_'):
+                names.add((app_config.label, module.name))
+    return names
+
+
+def applied_migrations(using=DEFAULT_DB_ALIAS):
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        if 'django_migrations' not in connection.introspection.table_names(cursor):
+            return set()
+        cursor.execute('SELECT app, name FROM django_migrations')
+        return set(cursor.fetchall())
+
+
+def pending_migrations(using=DEFAULT_DB_ALIAS):
+    return sorted(migration_files_on_disk() - applied_migrations(using))
+
+
+@contextmanager
+def migration_lock(using=DEFAULT_DB_ALIAS):
+    """Session-level advisory lock on PostgreSQL; a no-op elsewhere"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        yield
+        return
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_advisory_lock(%s)', [MIGRATION_LOCK_ID])
+    try:
+        yield
+    finally:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [MIGRATION_LOCK_ID])
+
+
+def migrate_if_needed(using=DEFAULT_DB_ALIAS, stdout=None):
+    """Run migrate if anything is pending. Returns the migrations that were pending."""
+    pending = pending_migrations(using)
+    if not pending:
+        return []
+    with migration_lock(using):
+        # Another instance may have finished while we waited for the lock.
+        pending = pending_migrations(using)
+        if pending:
+            call_command('migrate', database=using, interactive=False, verbosity=1, stdout=stdout)
+    return pending
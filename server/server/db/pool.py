@@ -0,0 +1,157 @@
+"""
+A small in-process connection pool for the PostgreSQL backend (and the
+SQLite fallback, so pooling can be exercised without a server).
+
+Enabled with DB_POOL_MODE=pool. Django is then configured with CONN_MAX_AGE=0,
+so every request "closes" its connection, which hands the physical connection
+back to this pool instead of tearing down the TLS session. Pools are per
+process and per database alias; with gunicorn each worker owns one.
+"""
+
+import threading
+import time
+
+from . import instrumentation
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    def __init__(self, connect, max_size, timeout):
+        self._connect = connect
+        self._idle = []  # LIFO so the most recently used (warmest) connection goes out first
+        self._open = 0
+        self._cond = threading.Condition()
+        self.max_size = max_size
+        self.timeout = timeout
+
+    def checkout(self):
+        """Return ``(connection, reused)``, opening a new connection if none is idle"""
+        deadline = time.monotonic() + self.timeout
+        with self._cond:
+            while not self._idle and self._open >= self.max_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolTimeout(f'No connection available within {self.timeout}s (max_size={self.max_size})')
+                self._cond.wait(remaining)
+            if self._idle:
+                return self._idle.pop(), True
+            self._open += 1
+        try:
+            return self._connect(), False
+        except Exception:
+            self._release_slot()
+            raise
+
+    def checkin(self, connection, discard=False):
+        if not discard and not _closed(connection):
+            try:
+                # Never hand out a connection with an open transaction.
+                if _in_transaction(connection):
+                    connection.rollback()
+            except Exception:
+                discard = True
+        if discard or _closed(connection):
+            try:
+                connection.close()
+            except Exception:
+                pass
+            self._release_slot()
+            return
+        with self._cond:
+            self._idle.append(connection)
+            self._cond.notify()
+
+    def discard(self, connection):
+        self.checkin(connection, discard=True)
+
+    def _release_slot(self):
+        with self._cond:
+            self._open -= 1
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {'open': self._open, 'idle': len(self._idle), 'max_size': self.max_size}
+
+
+def get_pool(alias, connect, max_size, timeout):
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None:
+            pool = _pools[alias] = ConnectionPool(connect, max_size, timeout)
+        return pool
+
+
+def pool_stats():
+    with _pools_lock:
+        return {alias: pool.stats() for alias, pool in _pools.items()}
+
+
+def _closed(connection):
+    # psycopg connections say so; a closed sqlite3 one only fails on use
+    return bool(getattr(connection, 'closed', False))
+
+
+def _in_transaction(connection):
+    info = getattr(connection, 'info', None)
+    if info is not None:
+        return info.transaction_status != 0  # TRANSACTION_STATUS_IDLE
+    return connection.in_transaction
+
+
+def _is_alive(connection):
+    try:
+        cursor = connection.cursor()  # sqlite3 cursors aren't context managers
+        try:
+            cursor.execute('SELECT 1')
+        finally:
+            cursor.close()
+        return True
+    except Exception:
+        return False
+
+
+class PooledDatabaseWrapperMixin:
+    """Borrow physical connections from a ConnectionPool when settings_dict['POOL'] is set"""
+
+    def get_new_connection(self, conn_params):
+        options = self.settings_dict.get('POOL')
+        if not options:
+            return super().get_new_connection(conn_params)
+
+        connect = super().get_new_connection
+        pool = get_pool(
+            self.alias,
+            lambda: connect(conn_params),
+            options.get('max_size', 10),
+            options.get('timeout', 10),
+        )
+        while True:
+            try:
+                connection, reused = pool.checkout()
+            except PoolTimeout as e:
+                raise self.Database.OperationalError(str(e))
+            if not reused:
+                return connection
+            if _closed(connection) or (self.settings_dict['CONN_HEALTH_CHECKS'] and not _is_alive(connection)):
+                instrumentation.record(self.alias, 'health_check_failures')
+                pool.discard(connection)
+                continue
+            instrumentation.record(self.alias, 'reuses')
+            return connection
+
+    def _close(self):
+        options = self.settings_dict.get('POOL')
+        if not options or self.connection is None:
+            return super()._close()
+        pool = _pools.get(self.alias)
+        if pool is None:
+            return super()._close()
+        with self.wrap_database_errors:
+            pool.checkin(self.connection, discard=self.errors_occurred)
@@ -0,0 +1,157 @@
+"""
+Read-replica routing for investor browsing traffic.
+
+Views opt in with ``@replica_reads``; inside them, reads of REPLICA_MODELS go
+to the ``replica`` alias (configured from DATABASE_REPLICA_URL). Everything
+else - auth lookups, writes, and any view without the decorator - stays on
+``default``.
+
+Read-your-writes: views decorated with ``@pins_primary`` pin the caller
+(identified by bearer token or session cookie) to the primary for
+DATABASE_REPLICA_STICKY_SECONDS after a successful write, and a write made
+inside a replica_reads view sends the rest of that request's reads to the
+primary as well. Pins live in the Django cache, so they are shared between
+instances when CACHES points at Redis.
+"""
+
+import contextvars
+import hashlib
+import threading
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+
+REPLICA_ALIAS = 'replica'
+REPLICA_MODELS = {'pool', 'investment'}
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+_lock = threading.Lock()
+_stats = {'reads_primary': 0, 'reads_replica': 0, 'pinned_requests': 0, 'writes': 0}
+
+
+class _RoutingState:
+    __slots__ = ('use_replica', 'wrote')
+
+    def __init__(self, use_replica):
+        self.use_replica = use_replica
+        self.wrote = False
+
+
+def _count(counter):
+    with _lock:
+        _stats[counter] += 1
+
+
+def routing_stats():
+    with _lock:
+        snapshot = dict(_stats)
+    reads = snapshot['reads_primary'] + snapshot['reads_replica']
+    snapshot['replica_read_share'] = round(snapshot['reads_replica'] / reads, 4) if reads else None
+    snapshot['replica_configured'] = replica_configured()
+    return snapshot
+
+
+def replica_configured():
+    return REPLICA_ALIAS in settings.DATABASES
+
+
+def _pin_key(request):
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        identity = auth_header.split(' ', 1)[1]
+    else:
+        identity = request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+    if not identity:
+        return None
+    return 'db-pin:' + hashlib.sha256(identity.encode('utf-8')).hexdigest()[:32]
+
+
+def _is_success(response):
+    return 200 <= response.status_code < 400
+
+
+def replica_reads(view_func):
+    """Route this view's REPLICA_MODELS reads to the replica unless the caller is pinned"""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            use_replica = False
+            if replica_configured():
+                key = _pin_key(request)
+                pinned = key is not None and await cache.aget(key) is not None
+                if pinned:
+                    _count('pinned_requests')
+                use_replica = not pinned
+            token = _state.set(_RoutingState(use_replica))
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                _state.reset(token)
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        use_replica = False
+        if replica_configured():
+            key = _pin_key(request)
+            pinned = key is not None and cache.get(key) is not None
+            if pinned:
+                _count('pinned_requests')
+            use_replica = not pinned
+        token = _state.set(_RoutingState(use_replica))
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            _state.reset(token)
+    return wrapper
+
+
+def pins_primary(view_func):
+    """After a successful write, keep the caller's reads on the primary for a short window"""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if replica_configured() and _is_success(response):
+            key = _pin_key(request)
+            if key is not None:
+                cache.set(key, 1, settings.DATABASE_REPLICA_STICKY_SECONDS)
+        return response
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if (
+            state is not None
+            and state.use_replica
+            and not state.wrote
+            and model._meta.app_label == 'server'
+            and model._meta.model_name in REPLICA_MODELS
+        ):
+            _count('reads_replica')
+            return REPLICA_ALIAS
+        # Related-object loads follow the instance they hang off (Django's default).
+        instance = hints.get('instance')
+        db = instance._state.db if instance is not None and instance._state.db else 'default'
+        _count('reads_replica' if db == REPLICA_ALIAS else 'reads_primary')
+        return None
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        _count('writes')
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == REPLICA_ALIAS:
+            return False
+        return None
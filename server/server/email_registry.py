@@ -0,0 +1,184 @@
+"""
+Email availability across borrowers and investors.
+
+RegisteredEmail holds every account email, normalized, and signals.py keeps
+it current, so "is this email taken?" is at most one indexed lookup. The
+signup form asks again on every typing pause, so two layers sit in front:
+
+  filter  an in-process Bloom filter of registered emails. "Not in the
+          filter" is a definite no - most typeahead input (half-typed
+          addresses) is answered here without any I/O. Built in a background
+          thread when the worker starts (checks go to the cache and database
+          until it is ready), rebuilt every EMAIL_BLOOM_REBUILD_SECONDS, and
+          updated immediately for signups on this worker.
+  cache   answers from the database, kept for EMAIL_AVAILABLE_CACHE_SECONDS;
+          registering an email clears its entry.
+
+A signup made on another worker reaches this worker's filter at its next
+rebuild, and its cache entry (with the default per-process cache) at expiry.
+Until then validate_email may still say "available"; that check is advisory,
+and send_verification_email always asks the database.
+"""
+
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+
+from .models import RegisteredEmail
+
+
+def normalize_email(email):
+    return (email or '').strip().lower()
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on one blake2b digest)"""
+
+    def __init__(self, capacity, error_rate=0.01):
+        capacity = max(capacity, 1024)
+        self.size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.capacity = capacity
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+_lock = threading.Lock()
+_stats = {'filter': 0, 'cache': 0, 'db': 0}
+_filter = None
+_filter_built_at = 0.0
+_rebuilding = False
+_added_during_rebuild = []
+
+
+def _count(source):
+    with _lock:
+        _stats[source] += 1
+
+
+def _build_filter():
+    """Load every registered email into a new filter sized at twice the current count"""
+    built_at = time.monotonic()
+    bloom = BloomFilter(2 * RegisteredEmail.objects.count())
+    for email in RegisteredEmail.objects.values_list('email', flat=True).iterator(chunk_size=5000):
+        bloom.add(email)
+    return bloom, built_at
+
+
+def _rebuild_in_background():
+    global _filter, _filter_built_at, _rebuilding
+    try:
+        bloom, built_at = _build_filter()
+        with _lock:
+            # Signups on this worker during the build may be missing from its snapshot
+            for email in _added_during_rebuild:
+                bloom.add(email)
+            _filter, _filter_built_at = bloom, built_at
+    finally:
+        with _lock:
+            _added_during_rebuild.clear()
+            _rebuilding = False
+        connection.close()
+
+
+def _start_rebuild():
+    global _rebuilding
+    with _lock:
+        if _rebuilding:
+            return
+        _rebuilding = True
+    threading.Thread(target=_rebuild_in_background, daemon=True).start()
+
+
+def start_filter_build():
+    """Build this process's filter in the background; the WSGI/ASGI entry points call it at startup"""
+    if _filter is None:
+        _start_rebuild()
+
+
+def _current_filter():
+    """The process filter, or None until its first build finishes. Builds and
+    refreshes run in a background thread, so no request waits on the table scan."""
+    stale = _filter is None or time.monotonic() - _filter_built_at > settings.EMAIL_BLOOM_REBUILD_SECONDS
+    if stale and not _rebuilding:
+        _start_rebuild()
+    return _filter
+
+
+def _availability_cache_key(email):
+    # Hashed so arbitrary input never makes an invalid cache key
+    return 'email-registered:' + hashlib.sha256(email.encode()).hexdigest()
+
+
+def is_email_registered(email):
+    """Whether any account uses this email, answered by the filter, the cache or the database"""
+    email = normalize_email(email)
+    bloom = _current_filter()
+    if bloom is not None and email not in bloom:
+        _count('filter')
+        return False
+    key = _availability_cache_key(email)
+    registered = cache.get(key)
+    if registered is not None:
+        _count('cache')
+        return registered
+    _count('db')
+    registered = RegisteredEmail.objects.filter(email=email).exists()
+    cache.set(key, registered, settings.EMAIL_AVAILABLE_CACHE_SECONDS)
+    return registered
+
+
+async def ais_email_registered(email):
+    """Database-only check for async views (the guard before sending verification mail)"""
+    return await RegisteredEmail.objects.filter(email=normalize_email(email)).aexists()
+
+
+def email_registered(email):
+    """Make a just-registered email visible to this worker's filter and the cache"""
+    email = normalize_email(email)
+    with _lock:
+        if _filter is not None:
+            _filter.add(email)
+        if _rebuilding:
+            _added_during_rebuild.append(email)
+    cache.delete(_availability_cache_key(email))
+
+
+def email_released(email):
+    """Forget a cached answer for an email no account uses any more. The filter
+    can't drop it; checks for it just fall through to the cache and database."""
+    cache.delete(_availability_cache_key(normalize_email(email)))
+
+
+def availability_stats():
+    """Per-process count of checks answered by the filter, the cache and the database"""
+    with _lock:
+        snapshot = dict(_stats)
+        bloom, built_at = _filter, _filter_built_at
+    total = sum(snapshot.values())
+    snapshot['without_db_share'] = round((total - snapshot['db']) / total, 4) if total else None
+    if bloom is not None:
+        snapshot['filter_items'] = bloom.count
+        snapshot['filter_capacity'] = bloom.capacity
+        snapshot['filter_bytes'] = len(bloom.bits)
+        snapshot['filter_age_seconds'] = round(time.monotonic() - built_at, 1)
+    return snapshot
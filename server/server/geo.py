@@ -0,0 +1,309 @@
+"""
+Pool locations: offline geocoding from ZIP code centroids, and nearby /
+bounding-box queries over a geohash index.
+
+Geocoding needs no network: a pool is placed at the centroid of its 5-digit
+ZIP code, looked up in ZIP_CENTROIDS_FILE, the Census Bureau's ZCTA
+Gazetteer file (tab-separated, with GEOID, INTPTLAT and INTPTLONG columns;
+2020_Gaz_zcta_national.txt from census.gov, public domain). The file is
+read once per process. Without it, or for a ZIP code it doesn't list, the
+pool's location is left NULL and it doesn't appear in location queries; a
+missing file is reported by ``manage.py check`` (server.W001) and makes
+``manage.py geocode_pools`` fail. signals.py geocodes a pool whenever its
+zip_code is saved; ``manage.py geocode_pools`` does every pool, e.g. after
+the file changes.
+
+Alongside latitude and longitude, Pool.geohash stores the point's 50-bit
+geohash as an integer: longitude and latitude quantized to 25 bits each,
+interleaved (longitude first), the same bits as a 10-character base32
+geohash. A geohash cell of any size is then one contiguous integer range,
+so "pools in these cells" is a handful of range scans on the (status,
+geohash) index - on either database, with none of the collation questions
+a string prefix match raises.
+
+A radius or bounding-box query covers its box with at most MAX_CELLS cells
+at the finest depth that allows it, fetches (id, latitude, longitude) for
+the active pools in those ranges, and filters them exactly with NumPy
+(haversine for a radius). Only the page that is returned is loaded as
+pools.
+
+NumPy is imported on first use, as in underwriting.py.
+"""
+
+import logging
+import math
+import os
+import re
+from decimal import Decimal
+
+from django.conf import settings
+from django.core import checks
+from django.db import connection
+from django.db.models import Q
+
+from .models import Pool
+
+logger = logging.getLogger(__name__)
+
+BITS = 25  # per coordinate
+GEOHASH_BITS = 2 * BITS
+MAX_CELLS = 16
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+MAX_RADIUS_KM = 500
+BATCH = 50_000
+LOCATION_FIELDS = ('latitude', 'longitude', 'geohash')
+
+_ZIP = re.compile(r'\s*(\d{5})')
+_centroids = None
+
+
+def _load_centroids():
+    centroids = {}
+    try:
+        with open(settings.ZIP_CENTROIDS_FILE, encoding='utf-8') as f:
+            header = [name.strip() for name in f.readline().split('\t')]
+            zip_col, lat_col, lon_col = header.index('GEOID'), header.index('INTPTLAT'), header.index('INTPTLONG')
+            for line in f:
+                fields = line.split('\t')
+                centroids[fields[zip_col].strip()] = (float(fields[lat_col]), float(fields[lon_col]))
+    except (OSError, ValueError) as e:
+        logger.warning('No ZIP code centroids loaded from %s (%s); pools will not be geocoded',
+                       settings.ZIP_CENTROIDS_FILE, e)
+    return centroids
+
+
+def _loaded_centroids():
+    global _centroids
+    if _centroids is None:
+        _centroids = _load_centroids()
+    return _centroids
+
+
+def centroid_count():
+    """How many ZIP codes ZIP_CENTROIDS_FILE placed (0 when it is missing or unreadable)"""
+    return len(_loaded_centroids())
+
+
+def zip_centroid(zip_code):
+    """(latitude, longitude) of a ZIP code's centroid, or None"""
+    match = _ZIP.match(zip_code or '')
+    return _loaded_centroids().get(match.group(1)) if match else None
+
+
+@checks.register
+def check_zip_centroids(app_configs=None, **kwargs):
+    if os.path.isfile(settings.ZIP_CENTROIDS_FILE):
+        return []
+    return [checks.Warning(
+        f'ZIP_CENTROIDS_FILE {settings.ZIP_CENTROIDS_FILE} does not exist, so pools are not geocoded and '
+        'nearby and map searches find nothing.',
+        hint='Download the Census ZCTA Gazetteer file (2020_Gaz_zcta_national.txt) and point '
+             'ZIP_CENTROIDS_FILE at it, then run manage.py geocode_pools.',
+        id='server.W001',
+    )]
+
+
+def _spread(x):
+    """Move bit k of a 25-bit x to bit 2k (an int or a NumPy uint64 array)"""
+    x = (x | (x << 16)) & 0x0000FFFF0000FFFF
+    x = (x | (x << 8)) & 0x00FF00FF00FF00FF
+    x = (x | (x << 4)) & 0x0F0F0F0F0F0F0F0F
+    x = (x | (x << 2)) & 0x3333333333333333
+    return (x | (x << 1)) & 0x5555555555555555
+
+
+def _quantize(value, low, span):
+    return min(max(int((value - low) / span * (1 << BITS)), 0), (1 << BITS) - 1)
+
+
+def geohash(latitude, longitude):
+    """The 50-bit integer geohash of a point"""
+    return (_spread(_quantize(longitude, -180, 360)) << 1) | _spread(_quantize(latitude, -90, 180))
+
+
+def geohashes(latitudes, longitudes):
+    """geohash() over float arrays (int64 array)"""
+    import numpy as np
+
+    def quantize(values, low, span):
+        return np.clip(((values - low) / span * (1 << BITS)).astype(np.int64), 0, (1 << BITS) - 1).astype(np.uint64)
+
+    lon = _spread(quantize(longitudes, -180, 360))
+    lat = _spread(quantize(latitudes, -90, 180))
+    return ((lon << np.uint64(1)) | lat).astype(np.int64)
+
+
+def location(zip_code):
+    """{'latitude', 'longitude', 'geohash'} for a ZIP code, all None when it can't be placed"""
+    point = zip_centroid(zip_code)
+    if point is None:
+        return dict.fromkeys(LOCATION_FIELDS)
+    return dict(zip(LOCATION_FIELDS, (point[0], point[1], geohash(*point))))
+
+
+def geocode_pool(pool):
+    """Set the pool's location from its zip_code; returns the fields that changed"""
+    changed = []
+    for name, value in location(pool.zip_code).items():
+        if getattr(pool, name) != value:
+            setattr(pool, name, value)
+            changed.append(name)
+    return changed
+
+
+def _array(values):
+    return '{' + ','.join('NULL' if value is None else repr(value) for value in values) + '}'
+
+
+def _save(ids, latitudes, longitudes, hashes):
+    """Write locations back (NaN latitude: none), skipping pools whose stored location is the same"""
+    table = connection.ops.quote_name(Pool._meta.db_table)
+    rows = [(None, None, None, pk) if lat != lat else (lat, lon, code, pk)
+            for pk, lat, lon, code in zip(ids, latitudes, longitudes, hashes)]
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # Text array literals, as in underwriting._save()
+            cursor.execute(
+                f'UPDATE {table} AS pool SET latitude = v.lat, longitude = v.lon, geohash = v.geohash '
+                'FROM unnest(%s::float8[], %s::float8[], %s::bigint[], %s::bigint[]) AS v(lat, lon, geohash, id) '
+                'WHERE pool.id = v.id AND (pool.latitude, pool.longitude, pool.geohash) '
+                'IS DISTINCT FROM (v.lat, v.lon, v.geohash)',
+                [_array(column) for column in zip(*rows)],
+            )
+        else:
+            cursor.executemany(
+                f'UPDATE {table} SET latitude = %s, longitude = %s, geohash = %s WHERE id = %s '
+                'AND (latitude IS NOT %s OR longitude IS NOT %s OR geohash IS NOT %s)',
+                [(*row, *row[:3]) for row in rows],
+            )
+
+
+def geocode(pools=None):
+    """Geocode pools (a Pool queryset; default: every pool) in batches; returns how many were looked at"""
+    import numpy as np
+
+    if pools is None:
+        pools = Pool.objects.all()
+    pools = pools.order_by('id').values_list('id', 'zip_code')
+    count = last_id = 0
+    while True:
+        rows = list(pools.filter(id__gt=last_id)[:BATCH])
+        if not rows:
+            return count
+        points = np.array([zip_centroid(zip_code) or (np.nan, np.nan) for _, zip_code in rows], dtype=float)
+        hashes = geohashes(np.nan_to_num(points[:, 0]), np.nan_to_num(points[:, 1]))
+        _save([pk for pk, _ in rows], points[:, 0].tolist(), points[:, 1].tolist(), hashes.tolist())
+        count += len(rows)
+        last_id = rows[-1][0]
+
+
+def _cover(south, west, north, east):
+    """[(low, high)] geohash ranges covering the box, west <= east, in at most MAX_CELLS cells"""
+    for depth in range(GEOHASH_BITS, 0, -1):
+        # A cell at this depth keeps the top depth // 2 latitude bits and the rest longitude bits
+        lat_shift, lon_shift = BITS - depth // 2, BITS - (depth - depth // 2)
+        rows = range(_quantize(south, -90, 180) >> lat_shift, (_quantize(north, -90, 180) >> lat_shift) + 1)
+        cols = range(_quantize(west, -180, 360) >> lon_shift, (_quantize(east, -180, 360) >> lon_shift) + 1)
+        if len(rows) * len(cols) <= MAX_CELLS:
+            break
+    shift = GEOHASH_BITS - depth
+    cells = sorted(
+        ((_spread(col << lon_shift) << 1) | _spread(row << lat_shift)) >> shift
+        for row in rows for col in cols
+    )
+    ranges = []
+    for cell in cells:
+        if ranges and ranges[-1][1] == cell << shift:
+            ranges[-1] = (ranges[-1][0], (cell + 1) << shift)
+        else:
+            ranges.append((cell << shift, (cell + 1) << shift))
+    return ranges
+
+
+def _boxes(south, west, north, east):
+    """Split a box that crosses the antimeridian (west > east) in two"""
+    if west <= east:
+        return [(south, west, north, east)]
+    return [(south, west, north, 180.0), (south, -180.0, north, east)]
+
+
+def _candidates(boxes):
+    """(ids, latitudes, longitudes) arrays of the active pools in the boxes' geohash cells"""
+    import numpy as np
+
+    # status inside each term, so SQLite runs one index range scan per cell too
+    ranges = Q()
+    for box in boxes:
+        for low, high in _cover(*box):
+            ranges |= Q(status='active', geohash__gte=low, geohash__lt=high)
+    rows = list(Pool.objects.filter(ranges).order_by().values_list('id', 'latitude', 'longitude'))
+    data = np.array(rows, dtype=float).reshape(-1, 3)
+    return data[:, 0].astype(np.int64), data[:, 1], data[:, 2]
+
+
+def _number(params, name, low, high, default=None):
+    value = params.get(name)
+    if value in (None, ''):
+        if default is None:
+            raise ValueError(f'{name} is required')
+        return default
+    try:
+        number = float(Decimal(value))
+    except ArithmeticError:
+        raise ValueError(f'{name} must be a number')
+    if not low <= number <= high:
+        raise ValueError(f'{name} must be between {low} and {high}')
+    return number
+
+
+def nearby(params):
+    """[(pool_id, km)] of active pools within ?radiusKm= of ?lat=&lon=, nearest first.
+
+    Raises ValueError on a missing or bad parameter."""
+    import numpy as np
+
+    lat = _number(params, 'lat', -90, 90)
+    lon = _number(params, 'lon', -180, 180)
+    radius = _number(params, 'radiusKm', 0, MAX_RADIUS_KM, default=25)
+    dlat = radius / KM_PER_DEGREE
+    cos_lat = math.cos(math.radians(lat))
+    dlon = 180 if cos_lat < 1e-6 else min(radius / (KM_PER_DEGREE * cos_lat), 180)
+    south, north = max(lat - dlat, -90), min(lat + dlat, 90)
+    if dlon >= 180:
+        boxes = [(south, -180.0, north, 180.0)]
+    else:
+        west, east = (lon - dlon + 540) % 360 - 180, (lon + dlon + 540) % 360 - 180
+        boxes = _boxes(south, west, north, east)
+
+    ids, lats, lons = _candidates(boxes)
+    # Haversine
+    phi1, phi2 = math.radians(lat), np.radians(lats)
+    a = (np.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * np.cos(phi2) * np.sin(np.radians(lons - lon) / 2) ** 2)
+    km = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+    inside = km <= radius
+    ids, km = ids[inside], km[inside]
+    order = np.lexsort((-ids, km))  # nearest first, then newest
+    return list(zip(ids[order].tolist(), km[order].round(3).tolist()))
+
+
+def in_box(params):
+    """Ids of active pools inside ?south=&west=&north=&east=, newest first.
+
+    west > east means the box crosses the antimeridian. Raises ValueError on
+    a missing or bad parameter."""
+    import numpy as np
+
+    south = _number(params, 'south', -90, 90)
+    north = _number(params, 'north', -90, 90)
+    west = _number(params, 'west', -180, 180)
+    east = _number(params, 'east', -180, 180)
+    if south > north:
+        raise ValueError('south must not be above north')
+    boxes = _boxes(south, west, north, east)
+    ids, lats, lons = _candidates(boxes)
+    inside = np.zeros(len(ids), dtype=bool)
+    for s, w, n, e in boxes:
+        inside |= (lats >= s) & (lats <= n) & (lons >= w) & (lons <= e)
+    return np.sort(ids[inside])[::-1].tolist()
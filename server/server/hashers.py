@@ -0,0 +1,123 @@
+"""
+Password hashers with cost parameters taken from settings, and a bounded
+executor for checking passwords off the request thread.
+
+Each hasher keeps Django's algorithm name, so existing hashes keep
+verifying. When the configured cost differs from the one stored in a hash,
+must_update() is true and the login path re-hashes the password.
+"""
+
+import asyncio
+import base64
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return settings.PASSWORD_PBKDF2_ITERATIONS or hashers.PBKDF2PasswordHasher.iterations
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return settings.PASSWORD_SCRYPT_WORK_FACTOR or hashers.ScryptPasswordHasher.work_factor
+
+    @property
+    def block_size(self):
+        return settings.PASSWORD_SCRYPT_BLOCK_SIZE or hashers.ScryptPasswordHasher.block_size
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_SCRYPT_PARALLELISM or hashers.ScryptPasswordHasher.parallelism
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        # OpenSSL refuses more than 32 MiB unless maxmem says otherwise, which
+        # rules out N >= 2**15 at r=8; allow exactly what these parameters need
+        hash_ = hashlib.scrypt(
+            password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+            maxmem=128 * r * (n + p + 2), dklen=64,
+        )
+        hash_ = base64.b64encode(hash_).decode('ascii').strip()
+        return '%s$%d$%s$%d$%d$%s' % (self.algorithm, n, salt, r, p, hash_)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    """Needs argon2-cffi; only imported when an argon2 hash is made or checked"""
+
+    @property
+    def time_cost(self):
+        return settings.PASSWORD_ARGON2_TIME_COST or hashers.Argon2PasswordHasher.time_cost
+
+    @property
+    def memory_cost(self):
+        return settings.PASSWORD_ARGON2_MEMORY_COST or hashers.Argon2PasswordHasher.memory_cost
+
+    @property
+    def parallelism(self):
+        return settings.PASSWORD_ARGON2_PARALLELISM or hashers.Argon2PasswordHasher.parallelism
+
+
+class HasherBusy(Exception):
+    """Every hashing slot in this process is taken"""
+
+
+# Hashing is CPU-bound but releases the GIL (hashlib and argon2-cffi), so a
+# small thread pool runs checks in parallel while the event loop and the
+# sync view thread keep serving other requests. The semaphore caps running
+# plus queued checks; past that, logins are rejected instead of piling up.
+_executor = None
+_slots = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor, _slots
+    with _executor_lock:
+        if _executor is None:
+            workers = settings.PASSWORD_HASH_WORKERS
+            _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='password-hash')
+            _slots = threading.BoundedSemaphore(workers + settings.PASSWORD_HASH_QUEUE)
+    return _executor, _slots
+
+
+async def _run_bounded(func, *args):
+    executor, slots = _get_executor()
+    if not slots.acquire(blocking=False):
+        raise HasherBusy()
+    try:
+        return await asyncio.get_running_loop().run_in_executor(executor, func, *args)
+    finally:
+        slots.release()
+
+
+def _check(raw_password, encoded):
+    """Returns (matches, needs_upgrade)"""
+    outdated = []
+    matches = hashers.check_password(raw_password, encoded, setter=outdated.append)
+    return matches, bool(outdated)
+
+
+async def acheck_password(user, raw_password):
+    """Check raw_password against user.password_hash, re-hashing it if the hasher settings changed.
+
+    Raises HasherBusy when the process is already checking as many passwords
+    as PASSWORD_HASH_WORKERS + PASSWORD_HASH_QUEUE allow.
+    """
+    matches, needs_upgrade = await _run_bounded(_check, raw_password, user.password_hash)
+    if matches and needs_upgrade:
+        try:
+            user.password_hash = await _run_bounded(hashers.make_password, raw_password)
+        except HasherBusy:
+            return matches  # upgrade on a later login
+        await type(user).objects.filter(pk=user.pk).aupdate(password_hash=user.password_hash)
+    return matches
@@ -1,114 +1,341 @@
+from datetime import datetime
 from django.http import JsonResponse
 from django.db import connection
-from django.core.management import execute_from_command_line
-import sys
+from django.db.models import Q
+from django.conf import settings
+from django.core.cache import cache
+from django.views.decorators.csrf import csrf_exempt
+import base64
+import binascii
+import hmac
+import io
 import os
+import threading
+import time
+import uuid
+
+STATS_CACHE_KEY = 'health:database-stats'
+USER_TOTALS_CACHE_KEY = 'health:user-totals'
+
+def _ping_database():
+    """Run SELECT 1 and return its latency in milliseconds"""
+    start = time.perf_counter()
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1")
+    return round((time.perf_counter() - start) * 1000, 3)
+
+def estimate_row_counts(models):
+    """Approximate row counts without scanning the tables.
+
+    PostgreSQL: planner estimates from pg_class.reltuples. SQLite: MAX(id), which is an index lookup and exact
+    unless rows have been deleted. Models whose table is missing are left out.
+    """
+    tables = {model._meta.db_table: model for model in models}
+    estimates = {}
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # reltuples is -1 until the first ANALYZE; the stats collector's
+            # live-tuple counter covers that window.
+            cursor.execute(
+                "SELECT c.relname, COALESCE(NULLIF(c.reltuples, -1), s.n_live_tup)::bigint "
+                "FROM pg_class c LEFT JOIN pg_stat_user_tables s ON s.relid = c.oid "
+                "WHERE c.relkind IN ('r', 'p') AND c.relname = ANY(%s) AND pg_table_is_visible(c.oid)",
+                [list(tables)],
+            )
+            for table, estimate in cursor.fetchall():
+                estimates[tables[table]] = estimate
+        else:
+            existing = set(connection.introspection.table_names(cursor))
+            for table, model in tables.items():
+                if table not in existing:
+                    continue
+                pk = connection.ops.quote_name(model._meta.pk.column)
+                cursor.execute(f"SELECT MAX({pk}) FROM {connection.ops.quote_name(table)}")
+                estimates[model] = cursor.fetchone()[0] or 0
+    return estimates
+
+def _database_stats():
+    from .models import Borrower, Investor, Pool, AuthToken
+
+    stats = {'tables_exist': {}, 'database_info': {}}
+    try:
+        estimates = estimate_row_counts([Borrower, Investor, Pool, AuthToken])
+        for model in (Borrower, Investor, Pool, AuthToken):
+            stats['tables_exist'][model._meta.model_name] = {
+                'exists': model in estimates,
+                'count': estimates.get(model),
+            }
+    except Exception as e:
+        stats['tables_exist']['error'] = str(e)
 
-def database_health_check(request):
-    """Check database connectivity and run basic queries"""
     try:
-        # Test database connection
         with connection.cursor() as cursor:
-            cursor.execute("SELECT 1")
-            db_connected = True
+            if connection.vendor == 'postgresql':
+                cursor.execute("SELECT current_database(), version();")
+                db_name, db_version = cursor.fetchone()
+            else:
+                cursor.execute("SELECT sqlite_version();")
+                db_name, db_version = str(connection.settings_dict['NAME']), f"SQLite {cursor.fetchone()[0]}"
+            stats['database_info'] = {'database_name': db_name, 'database_version': db_version}
     except Exception as e:
-        return JsonResponse({
-            'database_connected': False,
-            'error': str(e)
-        }, status=500)
-    
-    # Test table existence and get counts
-    tables_exist = {}
+        stats['database_info']['error'] = str(e)
+    return stats
+
+def liveness_check(request):
+    """Liveness probe: one SELECT 1, nothing else"""
     try:
-        from .models import Borrower, Investor, Pool, AuthToken
-        
-        # Check if tables exist by trying to count records
-        tables_exist['borrower'] = {
-            'exists': True,
-            'count': Borrower.objects.count()
-        }
-        tables_exist['investor'] = {
-            'exists': True,
-            'count': Investor.objects.count()
-        }
-        tables_exist['pool'] = {
-            'exists': True,
-            'count': Pool.objects.count()
-        }
-        tables_exist['authtoken'] = {
-            'exists': True,
-            'count': AuthToken.objects.count()
-        }
-        
+        latency_ms = _ping_database()
     except Exception as e:
-        tables_exist['error'] = str(e)
-    
-    # Get database info
-    db_info = {}
+        return JsonResponse({'status': 'error', 'database_connected': False, 'error': str(e)}, status=503)
+    return JsonResponse({'status': 'ok', 'database_connected': True, 'latency_ms': latency_ms})
+
+def database_health_check(request):
+    """Readiness/stats probe.
+
+    Connectivity is checked on every call; table row estimates and server
+    info are cached for HEALTH_STATS_CACHE_SECONDS so frequent load-balancer
+    probes don't hit the catalog each time.
+    """
+    start = time.perf_counter()
     try:
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT current_database();")
-            db_name = cursor.fetchone()[0]
-            db_info['database_name'] = db_name
-            
-            cursor.execute("SELECT version();")
-            db_version = cursor.fetchone()[0]
-            db_info['database_version'] = db_version
-            
+        ping_ms = _ping_database()
     except Exception as e:
-        db_info['error'] = str(e)
-    
+        return JsonResponse({
+            'database_connected': False,
+            'error': str(e)
+        }, status=503)
+
+    stats = cache.get(STATS_CACHE_KEY)
+    cached = stats is not None
+    if not cached:
+        stats = _database_stats()
+        stats['collected_at'] = time.time()
+        cache.set(STATS_CACHE_KEY, stats, settings.HEALTH_STATS_CACHE_SECONDS)
+
     return JsonResponse({
-        'database_connected': db_connected,
-        'tables_exist': tables_exist,
+        'database_connected': True,
+        'tables_exist': stats['tables_exist'],
+        'counts_are_estimates': True,
         'database_url_set': bool(os.getenv('DATABASE_URL')),
         'debug_mode': os.getenv('DJANGO_DEBUG', 'False').lower() == 'true',
-        'database_info': db_info
+        'database_info': stats['database_info'],
+        'stats_cached': cached,
+        'stats_age_seconds': round(time.time() - stats['collected_at'], 3),
+        'ping_latency_ms': ping_ms,
+        'check_latency_ms': round((time.perf_counter() - start) * 1000, 3),
     })
 
+def _require_admin(request):
+    """Allow Django staff sessions or callers presenting ADMIN_API_TOKEN in X-Admin-Token"""
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return None
+    expected = settings.ADMIN_API_TOKEN
+    provided = request.headers.get('X-Admin-Token', '')
+    if expected and provided and hmac.compare_digest(provided, expected):
+        return None
+    return JsonResponse({'error': 'Admin authentication required'}, status=403)
+
+USER_PAGE_DEFAULT = 50
+USER_PAGE_MAX = 200
+
+def _user_fields(role):
+    if role == 'borrower':
+        return ('id', 'email', 'first_name', 'middle_name', 'last_name', 'email_verified', 'created_at', 'date_of_birth')
+    return ('id', 'email', 'full_name', 'email_verified', 'created_at', 'date_of_birth')
+
+def _encode_cursor(row):
+    raw = f"{row['created_at'].isoformat()}|{row['id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def _decode_cursor(cursor):
+    padded = cursor + '=' * (-len(cursor) % 4)
+    created_at, row_id = base64.urlsafe_b64decode(padded.encode()).decode().rsplit('|', 1)
+    return datetime.fromisoformat(created_at), int(row_id)
+
+def _approx_user_totals():
+    from .models import Borrower, Investor
+
+    totals = cache.get(USER_TOTALS_CACHE_KEY)
+    if totals is None:
+        estimates = estimate_row_counts([Borrower, Investor])
+        totals = {'borrower': estimates.get(Borrower), 'investor': estimates.get(Investor)}
+        cache.set(USER_TOTALS_CACHE_KEY, totals, settings.HEALTH_STATS_CACHE_SECONDS)
+    return totals
+
 def list_users(request):
-    """List all users in the database for debugging"""
+    """Admin-only paged user browser.
+
+    GET /api/health/users?role=borrower|investor&limit=50&cursor=...&email=prefix
+    Pages newest first using keyset pagination on (created_at, id), so deep
+    pages cost the same as the first one. Only the listed columns are read.
+    """
+    denied = _require_admin(request)
+    if denied:
+        return denied
+
+    from .models import Borrower, Investor
+
+    role = request.GET.get('role', 'borrower')
+    if role not in ('borrower', 'investor'):
+        return JsonResponse({'error': 'role must be borrower or investor'}, status=400)
     try:
-        from .models import Borrower, Investor
-        
-        # Get all borrowers
-        borrowers = []
-        for b in Borrower.objects.all().order_by('-created_at')[:10]:  # Last 10
-            borrowers.append({
-                'id': b.id,
-                'email': b.email,
-                'full_name': b.full_name,
-                'created_at': b.created_at.isoformat(),
-                'date_of_birth': b.date_of_birth.isoformat()
-            })
-        
-        # Get all investors
-        investors = []
-        for i in Investor.objects.all().order_by('-created_at')[:10]:  # Last 10
-            investors.append({
-                'id': i.id,
-                'email': i.email,
-                'full_name': i.full_name,
-                'created_at': i.created_at.isoformat(),
-                'date_of_birth': i.date_of_birth.isoformat()
-            })
-        
-        return JsonResponse({
-            'borrowers': borrowers,
-            'investors': investors,
-            'total_borrowers': Borrower.objects.count(),
-            'total_investors': Investor.objects.count()
-        })
-        
+        limit = min(max(int(request.GET.get('limit', USER_PAGE_DEFAULT)), 1), USER_PAGE_MAX)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+
+    model = Borrower if role == 'borrower' else Investor
+    queryset = model.objects.order_by('-created_at', '-id')
+
+    email_prefix = (request.GET.get('email') or '').strip().lower()
+    if email_prefix:
+        # Emails are stored lowercased; served by the unique email index.
+        queryset = queryset.filter(email__startswith=email_prefix)
+
+    cursor = request.GET.get('cursor')
+    if cursor:
+        try:
+            created_at, row_id = _decode_cursor(cursor)
+        except (ValueError, UnicodeDecodeError, binascii.Error):
+            return JsonResponse({'error': 'Invalid cursor'}, status=400)
+        queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=row_id))
+
+    try:
+        rows = list(queryset.values(*_user_fields(role))[:limit + 1])
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
 
-def force_migrate(request):
-    """Force run migrations - only use in development"""
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    users = []
+    for row in rows:
+        if role == 'borrower':
+            names = [row['first_name'], row['middle_name'], row['last_name']]
+            full_name = ' '.join(name for name in names if name)
+        else:
+            full_name = row['full_name']
+        users.append({
+            'id': row['id'],
+            'email': row['email'],
+            'full_name': full_name,
+            'email_verified': row['email_verified'],
+            'created_at': row['created_at'].isoformat(),
+            'date_of_birth': row['date_of_birth'].isoformat()
+        })
+
+    return JsonResponse({
+        'role': role,
+        'users': users,
+        'next_cursor': _encode_cursor(rows[-1]) if has_more else None,
+        'approx_total': _approx_user_totals()[role],
+    })
+
+def connection_stats(request):
+    """Report per-process connection reuse, handshake latency and replica read share"""
+    denied = _require_admin(request)
+    if denied:
+        return denied
+
+    from .db.instrumentation import connection_stats as get_connection_stats
+    from .db.pool import pool_stats
+    from .db.routers import routing_stats
+
+    return JsonResponse({
+        'pid': os.getpid(),
+        'pool_mode': os.getenv('DB_POOL_MODE', 'off').lower(),
+        'connections': get_connection_stats(),
+        'pools': pool_stats(),
+        'routing': routing_stats(),
+    })
+
+def ratelimit_stats(request):
+    """Report per-process allowed/throttled counts for each rate-limited scope"""
+    denied = _require_admin(request)
+    if denied:
+        return denied
+
+    from .ratelimit import throttle_stats
+
+    return JsonResponse({
+        'pid': os.getpid(),
+        'enabled': settings.RATELIMIT_ENABLED,
+        'backend': settings.RATELIMIT_BACKEND,
+        'buckets': throttle_stats(),
+    })
+
+def email_availability_stats(request):
+    """Report how validate_email checks were answered: Bloom filter, cache or database"""
+    denied = _require_admin(request)
+    if denied:
+        return denied
+
+    from .email_registry import availability_stats
+
+    return JsonResponse({'pid': os.getpid(), 'checks': availability_stats()})
+
+# Migration jobs live in the cache so any worker can report on them (set
+# REDIS_URL when running more than one); finished jobs expire after a day and a
+# running marker left behind by a dead worker after an hour. migrate_if_needed's
+# advisory lock still keeps two instances from migrating at once.
+MIGRATION_JOB_KEY = 'health:migrate-job:{}'
+MIGRATION_RUNNING_KEY = 'health:migrate-running'
+MIGRATION_JOB_SECONDS = 24 * 60 * 60
+MIGRATION_RUNNING_SECONDS = 60 * 60
+
+def _run_migration_job(job):
+    from .db.migrate import migrate_if_needed
+
+    output = io.StringIO()
     try:
-        # This is dangerous in production, only for debugging
-        os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
-        execute_from_command_line(['manage.py', 'migrate'])
-        return JsonResponse({'success': True, 'message': 'Migrations completed'})
+        pending = migrate_if_needed(stdout=output)
+        job.update(status='succeeded', applied=[f'{app}.{name}' for app, name in pending])
     except Exception as e:
-        return JsonResponse({'success': False, 'error': str(e)}, status=500)
+        job.update(status='failed', error=str(e))
+    finally:
+        job['output'] = output.getvalue()[-4000:]
+        job['finished_at'] = time.time()
+        cache.set(MIGRATION_JOB_KEY.format(job['id']), job, MIGRATION_JOB_SECONDS)
+        if cache.get(MIGRATION_RUNNING_KEY) == job['id']:
+            cache.delete(MIGRATION_RUNNING_KEY)
+        connection.close()
+
+@csrf_exempt
+def force_migrate(request):
+    """Run pending migrations in a background thread.
+
+    POST starts a job (or returns the one already running) with 202.
+    GET ?job=<id> reports a job; GET without a job lists pending migrations.
+    """
+    denied = _require_admin(request)
+    if denied:
+        return denied
+
+    from .db.migrate import pending_migrations
+
+    if request.method == 'GET':
+        job_id = request.GET.get('job')
+        if job_id:
+            job = cache.get(MIGRATION_JOB_KEY.format(job_id))
+            if job is None:
+                return JsonResponse({'error': 'Job not found'}, status=404)
+            return JsonResponse(job)
+        try:
+            pending = pending_migrations()
+        except Exception as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=500)
+        return JsonResponse({'pending': [f'{app}.{name}' for app, name in pending]})
+
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    job = {'id': uuid.uuid4().hex, 'status': 'running', 'started_at': time.time()}
+    cache.set(MIGRATION_JOB_KEY.format(job['id']), job, MIGRATION_JOB_SECONDS)
+    # add() is atomic, so only one worker's job becomes the running one
+    if not cache.add(MIGRATION_RUNNING_KEY, job['id'], MIGRATION_RUNNING_SECONDS):
+        cache.delete(MIGRATION_JOB_KEY.format(job['id']))
+        running = cache.get(MIGRATION_JOB_KEY.format(cache.get(MIGRATION_RUNNING_KEY)))
+        if running is not None:
+            return JsonResponse(running, status=202)
+        return JsonResponse({'error': 'A migration job is already running'}, status=409)
+    threading.Thread(target=_run_migration_job, args=(dict(job),), daemon=True).start()
+    return JsonResponse(job, status=202)
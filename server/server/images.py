@@ -0,0 +1,46 @@
+"""
+Thumbnail rendering for property photos, run in worker processes.
+
+Nothing here imports Django: photos.py hands render() to a process pool
+whose workers only need Pillow, so they start quickly and stay small.
+"""
+
+import io
+import math
+
+from PIL import Image, ImageOps
+
+# Longest edge in pixels for each size; every size is written in every format
+SIZES = {'large': 1600, 'medium': 800, 'small': 320}
+FORMATS = {
+    # method 2 encodes ~2.5x faster than the default 4 for ~2% larger files
+    'webp': ('WEBP', {'quality': 80, 'method': 2}),
+    'jpeg': ('JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+EXTENSIONS = {'webp': '.webp', 'jpeg': '.jpg'}
+
+
+def init_worker():
+    """Process pool initializer: register Pillow's codecs once per worker rather than per photo"""
+    Image.init()
+
+
+def render(source):
+    """Decode a photo (a path or bytes) and return {(size, format): encoded bytes} for SIZES x FORMATS"""
+    with Image.open(source if isinstance(source, str) else io.BytesIO(source)) as original:
+        # JPEGs can decode straight at 1/2, 1/4 or 1/8 scale; ask for the
+        # largest output size (same aspect ratio) and let it pick the cheapest
+        scale = SIZES['large'] / max(original.size)
+        if scale < 1:
+            original.draft('RGB', (math.ceil(original.width * scale), math.ceil(original.height * scale)))
+        image = ImageOps.exif_transpose(original).convert('RGB')
+
+    rendered = {}
+    # Largest first, each size scaled down from the one before
+    for size, edge in sorted(SIZES.items(), key=lambda item: -item[1]):
+        image.thumbnail((edge, edge), Image.LANCZOS, reducing_gap=3.0)
+        for fmt, (pil_format, options) in FORMATS.items():
+            buffer = io.BytesIO()
+            image.save(buffer, pil_format, **options)
+            rendered[size, fmt] = buffer.getvalue()
+    return rendered
@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from server.uploads import expire_stale_uploads
+
+
+class Command(BaseCommand):
+    help = "Abort chunked uploads that have been idle too long and delete their staging files."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=float, default=24, help='Idle time before an upload is abandoned (default 24)')
+
+    def handle(self, *args, **options):
+        count = expire_stale_uploads(timedelta(hours=options['hours']))
+        self.stdout.write(f'Aborted {count} stale upload(s)')
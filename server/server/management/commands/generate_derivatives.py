@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from server.models import StoredFile
+from server.photos import generate_derivatives
+
+
+class Command(BaseCommand):
+    help = (
+        "Render thumbnails for property photos that don't have them yet (pending, "
+        "or never queued). --retry-failed includes photos that failed before."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry photos whose rendering failed')
+
+    def handle(self, *args, **options):
+        skip = ['ready'] if options['retry_failed'] else ['ready', 'failed']
+        photos = (StoredFile.objects.filter(uploads__kind='property_photo')
+                  .exclude(derivatives_status__in=skip).distinct().only('id', 'name'))
+        start = time.perf_counter()
+        ready, failed = generate_derivatives(photos.iterator())
+        elapsed = time.perf_counter() - start
+        rate = ready / elapsed if elapsed else 0
+        self.stdout.write(f'Rendered {ready} photo(s), {failed} failed, in {elapsed:.1f} s ({rate:.1f}/s)')
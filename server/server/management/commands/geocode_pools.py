@@ -0,0 +1,28 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from server.geo import centroid_count, geocode
+from server.models import Pool
+
+
+class Command(BaseCommand):
+    help = (
+        "Place every pool at its ZIP code's centroid from ZIP_CENTROIDS_FILE "
+        "(--pool ID: just one). Run after installing or updating the file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pool', type=int, help='Only this pool')
+
+    def handle(self, *args, **options):
+        if not centroid_count():
+            raise CommandError(f'No ZIP code centroids loaded from {settings.ZIP_CENTROIDS_FILE}; '
+                               'set ZIP_CENTROIDS_FILE to the Census ZCTA Gazetteer file')
+        pools = Pool.objects.filter(pk=options['pool']) if options['pool'] is not None else None
+        start = time.perf_counter()
+        count = geocode(pools)
+        elapsed = time.perf_counter() - start
+        located = (pools if pools is not None else Pool.objects).filter(geohash__isnull=False).count()
+        self.stdout.write(f'Geocoded {count} pool(s) in {elapsed:.1f} s; {located} have a location')
@@ -0,0 +1,35 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from server.db.migrate import migrate_if_needed, pending_migrations
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply migrations only if some are pending, holding an advisory lock so "
+        "concurrent instances don't race. --check only reports and exits 1 if pending."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument('--check', action='store_true', help='Exit with status 1 if migrations are pending')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        if options['check']:
+            pending = pending_migrations(options['database'])
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if pending:
+                names = ', '.join(f'{app}.{name}' for app, name in pending)
+                raise CommandError(f'{len(pending)} pending migration(s): {names}')
+            self.stdout.write(f'Migrations up to date ({elapsed_ms:.1f} ms)')
+            return
+
+        applied = migrate_if_needed(options['database'], stdout=self.stdout)
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        if applied:
+            self.stdout.write(self.style.SUCCESS(f'Applied pending migrations in {elapsed_ms:.1f} ms'))
+        else:
+            self.stdout.write(f'Migrations up to date ({elapsed_ms:.1f} ms)')
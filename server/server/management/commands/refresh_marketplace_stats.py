@@ -0,0 +1,18 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from server.stats import refresh
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the marketplace summary behind /api/stats from every pool and investment. "
+        "Signals keep it current; run this on a schedule to correct writes that bypass them."
+    )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rows = refresh()
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'Refreshed {rows} summary row(s) in {elapsed:.1f} s')
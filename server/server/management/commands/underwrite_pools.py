@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from server.models import Pool
+from server.underwriting import underwrite
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute LTV, CLTV, equity available and DTI for every active pool "
+        "(--all: every pool; --pool ID: just one)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Include pools that are not active')
+        parser.add_argument('--pool', type=int, help='Only this pool')
+
+    def handle(self, *args, **options):
+        if options['pool'] is not None:
+            pools = Pool.objects.filter(pk=options['pool'])
+        elif options['all']:
+            pools = Pool.objects.all()
+        else:
+            pools = Pool.objects.filter(status='active')
+        start = time.perf_counter()
+        count = underwrite(pools)
+        elapsed = time.perf_counter() - start
+        self.stdout.write(f'Underwrote {count} pool(s) in {elapsed:.1f} s')
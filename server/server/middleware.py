@@ -0,0 +1,139 @@
+from importlib import import_module
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.core.exceptions import MiddlewareNotUsed
+from django.core.handlers.exception import convert_exception_to_response
+from django.utils.module_loading import import_string
+from whitenoise.middleware import WhiteNoiseMiddleware as BaseWhiteNoiseMiddleware
+
+
+class WhiteNoiseMiddleware(BaseWhiteNoiseMiddleware):
+    """WhiteNoise that can sit in an async middleware chain.
+
+    WhiteNoise 6.6 only declares sync support, which makes Django run every
+    request under ASGI through a single sync thread and defeats async views.
+    Static file lookup is an in-memory dict hit, so it is safe to do inline.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=None):
+        if settings is None:
+            super().__init__(get_response)
+        else:
+            super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = self.find_file(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return self.serve(static_file, request)
+        return await self.get_response(request)
+
+
+class RouteAwareMiddleware:
+    """Runs settings.BROWSER_MIDDLEWARE only for requests that need it.
+
+    Token-authenticated API calls (``/api/`` plus ``Authorization: Bearer``)
+    never use the session cookie, CSRF protection, flash messages or static
+    files, so they skip that part of the stack: no session row is loaded
+    and no cookie is re-saved. Everything else, including /admin/ and
+    cookie-session API calls, goes through the full chain as before.
+
+    Lean requests get an empty, unsaved session and an anonymous user, so
+    views that touch request.session or request.user keep working; a bad
+    bearer token therefore does not fall back to the session cookie.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        self.process_view = self._aprocess_view if self.async_mode else self._process_view
+
+        # Build the browser chain around the same downstream handler; every
+        # middleware in it supports both modes, so no adapting is needed.
+        self._view_middleware = []
+        self._exception_middleware = []
+        handler = convert_exception_to_response(get_response)
+        for middleware_path in reversed(settings.BROWSER_MIDDLEWARE):
+            try:
+                mw_instance = import_string(middleware_path)(handler)
+            except MiddlewareNotUsed:
+                continue
+            if hasattr(mw_instance, 'process_view'):
+                self._view_middleware.insert(0, mw_instance.process_view)
+            if hasattr(mw_instance, 'process_exception'):
+                self._exception_middleware.append(mw_instance.process_exception)
+            handler = convert_exception_to_response(mw_instance)
+        self.browser_chain = handler
+
+        self.session_store = import_module(settings.SESSION_ENGINE).SessionStore
+
+    def is_lean(self, request):
+        return (
+            request.path_info.startswith('/api/')
+            and request.headers.get('Authorization', '').startswith('Bearer ')
+        )
+
+    def _prepare(self, request):
+        lean = self.is_lean(request)
+        request.browser_middleware = not lean
+        if lean:
+            request.session = self.session_store()
+            request.user = AnonymousUser()
+        return lean
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        if self._prepare(request):
+            return self.get_response(request)
+        return self.browser_chain(request)
+
+    async def __acall__(self, request):
+        if self._prepare(request):
+            return await self.get_response(request)
+        return await self.browser_chain(request)
+
+    def _process_view(self, request, view_func, view_args, view_kwargs):
+        if not getattr(request, 'browser_middleware', False):
+            return None
+        for method in self._view_middleware:
+            response = method(request, view_func, view_args, view_kwargs)
+            if response:
+                return response
+        return None
+
+    async def _aprocess_view(self, request, view_func, view_args, view_kwargs):
+        # CsrfViewMiddleware.process_view is sync; Django would run it the
+        # same way, and lean requests never reach it
+        if not getattr(request, 'browser_middleware', False):
+            return None
+        return await sync_to_async(self._process_view, thread_sensitive=True)(
+            request, view_func, view_args, view_kwargs
+        )
+
+    def process_exception(self, request, exception):
+        if not getattr(request, 'browser_middleware', False):
+            return None
+        for method in self._exception_middleware:
+            response = method(request, exception)
+            if response:
+                return response
+        return None
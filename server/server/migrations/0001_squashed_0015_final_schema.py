@@ -0,0 +1,162 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:23
+#
+# Squash of 0001-0015: creates the current schema, indexes included, in one
+# step. Fresh databases (including every test database) apply only this;
+# databases that already ran the originals just record it as applied.
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    replaces = [('server', '0001_initial'), ('server', '0002_investor'), ('server', '0003_pool'), ('server', '0004_authtoken'), ('server', '0005_investment'), ('server', '0006_remove_borrower_full_name_borrower_first_name_and_more'), ('server', '0007_pool_address_line_1_pool_address_line_2_and_more'), ('server', '0008_pool_co_owners_pool_existing_loans_and_more'), ('server', '0009_pool_is_custom_term_pool_loan_type'), ('server', '0010_add_liabilities_field'), ('server', '0011_pool_term_months'), ('server', '0012_alter_pool_ssn'), ('server', '0013_add_email_verification'), ('server', '0014_emailverification_and_more'), ('server', '0015_user_created_id_indexes')]
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Borrower',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_name', models.CharField(max_length=100)),
+                ('middle_name', models.CharField(blank=True, max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('phone', models.CharField(max_length=20)),
+                ('date_of_birth', models.DateField()),
+                ('password_hash', models.CharField(max_length=128)),
+                ('email_verified', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='borrower_created_id_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Investor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('full_name', models.CharField(max_length=255)),
+                ('email', models.EmailField(max_length=254, unique=True)),
+                ('date_of_birth', models.DateField()),
+                ('phone', models.CharField(max_length=20)),
+                ('ssn', models.CharField(max_length=11)),
+                ('address1', models.CharField(max_length=255)),
+                ('address2', models.CharField(blank=True, max_length=255)),
+                ('city', models.CharField(max_length=100)),
+                ('state', models.CharField(max_length=50)),
+                ('zip_code', models.CharField(max_length=10)),
+                ('country', models.CharField(default='United States', max_length=100)),
+                ('password_hash', models.CharField(max_length=128)),
+                ('email_verified', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-created_at', '-id'], name='investor_created_id_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='AuthToken',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('token', models.CharField(max_length=255, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('borrower', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='server.borrower')),
+                ('investor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to='server.investor')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='EmailVerification',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.EmailField(max_length=254)),
+                ('code', models.CharField(max_length=6)),
+                ('user_type', models.CharField(choices=[('borrower', 'Borrower'), ('investor', 'Investor')], max_length=10)),
+                ('user_data', models.JSONField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField()),
+                ('verified', models.BooleanField(default=False)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Pool',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('pool_type', models.CharField(choices=[('equity', 'Equity Pool'), ('refinance', 'Refinance Pool')], max_length=20)),
+                ('status', models.CharField(choices=[('draft', 'Draft'), ('active', 'Active'), ('funded', 'Funded'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='draft', max_length=20)),
+                ('first_name', models.CharField(max_length=100)),
+                ('middle_name', models.CharField(blank=True, max_length=100)),
+                ('last_name', models.CharField(max_length=100)),
+                ('email', models.EmailField(max_length=254)),
+                ('phone', models.CharField(max_length=20)),
+                ('date_of_birth', models.DateField()),
+                ('prior_first_name', models.CharField(blank=True, max_length=100)),
+                ('prior_middle_name', models.CharField(blank=True, max_length=100)),
+                ('prior_last_name', models.CharField(blank=True, max_length=100)),
+                ('ssn', models.CharField(help_text='Social Security Number for identity verification', max_length=15)),
+                ('fico_score', models.PositiveIntegerField(blank=True, help_text='Credit score (optional)', null=True)),
+                ('address_line_1', models.CharField(help_text='Street address line 1', max_length=255)),
+                ('address_line_2', models.CharField(blank=True, help_text='Street address line 2 (optional)', max_length=255)),
+                ('mailing_city', models.CharField(help_text='City', max_length=100)),
+                ('mailing_state', models.CharField(help_text='State', max_length=50)),
+                ('mailing_zip_code', models.CharField(help_text='ZIP code', max_length=10)),
+                ('mailing_country', models.CharField(default='United States', max_length=100)),
+                ('address_line', models.CharField(max_length=255)),
+                ('city', models.CharField(max_length=100)),
+                ('state', models.CharField(max_length=50)),
+                ('zip_code', models.CharField(max_length=10)),
+                ('country', models.CharField(default='United States', max_length=100)),
+                ('primary_address_choice', models.CharField(blank=True, help_text='Primary residence choice: primary, vacant, tenant, owner-occupied', max_length=50, null=True)),
+                ('percent_owned', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('co_owner', models.CharField(blank=True, max_length=255, null=True)),
+                ('co_owners', models.JSONField(blank=True, default=list, help_text='List of co-owner information')),
+                ('property_value', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('property_link', models.URLField(blank=True, null=True)),
+                ('property_links', models.JSONField(blank=True, default=list, help_text='List of property links')),
+                ('mortgage_balance', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('existing_loans', models.JSONField(blank=True, default=list, help_text='List of existing loans on property')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('roi_rate', models.DecimalField(decimal_places=2, max_digits=5)),
+                ('loan_type', models.CharField(blank=True, choices=[('interest-only', 'Interest-Only'), ('maturity', 'Maturity')], max_length=20, null=True)),
+                ('term', models.CharField(choices=[('6', '6 Months'), ('12', '12 Months'), ('24', '24 Months'), ('custom', 'Custom')], default='12', max_length=10)),
+                ('term_months', models.PositiveIntegerField(blank=True, null=True)),
+                ('is_custom_term', models.BooleanField(default=False)),
+                ('custom_term_months', models.PositiveIntegerField(blank=True, null=True)),
+                ('other_property_loans', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('credit_card_debt', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('monthly_debt_payments', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('liabilities', models.JSONField(blank=True, default=list, help_text='Array of liability objects with type, amount, monthlyPayment, remainingBalance')),
+                ('home_insurance_doc', models.CharField(blank=True, max_length=500, null=True)),
+                ('tax_return_doc', models.CharField(blank=True, max_length=500, null=True)),
+                ('appraisal_doc', models.CharField(blank=True, max_length=500, null=True)),
+                ('property_photos', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('borrower', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pools', to='server.borrower')),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Investment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('active', 'Active'), ('completed', 'Completed'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('invested_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('investor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='investments', to='server.investor')),
+                ('pool', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='investments', to='server.pool')),
+            ],
+            options={
+                'ordering': ['-invested_at'],
+                'unique_together': {('investor', 'pool')},
+            },
+        ),
+    ]
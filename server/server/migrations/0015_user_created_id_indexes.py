@@ -0,0 +1,21 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('server', '0014_emailverification_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='borrower',
+            index=models.Index(fields=['-created_at', '-id'], name='borrower_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='investor',
+            index=models.Index(fields=['-created_at', '-id'], name='investor_created_id_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:34
+
+from django.db import migrations, models
+
+
+def backfill_registered_emails(apps, schema_editor):
+    """Copy existing borrower and investor emails into the registry, normalized"""
+    RegisteredEmail = apps.get_model('server', 'RegisteredEmail')
+    for role, model_name in (('borrower', 'Borrower'), ('investor', 'Investor')):
+        Model = apps.get_model('server', model_name)
+        rows = Model.objects.values_list('id', 'email').order_by('id').iterator(chunk_size=2000)
+        batch = []
+        for user_id, email in rows:
+            batch.append(RegisteredEmail(email=email.strip().lower(), role=role, user_id=user_id))
+            if len(batch) >= 2000:
+                RegisteredEmail.objects.bulk_create(batch)
+                batch = []
+        RegisteredEmail.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('server', '0001_squashed_0015_final_schema'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RegisteredEmail',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email', models.CharField(max_length=254)),
+                ('role', models.CharField(choices=[('borrower', 'Borrower'), ('investor', 'Investor')], max_length=10)),
+                ('user_id', models.BigIntegerField()),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='registeredemail',
+            index=models.Index(fields=['email'], name='registered_email_email_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='registeredemail',
+            constraint=models.UniqueConstraint(fields=('role', 'user_id'), name='registered_email_role_user_uniq'),
+        ),
+        migrations.RunPython(backfill_registered_emails, migrations.RunPython.noop),
+    ]
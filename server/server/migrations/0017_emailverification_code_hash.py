@@ -0,0 +1,41 @@
+from django.db import migrations, models
+from django.utils.crypto import salted_hmac
+
+
+def hash_pending_codes(apps, schema_editor):
+    """Replace plaintext codes with their HMAC so codes already emailed keep working"""
+    EmailVerification = apps.get_model('server', 'EmailVerification')
+    for verification in EmailVerification.objects.filter(verified=False).iterator():
+        message = f'{verification.email}:{verification.user_type}:{verification.code}'
+        verification.code_hash = salted_hmac('server.EmailVerification', message, algorithm='sha256').hexdigest()
+        verification.save(update_fields=['code_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('server', '0016_registered_email'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailverification',
+            name='code_hash',
+            field=models.CharField(default='', max_length=64),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='emailverification',
+            name='attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.RunPython(hash_pending_codes, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='emailverification',
+            name='code',
+        ),
+        migrations.AddIndex(
+            model_name='emailverification',
+            index=models.Index(fields=['email', 'user_type'], name='emailverif_email_type_idx'),
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('server', '0018_uploads'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='storedfile',
+            name='derivatives',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+        migrations.AddField(
+            model_name='storedfile',
+            name='derivatives_status',
+            field=models.CharField(blank=True, choices=[('', 'Not a photo'), ('pending', 'Pending'), ('ready', 'Ready'), ('failed', 'Failed')], default='', max_length=10),
+        ),
+        migrations.AddIndex(
+            model_name='storedfile',
+            index=models.Index(fields=['name'], name='stored_file_name_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('server', '0019_photo_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='upload',
+            name='direct',
+            field=models.BooleanField(default=False),
+        ),
+    ]
@@ -0,0 +1,222 @@
+# Generated by Django 4.2.23 on 2026-10-19 13:56
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import migrations, models, transaction
+import django.db.models.deletion
+from django.utils.dateparse import parse_datetime
+
+BATCH = 500
+CENTS = Decimal('0.01')
+
+
+# A frozen copy of server.pool_children as it was when this migration was
+# written; later changes there must not change what this backfill does.
+
+def _decimal(value, max_digits=12):
+    if isinstance(value, str):
+        value = value.replace('$', '').replace(',', '').strip()
+    if value is None or value == '' or isinstance(value, bool):
+        return None
+    try:
+        value = Decimal(str(value)).quantize(CENTS)
+    except (InvalidOperation, ValueError):
+        return None
+    return value if value.is_finite() and abs(value) < 10 ** (max_digits - 2) else None
+
+
+def _text(value, max_length):
+    return value.strip()[:max_length] if isinstance(value, str) else ''
+
+
+def _co_owner(entry):
+    return isinstance(entry, dict) and {
+        'first_name': _text(entry.get('firstName'), 100),
+        'middle_name': _text(entry.get('middleName'), 100),
+        'last_name': _text(entry.get('lastName'), 100),
+        'percentage': _decimal(entry.get('percentage'), max_digits=5),
+    }
+
+
+def _existing_loan(entry):
+    return isinstance(entry, dict) and {
+        'loan_amount': _decimal(entry.get('loan_amount')),
+        'remaining_balance': _decimal(entry.get('remaining_balance')),
+    }
+
+
+def _liability(entry):
+    return isinstance(entry, dict) and {
+        'type': _text(entry.get('type'), 100),
+        'amount': _decimal(entry.get('amount')),
+        'monthly_payment': _decimal(entry.get('monthlyPayment')),
+        'remaining_balance': _decimal(entry.get('remainingBalance')),
+    }
+
+
+def _link(entry):
+    if not isinstance(entry, dict):
+        return None
+    url = _text(entry.get('url'), 500)
+    try:
+        added_at = parse_datetime(entry['added_at'])
+    except (KeyError, TypeError, ValueError):
+        added_at = None
+    return url and {'url': url, 'type': _text(entry.get('type'), 20), 'added_at': added_at}
+
+
+def _photo(name):
+    return isinstance(name, str) and name and {'name': name[:500]}
+
+
+# JSON field -> (child model name, entry -> column values, or falsy to skip the entry)
+COLUMNS = {
+    'co_owners': ('PoolCoOwner', _co_owner),
+    'existing_loans': ('PoolExistingLoan', _existing_loan),
+    'liabilities': ('PoolLiability', _liability),
+    'property_links': ('PoolLink', _link),
+    'property_photos': ('PoolPhoto', _photo),
+}
+
+
+def child_rows(model, pool_id, field, entries):
+    _, columns = COLUMNS[field]
+    if not isinstance(entries, list):
+        return []
+    return [
+        model(pool_id=pool_id, position=position, **values)
+        for position, values in enumerate(map(columns, entries)) if values
+    ]
+
+
+def backfill_pool_children(apps, schema_editor):
+    """Copy every pool's JSON lists into the child tables, BATCH pools per transaction.
+
+    Not atomic as a whole, so a large table is never held in one long
+    transaction; rows that already exist (after an interrupted run) are kept."""
+    Pool = apps.get_model('server', 'Pool')
+    models_ = {field: apps.get_model('server', model_name) for field, (model_name, _) in COLUMNS.items()}
+    last_id = 0
+    while True:
+        pools = list(Pool.objects.filter(id__gt=last_id).order_by('id').values('id', *COLUMNS)[:BATCH])
+        if not pools:
+            return
+        with transaction.atomic():
+            for field, model in models_.items():
+                rows = [row for pool in pools for row in child_rows(model, pool['id'], field, pool[field])]
+                model.objects.bulk_create(rows, batch_size=2000, ignore_conflicts=True)
+        last_id = pools[-1]['id']
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('server', '0020_upload_direct'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PoolPhoto',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('name', models.CharField(max_length=500)),
+                ('pool', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='photo_rows', to='server.pool')),
+            ],
+            options={
+                'ordering': ['pool', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PoolLink',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('url', models.URLField(max_length=500)),
+                ('type', models.CharField(blank=True, max_length=20)),
+                ('added_at', models.DateTimeField(blank=True, null=True)),
+                ('pool', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='link_rows', to='server.pool')),
+            ],
+            options={
+                'ordering': ['pool', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PoolLiability',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('type', models.CharField(blank=True, max_length=100)),
+                ('amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('monthly_payment', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('remaining_balance', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('pool', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='liability_rows', to='server.pool')),
+            ],
+            options={
+                'ordering': ['pool', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PoolExistingLoan',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('loan_amount', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('remaining_balance', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('pool', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='existing_loan_rows', to='server.pool')),
+            ],
+            options={
+                'ordering': ['pool', 'position'],
+            },
+        ),
+        migrations.CreateModel(
+            name='PoolCoOwner',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveSmallIntegerField()),
+                ('first_name', models.CharField(blank=True, max_length=100)),
+                ('middle_name', models.CharField(blank=True, max_length=100)),
+                ('last_name', models.CharField(blank=True, max_length=100)),
+                ('percentage', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True)),
+                ('pool', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='co_owner_rows', to='server.pool')),
+            ],
+            options={
+                'ordering': ['pool', 'position'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='poolphoto',
+            constraint=models.UniqueConstraint(fields=('pool', 'position'), name='pool_photo_position_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='poollink',
+            constraint=models.UniqueConstraint(fields=('pool', 'position'), name='pool_link_position_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='poolliability',
+            index=models.Index(fields=['pool', 'amount', 'monthly_payment'], name='pool_liability_totals_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poolliability',
+            index=models.Index(fields=['type'], name='pool_liability_type_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='poolliability',
+            constraint=models.UniqueConstraint(fields=('pool', 'position'), name='pool_liability_position_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='poolexistingloan',
+            index=models.Index(fields=['pool', 'remaining_balance'], name='pool_loan_balance_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='poolexistingloan',
+            constraint=models.UniqueConstraint(fields=('pool', 'position'), name='pool_loan_position_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='poolcoowner',
+            constraint=models.UniqueConstraint(fields=('pool', 'position'), name='pool_co_owner_position_uniq'),
+        ),
+        migrations.RunPython(backfill_pool_children, migrations.RunPython.noop),
+    ]
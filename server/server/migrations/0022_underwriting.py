@@ -0,0 +1,54 @@
+# Generated by Django 4.2.23 on 2026-10-19 14:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('server', '0021_pool_children'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pool',
+            name='cltv',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True),
+        ),
+        migrations.AddField(
+            model_name='pool',
+            name='dti',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True),
+        ),
+        migrations.AddField(
+            model_name='pool',
+            name='equity_available',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=14, null=True),
+        ),
+        migrations.AddField(
+            model_name='pool',
+            name='ltv',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=7, null=True),
+        ),
+        migrations.AddField(
+            model_name='pool',
+            name='monthly_income',
+            field=models.DecimalField(blank=True, decimal_places=2, help_text='Gross monthly income (optional, for DTI)', max_digits=12, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='pool',
+            index=models.Index(fields=['status', 'ltv'], name='pool_status_ltv_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pool',
+            index=models.Index(fields=['status', 'cltv'], name='pool_status_cltv_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pool',
+            index=models.Index(fields=['status', 'dti'], name='pool_status_dti_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pool',
+            index=models.Index(fields=['status', 'equity_available'], name='pool_status_equity_idx'),
+        ),
+    ]
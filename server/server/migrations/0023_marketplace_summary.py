@@ -0,0 +1,60 @@
+# Generated by Django 4.2.23 on 2026-10-19 14:22
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_marketplace_summary(apps, schema_editor):
+    """Total up active pools and funded investments per bucket, as stats.refresh() does"""
+    Pool = apps.get_model('server', 'Pool')
+    Investment = apps.get_model('server', 'Investment')
+    MarketplaceSummary = apps.get_model('server', 'MarketplaceSummary')
+    totals = {('all', ''): {}}
+
+    def add(pool_type, state, **values):
+        for bucket in (('all', ''), ('pool_type', pool_type or ''), ('state', (state or '').strip())):
+            row = totals.setdefault(bucket, {})
+            for name, value in values.items():
+                row[name] = row.get(name, 0) + value
+
+    pools = (Pool.objects.filter(status='active').order_by().values('pool_type', 'state')
+             .annotate(count=Count('id'), amount=Sum('amount'), roi=Sum('roi_rate')))
+    for row in pools:
+        add(row['pool_type'], row['state'], active_pools=row['count'], active_amount=row['amount'],
+            active_roi_total=row['roi'])
+    investments = (Investment.objects.filter(status__in=('active', 'completed')).order_by()
+                   .values('pool__pool_type', 'pool__state').annotate(count=Count('id'), amount=Sum('amount')))
+    for row in investments:
+        add(row['pool__pool_type'], row['pool__state'], investments=row['count'], funded_amount=row['amount'])
+    MarketplaceSummary.objects.bulk_create([
+        MarketplaceSummary(dimension=dimension, key=key, **values) for (dimension, key), values in totals.items()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('server', '0022_underwriting'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarketplaceSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(choices=[('all', 'Whole marketplace'), ('pool_type', 'Pool type'), ('state', 'Property state')], max_length=10)),
+                ('key', models.CharField(blank=True, max_length=50)),
+                ('active_pools', models.IntegerField(default=0)),
+                ('active_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('active_roi_total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('investments', models.IntegerField(default=0)),
+                ('funded_amount', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='marketplacesummary',
+            constraint=models.UniqueConstraint(fields=('dimension', 'key'), name='marketplace_summary_uniq'),
+        ),
+        migrations.RunPython(backfill_marketplace_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,103 @@
+# Generated by Django 4.2.23 on 2026-10-19 14:23
+
+from django.db import migrations, models, transaction
+import django.db.models.deletion
+
+BATCH = 2000
+
+# Frozen copies of server.search as it was when this migration was written
+SEARCH_FIELDS = ('address_line', 'city', 'state', 'zip_code')
+
+
+def document(values):
+    return ' '.join(str(value).strip() for value in values if value)
+
+
+SQLITE_INDEX = [
+    "CREATE VIRTUAL TABLE server_poolsearch_fts USING fts5("
+    "document, content='server_poolsearch', content_rowid='pool_id', prefix='2 3')",
+    "CREATE TRIGGER server_poolsearch_ai AFTER INSERT ON server_poolsearch BEGIN "
+    "INSERT INTO server_poolsearch_fts (rowid, document) VALUES (new.pool_id, new.document); END",
+    "CREATE TRIGGER server_poolsearch_ad AFTER DELETE ON server_poolsearch BEGIN "
+    "INSERT INTO server_poolsearch_fts (server_poolsearch_fts, rowid, document) "
+    "VALUES ('delete', old.pool_id, old.document); END",
+    "CREATE TRIGGER server_poolsearch_au AFTER UPDATE ON server_poolsearch BEGIN "
+    "INSERT INTO server_poolsearch_fts (server_poolsearch_fts, rowid, document) "
+    "VALUES ('delete', old.pool_id, old.document); "
+    "INSERT INTO server_poolsearch_fts (rowid, document) VALUES (new.pool_id, new.document); END",
+]
+
+POSTGRES_COLUMN = [
+    "ALTER TABLE server_poolsearch ADD COLUMN vector tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('simple', document)) STORED",
+]
+
+# Built after the backfill: one pass over the rows instead of an update per insert
+POSTGRES_INDEX = "CREATE INDEX server_poolsearch_vector_idx ON server_poolsearch USING gin (vector) WHERE active"
+POSTGRES_TRIGRAM_INDEX = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX server_poolsearch_trgm_idx ON server_poolsearch USING gin (document gin_trgm_ops) WHERE active",
+]
+
+
+def backfill(apps):
+    """Write every pool's search document, BATCH pools per transaction"""
+    Pool = apps.get_model('server', 'Pool')
+    PoolSearch = apps.get_model('server', 'PoolSearch')
+    last_id = 0
+    while True:
+        pools = list(Pool.objects.filter(id__gt=last_id).order_by('id').values_list('id', 'status', *SEARCH_FIELDS)[:BATCH])
+        if not pools:
+            return
+        with transaction.atomic():
+            PoolSearch.objects.bulk_create([
+                PoolSearch(pool_id=pool_id, document=document(values), active=status == 'active')
+                for pool_id, status, *values in pools
+            ], ignore_conflicts=True)
+        last_id = pools[-1][0]
+
+
+def create_search_index(apps, schema_editor):
+    """The database's own full-text index over PoolSearch.document (see server/search.py)"""
+    if schema_editor.connection.vendor == 'postgresql':
+        for statement in POSTGRES_COLUMN:
+            schema_editor.execute(statement)
+        backfill(apps)
+        schema_editor.execute(POSTGRES_INDEX)
+        # pg_trgm ships in contrib, which some builds leave out; search then has no typo fallback
+        with schema_editor.connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+            if cursor.fetchone():
+                for statement in POSTGRES_TRIGRAM_INDEX:
+                    schema_editor.execute(statement)
+    else:
+        for statement in SQLITE_INDEX:
+            schema_editor.execute(statement)
+        backfill(apps)
+
+
+def drop_search_index(apps, schema_editor):
+    # The column, indexes and triggers go with the table; the FTS5 table doesn't
+    if schema_editor.connection.vendor != 'postgresql':
+        schema_editor.execute("DROP TABLE IF EXISTS server_poolsearch_fts")
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('server', '0023_marketplace_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PoolSearch',
+            fields=[
+                ('pool', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search', serialize=False, to='server.pool')),
+                ('document', models.TextField()),
+                ('active', models.BooleanField()),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
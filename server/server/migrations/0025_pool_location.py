@@ -0,0 +1,32 @@
+# Generated by Django 4.2.23 on 2026-10-19 15:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('server', '0024_pool_search'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pool',
+            name='geohash',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pool',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='pool',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='pool',
+            index=models.Index(fields=['status', 'geohash'], name='pool_status_geohash_idx'),
+        ),
+    ]
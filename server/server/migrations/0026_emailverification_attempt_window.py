@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-19 15:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('server', '0025_pool_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='emailverification',
+            name='attempts_reset_at',
+            field=models.DateTimeField(null=True),
+        ),
+    ]
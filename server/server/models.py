@@ -1,9 +1,12 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.hashers import make_password
 from django.utils import timezone
+from django.utils.crypto import constant_time_compare, salted_hmac
 from datetime import timedelta
-import random
-import string
+import math
+import secrets
+import uuid
 
 class Borrower(models.Model):
     first_name = models.CharField(max_length=100)
@@ -29,6 +32,12 @@ class Borrower(models.Model):
     def __str__(self):
         return f"Borrower({self.email})"
 
+    class Meta:
+        indexes = [
+            # Keyset pagination for the admin user browser
+            models.Index(fields=['-created_at', '-id'], name='borrower_created_id_idx'),
+        ]
+
 class Investor(models.Model):
     full_name = models.CharField(max_length=255)
     email = models.EmailField(unique=True)
@@ -51,6 +60,12 @@ class Investor(models.Model):
     def __str__(self):
         return f"Investor({self.email})"
 
+    class Meta:
+        indexes = [
+            # Keyset pagination for the admin user browser
+            models.Index(fields=['-created_at', '-id'], name='investor_created_id_idx'),
+        ]
+
 class AuthToken(models.Model):
     """Simple authentication token for cross-origin requests"""
     token = models.CharField(max_length=255, unique=True)
@@ -84,33 +99,105 @@ class AuthToken(models.Model):
         return f"AuthToken({user.email if user else 'None'})"
 
 class EmailVerification(models.Model):
-    """Store email verification codes for users during signup"""
+    """Store email verification codes for users during signup.
+
+    One record per pending signup; sends and resends issue new codes on it, so
+    wrong guesses are counted across them (see EMAIL_VERIFICATION_MAX_ATTEMPTS)."""
     email = models.EmailField()
-    code = models.CharField(max_length=6)
+    code_hash = models.CharField(max_length=64)  # HMAC of the code; the code itself is only ever emailed
     user_type = models.CharField(max_length=10, choices=[('borrower', 'Borrower'), ('investor', 'Investor')])
     user_data = models.JSONField()  # Store the signup data until verification
     created_at = models.DateTimeField(auto_now_add=True)
     expires_at = models.DateTimeField()
     verified = models.BooleanField(default=False)
+    attempts = models.PositiveSmallIntegerField(default=0)  # wrong codes in the current window
+    attempts_reset_at = models.DateTimeField(null=True)  # end of that window
     
     def save(self, *args, **kwargs):
         if not self.expires_at:
             self.expires_at = timezone.now() + timedelta(minutes=15)  # 15 minute expiry
-        if not self.code:
-            self.code = self.generate_code()
         super().save(*args, **kwargs)
     
     @staticmethod
     def generate_code():
         """Generate a 4-digit verification code"""
-        return ''.join(random.choices(string.digits, k=4))
-    
+        return f"{secrets.randbelow(10000):04d}"
+
+    @staticmethod
+    def hash_code(email, user_type, code):
+        return salted_hmac('server.EmailVerification', f'{email}:{user_type}:{code}', algorithm='sha256').hexdigest()
+
+    @staticmethod
+    def _attempt_window_end(now):
+        return now + timedelta(seconds=settings.EMAIL_VERIFICATION_ATTEMPT_WINDOW_SECONDS)
+
+    def _window_over(self, now):
+        return self.attempts_reset_at is None or now >= self.attempts_reset_at
+
+    def set_code(self):
+        """Issue a fresh code (returned for the email) and reset the expiry.
+        The attempt counter only resets once its window has passed."""
+        now = timezone.now()
+        code = self.generate_code()
+        self.code_hash = self.hash_code(self.email, self.user_type, code)
+        if self._window_over(now):
+            self.attempts = 0
+            self.attempts_reset_at = self._attempt_window_end(now)
+        self.expires_at = now + timedelta(minutes=15)
+        return code
+
+    def check_code(self, code):
+        return constant_time_compare(self.code_hash, self.hash_code(self.email, self.user_type, code))
+
+    def record_failure(self):
+        """Count a wrong code, starting a new window if the last one has passed"""
+        now = timezone.now()
+        rows = EmailVerification.objects.filter(pk=self.pk)
+        if self._window_over(now):
+            rows.update(attempts=1, attempts_reset_at=self._attempt_window_end(now))
+        else:
+            rows.update(attempts=models.F('attempts') + 1)
+
+    @property
+    def locked(self):
+        return self.attempts >= settings.EMAIL_VERIFICATION_MAX_ATTEMPTS and not self._window_over(timezone.now())
+
+    @property
+    def retry_after(self):
+        """Seconds until a locked record accepts codes again"""
+        return max(1, math.ceil((self.attempts_reset_at - timezone.now()).total_seconds()))
+
     def is_valid(self):
         """Check if code is still valid (not expired and not verified)"""
         return not self.verified and timezone.now() < self.expires_at
     
     def __str__(self):
-        return f"EmailVerification({self.email}, {self.code})"
+        return f"EmailVerification({self.email}, {self.user_type})"
+
+    class Meta:
+        indexes = [
+            # verify/resend look up the pending record by address and role
+            models.Index(fields=['email', 'user_type'], name='emailverif_email_type_idx'),
+        ]
+
+class RegisteredEmail(models.Model):
+    """Every account email across both roles, so availability is one indexed lookup.
+    Maintained from Borrower/Investor saves and deletes (see signals.py)."""
+    email = models.CharField(max_length=254)  # normalized: stripped and lowercased
+    role = models.CharField(max_length=10, choices=[('borrower', 'Borrower'), ('investor', 'Investor')])
+    user_id = models.BigIntegerField()
+
+    def __str__(self):
+        return f"RegisteredEmail({self.email}, {self.role})"
+
+    class Meta:
+        indexes = [
+            # Exact-match availability lookups only, so no varchar_pattern_ops twin
+            models.Index(fields=['email'], name='registered_email_email_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['role', 'user_id'], name='registered_email_role_user_uniq'),
+        ]
 
 class Pool(models.Model):
     POOL_TYPE_CHOICES = [
@@ -160,6 +247,8 @@ class Pool(models.Model):
     # Financial information
     ssn = models.CharField(max_length=15, help_text="Social Security Number for identity verification")
     fico_score = models.PositiveIntegerField(blank=True, null=True, help_text="Credit score (optional)")
+    monthly_income = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True,
+                                         help_text="Gross monthly income (optional, for DTI)")
     
     # Mailing address
     address_line_1 = models.CharField(max_length=255, help_text="Street address line 1")
@@ -175,6 +264,10 @@ class Pool(models.Model):
     state = models.CharField(max_length=50)
     zip_code = models.CharField(max_length=10)
     country = models.CharField(max_length=100, default='United States')
+    # ZIP code centroid and its 50-bit geohash, set by geo.py; NULL when the ZIP code is unknown
+    latitude = models.FloatField(blank=True, null=True)
+    longitude = models.FloatField(blank=True, null=True)
+    geohash = models.BigIntegerField(blank=True, null=True)
     primary_address_choice = models.CharField(max_length=50, blank=True, null=True, 
                                               help_text="Primary residence choice: primary, vacant, tenant, owner-occupied")
     percent_owned = models.DecimalField(max_digits=5, decimal_places=2)  # e.g., 100.00 for 100%
@@ -200,6 +293,12 @@ class Pool(models.Model):
     credit_card_debt = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
     monthly_debt_payments = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
     liabilities = models.JSONField(default=list, blank=True, help_text="Array of liability objects with type, amount, monthlyPayment, remainingBalance")
+
+    # Underwriting metrics, derived by underwriting.py; ratios are percentages like roi_rate
+    ltv = models.DecimalField(max_digits=7, decimal_places=2, blank=True, null=True)
+    cltv = models.DecimalField(max_digits=7, decimal_places=2, blank=True, null=True)
+    equity_available = models.DecimalField(max_digits=14, decimal_places=2, blank=True, null=True)
+    dti = models.DecimalField(max_digits=7, decimal_places=2, blank=True, null=True)
     
     # Document uploads (we'll store file paths/URLs)
     home_insurance_doc = models.CharField(max_length=500, blank=True, null=True)
@@ -223,6 +322,103 @@ class Pool(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Investors browse active pools capped on these
+            models.Index(fields=['status', 'ltv'], name='pool_status_ltv_idx'),
+            models.Index(fields=['status', 'cltv'], name='pool_status_cltv_idx'),
+            models.Index(fields=['status', 'dti'], name='pool_status_dti_idx'),
+            models.Index(fields=['status', 'equity_available'], name='pool_status_equity_idx'),
+            # Nearby and map queries scan geohash ranges of active pools (see geo.py)
+            models.Index(fields=['status', 'geohash'], name='pool_status_geohash_idx'),
+        ]
+
+class PoolCoOwner(models.Model):
+    """One entry of Pool.co_owners as a row. The child tables below mirror the
+    pool's JSON lists (written together, see pool_children.py) so that they
+    can be filtered and summed in SQL and fetched only when a view needs them."""
+    # No index of its own: the unique (pool, position) index serves lookups by pool
+    pool = models.ForeignKey(Pool, on_delete=models.CASCADE, related_name='co_owner_rows', db_index=False)
+    position = models.PositiveSmallIntegerField()  # index in the JSON list
+    first_name = models.CharField(max_length=100, blank=True)
+    middle_name = models.CharField(max_length=100, blank=True)
+    last_name = models.CharField(max_length=100, blank=True)
+    percentage = models.DecimalField(max_digits=5, decimal_places=2, blank=True, null=True)
+
+    class Meta:
+        ordering = ['pool', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['pool', 'position'], name='pool_co_owner_position_uniq'),
+        ]
+
+class PoolLiability(models.Model):
+    pool = models.ForeignKey(Pool, on_delete=models.CASCADE, related_name='liability_rows', db_index=False)
+    position = models.PositiveSmallIntegerField()
+    type = models.CharField(max_length=100, blank=True)
+    amount = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    monthly_payment = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    remaining_balance = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+
+    class Meta:
+        ordering = ['pool', 'position']
+        indexes = [
+            # Per-pool totals read just these columns, straight from the index
+            models.Index(fields=['pool', 'amount', 'monthly_payment'], name='pool_liability_totals_idx'),
+            models.Index(fields=['type'], name='pool_liability_type_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['pool', 'position'], name='pool_liability_position_uniq'),
+        ]
+
+class PoolExistingLoan(models.Model):
+    pool = models.ForeignKey(Pool, on_delete=models.CASCADE, related_name='existing_loan_rows', db_index=False)
+    position = models.PositiveSmallIntegerField()
+    loan_amount = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+    remaining_balance = models.DecimalField(max_digits=12, decimal_places=2, blank=True, null=True)
+
+    class Meta:
+        ordering = ['pool', 'position']
+        indexes = [
+            models.Index(fields=['pool', 'remaining_balance'], name='pool_loan_balance_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['pool', 'position'], name='pool_loan_position_uniq'),
+        ]
+
+class PoolLink(models.Model):
+    pool = models.ForeignKey(Pool, on_delete=models.CASCADE, related_name='link_rows', db_index=False)
+    position = models.PositiveSmallIntegerField()
+    url = models.URLField(max_length=500)
+    type = models.CharField(max_length=20, blank=True)
+    added_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        ordering = ['pool', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['pool', 'position'], name='pool_link_position_uniq'),
+        ]
+
+class PoolPhoto(models.Model):
+    pool = models.ForeignKey(Pool, on_delete=models.CASCADE, related_name='photo_rows', db_index=False)
+    position = models.PositiveSmallIntegerField()
+    name = models.CharField(max_length=500)  # storage name, as in StoredFile.name
+
+    class Meta:
+        ordering = ['pool', 'position']
+        constraints = [
+            models.UniqueConstraint(fields=['pool', 'position'], name='pool_photo_position_uniq'),
+        ]
+
+class PoolSearch(models.Model):
+    """A pool's address as one search document, kept by signals (see search.py).
+
+    Migration 0024 adds the index: a GIN-indexed tsvector column and a
+    trigram index (if pg_trgm is available) on PostgreSQL, an FTS5 table on SQLite."""
+    pool = models.OneToOneField(Pool, on_delete=models.CASCADE, primary_key=True, related_name='search')
+    document = models.TextField()
+    active = models.BooleanField()  # pool.status == 'active': only these are searched
+
+    def __str__(self):
+        return f"PoolSearch({self.pool_id}: {self.document})"
 
 class Investment(models.Model):
     """Track investor investments in pools"""
@@ -246,3 +442,89 @@ class Investment(models.Model):
     
     def __str__(self):
         return f"Investment({self.investor.email} -> Pool {self.pool.id}: ${self.amount})"
+
+class StoredFile(models.Model):
+    """One stored object per distinct content; uploads of identical bytes share it (see storage.py)"""
+    DERIVATIVES_STATUS_CHOICES = [
+        ('', 'Not a photo'),
+        ('pending', 'Pending'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    ]
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    name = models.CharField(max_length=500)  # storage key
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True)
+    # Photo thumbnails (see photos.py): {"small.webp": storage key, ...}
+    derivatives = models.JSONField(default=dict, blank=True)
+    derivatives_status = models.CharField(max_length=10, choices=DERIVATIVES_STATUS_CHOICES, blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"StoredFile({self.name}, {self.size} bytes)"
+
+    class Meta:
+        indexes = [
+            # Pool photo lists hold storage keys; the APIs look their derivatives up by key
+            models.Index(fields=['name'], name='stored_file_name_idx'),
+        ]
+
+class Upload(models.Model):
+    """A chunked, resumable upload of one pool document or photo (see uploads.py)"""
+    KIND_CHOICES = [
+        ('home_insurance_doc', 'Home insurance'),
+        ('tax_return_doc', 'Tax return'),
+        ('appraisal_doc', 'Appraisal'),
+        ('property_photo', 'Property photo'),
+    ]
+
+    STATUS_CHOICES = [
+        ('uploading', 'Uploading'),
+        ('complete', 'Complete'),
+        ('aborted', 'Aborted'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    pool = models.ForeignKey(Pool, on_delete=models.CASCADE, related_name='uploads')
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.BigIntegerField()  # declared by the client up front
+    received = models.BigIntegerField(default=0)  # contiguous bytes staged so far
+    sha256 = models.CharField(max_length=64, blank=True)  # client's checksum if given, else ours once complete
+    direct = models.BooleanField(default=False)  # sent straight to S3 with a presigned URL, not in chunks
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='uploading')
+    stored_file = models.ForeignKey(StoredFile, on_delete=models.PROTECT, null=True, blank=True, related_name='uploads')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Upload({self.id}, {self.kind}, {self.received}/{self.size})"
+
+class MarketplaceSummary(models.Model):
+    """Running marketplace totals, one row per (dimension, key), kept by signals (see stats.py)"""
+    DIMENSION_CHOICES = [
+        ('all', 'Whole marketplace'),
+        ('pool_type', 'Pool type'),
+        ('state', 'Property state'),
+    ]
+
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES)
+    key = models.CharField(max_length=50, blank=True)  # pool type or state; '' for 'all'
+    # Active pools
+    active_pools = models.IntegerField(default=0)
+    active_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    active_roi_total = models.DecimalField(max_digits=14, decimal_places=2, default=0)  # sum of roi_rate, for the average
+    # Active and completed investments, bucketed by their pool
+    investments = models.IntegerField(default=0)
+    funded_amount = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"MarketplaceSummary({self.dimension}={self.key!r}: {self.active_pools} active)"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['dimension', 'key'], name='marketplace_summary_uniq'),
+        ]
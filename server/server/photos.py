@@ -0,0 +1,165 @@
+"""
+Thumbnails of property photos, in WebP and JPEG.
+
+When a photo upload completes, its StoredFile is marked pending and, once
+the transaction commits, rendered by a pool of IMAGE_WORKERS processes
+running images.render(). Decoding and encoding are CPU-bound and each
+process has its own GIL, so throughput grows with cores. Every derivative
+is stored next to the original as <original>.<size><ext> and listed in
+StoredFile.derivatives; derivative_urls() turns those into the URLs the
+pool APIs return.
+
+The process pool belongs to the web worker and starts with its first
+photo. A render lost to a restart leaves the photo pending, and
+``manage.py generate_derivatives`` renders everything pending in bulk.
+"""
+
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection, transaction
+
+from . import images
+from .models import StoredFile
+from .storage import file_url, get_storage
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_processes = None
+_threads = None
+
+
+def _executors():
+    global _processes, _threads
+    with _lock:
+        if _processes is None:
+            # spawn rather than fork: the web worker has threads and open database connections
+            _processes = ProcessPoolExecutor(
+                settings.IMAGE_WORKERS, mp_context=multiprocessing.get_context('spawn'),
+                initializer=images.init_worker,
+            )
+            # One thread per process: each waits for a render, then stores the output
+            _threads = ThreadPoolExecutor(settings.IMAGE_WORKERS, thread_name_prefix='photo-derivatives')
+    return _processes, _threads
+
+
+def derivative_name(name, size, fmt):
+    return f'{os.path.splitext(name)[0]}.{size}{images.EXTENSIONS[fmt]}'
+
+
+def _source(name):
+    """A local path Pillow can open in the worker, or else the photo's bytes"""
+    storage = get_storage()
+    try:
+        return storage.path(name)
+    except NotImplementedError:
+        with storage.open(name, 'rb') as f:
+            return f.read()
+
+
+def _store_rendered(stored_file, rendered):
+    storage = get_storage()
+    derivatives = {}
+    for (size, fmt), data in rendered.items():
+        name = derivative_name(stored_file.name, size, fmt)
+        if not storage.exists(name):
+            name = storage.save(name, ContentFile(data))
+        derivatives[f'{size}.{fmt}'] = name
+    StoredFile.objects.filter(pk=stored_file.pk).update(derivatives=derivatives, derivatives_status='ready')
+
+
+def _mark_failed(stored_file):
+    logger.exception('Could not render derivatives of %s', stored_file.name)
+    StoredFile.objects.filter(pk=stored_file.pk).update(derivatives_status='failed')
+
+
+def _generate(stored_file):
+    processes, _ = _executors()
+    try:
+        rendered = processes.submit(images.render, _source(stored_file.name)).result()
+        _store_rendered(stored_file, rendered)
+    except Exception:
+        _mark_failed(stored_file)
+    finally:
+        connection.close()
+
+
+def queue_derivatives(stored_file):
+    """Mark a just-uploaded photo pending and render its derivatives in the background after commit"""
+    if not settings.IMAGE_DERIVATIVES_ENABLED or stored_file.derivatives_status == 'ready':
+        return
+    StoredFile.objects.filter(pk=stored_file.pk).update(derivatives_status='pending')
+    stored_file.derivatives_status = 'pending'
+    transaction.on_commit(lambda: _executors()[1].submit(_generate, stored_file))
+
+
+def generate_derivatives(stored_files):
+    """Render derivatives for many photos on every worker process; returns (ready, failed) counts.
+
+    At most two renders per worker are in flight, so memory stays bounded on
+    any number of photos."""
+    processes, _ = _executors()
+    stored_files = iter(stored_files)
+    in_flight = {}
+    ready = failed = 0
+
+    def submit_more():
+        nonlocal failed
+        while len(in_flight) < 2 * settings.IMAGE_WORKERS:
+            stored_file = next(stored_files, None)
+            if stored_file is None:
+                return
+            try:
+                in_flight[processes.submit(images.render, _source(stored_file.name))] = stored_file
+            except Exception:
+                _mark_failed(stored_file)
+                failed += 1
+
+    submit_more()
+    while in_flight:
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        for future in done:
+            stored_file = in_flight.pop(future)
+            try:
+                _store_rendered(stored_file, future.result())
+                ready += 1
+            except Exception:
+                _mark_failed(stored_file)
+                failed += 1
+        submit_more()
+    return ready, failed
+
+
+def _urls(derivatives):
+    urls = {}
+    for key, name in derivatives.items():
+        size, fmt = key.split('.')
+        urls.setdefault(size, {})[fmt] = file_url(name)
+    return urls
+
+
+def _photo_names(names):
+    return [name for name in names if isinstance(name, str)]
+
+
+def derivative_urls(names):
+    """{photo key: {size: {format: url}}} for those of names whose derivatives are ready"""
+    names = _photo_names(names)
+    if not names:
+        return {}
+    rows = StoredFile.objects.filter(name__in=names, derivatives_status='ready').values_list('name', 'derivatives')
+    return {name: _urls(derivatives) for name, derivatives in rows}
+
+
+async def aderivative_urls(names):
+    names = _photo_names(names)
+    if not names:
+        return {}
+    rows = StoredFile.objects.filter(name__in=names, derivatives_status='ready').values_list('name', 'derivatives')
+    return {name: _urls(derivatives) async for name, derivatives in rows}
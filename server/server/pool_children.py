@@ -0,0 +1,191 @@
+"""
+A pool's list-valued details as rows.
+
+Pool keeps co_owners, existing_loans, liabilities, property_links and
+property_photos as JSON lists, exactly as the client sent them. Each list is
+mirrored into a child table - PoolCoOwner, PoolExistingLoan, PoolLiability,
+PoolLink, PoolPhoto - whenever it is saved (see signals.py), one row per
+entry with its list index as ``position`` and money as decimals. Queries
+use the rows: risk filters sum liabilities in SQL, and serializers.py
+prefetches them for the fields that show them and never loads the JSON
+columns.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.db.models import DecimalField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils.dateparse import parse_datetime
+
+from .models import PoolCoOwner, PoolExistingLoan, PoolLiability, PoolLink, PoolPhoto
+
+JSON_FIELDS = ('co_owners', 'existing_loans', 'liabilities', 'property_links', 'property_photos')
+CENTS = Decimal('0.01')
+
+
+def _decimal(value, max_digits=12):
+    """value (a number, or a string like "$1,250.00") as a decimal that fits the column, else None"""
+    if isinstance(value, str):
+        value = value.replace('$', '').replace(',', '').strip()
+    if value is None or value == '' or isinstance(value, bool):
+        return None
+    try:
+        value = Decimal(str(value)).quantize(CENTS)
+    except (InvalidOperation, ValueError):
+        return None
+    return value if value.is_finite() and abs(value) < 10 ** (max_digits - 2) else None
+
+
+def _text(value, max_length):
+    return value.strip()[:max_length] if isinstance(value, str) else ''
+
+
+def _co_owner(entry):
+    return {
+        'first_name': _text(entry.get('firstName'), 100),
+        'middle_name': _text(entry.get('middleName'), 100),
+        'last_name': _text(entry.get('lastName'), 100),
+        'percentage': _decimal(entry.get('percentage'), max_digits=5),
+    }
+
+
+def _existing_loan(entry):
+    return {
+        'loan_amount': _decimal(entry.get('loan_amount')),
+        'remaining_balance': _decimal(entry.get('remaining_balance')),
+    }
+
+
+def _liability(entry):
+    return {
+        'type': _text(entry.get('type'), 100),
+        'amount': _decimal(entry.get('amount')),
+        'monthly_payment': _decimal(entry.get('monthlyPayment')),
+        'remaining_balance': _decimal(entry.get('remainingBalance')),
+    }
+
+
+def _link(entry):
+    url = _text(entry.get('url'), 500)
+    try:
+        added_at = parse_datetime(entry['added_at'])
+    except (KeyError, TypeError, ValueError):
+        added_at = None
+    return url and {'url': url, 'type': _text(entry.get('type'), 20), 'added_at': added_at}
+
+
+def _photo(name):
+    return isinstance(name, str) and name and {'name': name[:500]}
+
+
+# JSON field -> (child model name, entry -> column values, or falsy to skip the entry).
+# Migration 0021 backfills with a frozen copy of these; changes here don't reach it.
+COLUMNS = {
+    'co_owners': ('PoolCoOwner', lambda entry: isinstance(entry, dict) and _co_owner(entry)),
+    'existing_loans': ('PoolExistingLoan', lambda entry: isinstance(entry, dict) and _existing_loan(entry)),
+    'liabilities': ('PoolLiability', lambda entry: isinstance(entry, dict) and _liability(entry)),
+    'property_links': ('PoolLink', lambda entry: isinstance(entry, dict) and _link(entry)),
+    'property_photos': ('PoolPhoto', _photo),
+}
+MODELS = {model.__name__: model for model in (PoolCoOwner, PoolExistingLoan, PoolLiability, PoolLink, PoolPhoto)}
+
+
+def child_rows(model, pool_id, field, entries):
+    """Unsaved model rows for entries, the value of one of a pool's JSON_FIELDS"""
+    _, columns = COLUMNS[field]
+    if not isinstance(entries, list):
+        return []
+    return [
+        model(pool_id=pool_id, position=position, **values)
+        for position, values in enumerate(map(columns, entries)) if values
+    ]
+
+
+def write_children(pool, fields=JSON_FIELDS):
+    """Replace the rows mirroring the given JSON fields with their current values"""
+    for field in fields:
+        model = MODELS[COLUMNS[field][0]]
+        model.objects.filter(pool_id=pool.pk).delete()
+        model.objects.bulk_create(child_rows(model, pool.pk, field, getattr(pool, field)))
+
+
+def _total(model, column):
+    totals = model.objects.filter(pool=OuterRef('pk')).order_by().values('pool').annotate(total=Sum(column))
+    return Coalesce(Subquery(totals.values('total')), Value(Decimal(0)),
+                    output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+# Annotation -> the child column it sums per pool
+DEBT_TOTALS = {
+    'total_liabilities': (PoolLiability, 'amount'),
+    'total_liability_payments': (PoolLiability, 'monthly_payment'),
+    'total_existing_loan_balance': (PoolExistingLoan, 'remaining_balance'),
+}
+# Query parameter -> the total it caps
+RISK_FILTERS = {
+    'maxLiabilities': 'total_liabilities',
+    'maxMonthlyLiabilityPayments': 'total_liability_payments',
+    'maxExistingLoanBalance': 'total_existing_loan_balance',
+}
+
+
+def with_debt_totals(pools, names=tuple(DEBT_TOTALS)):
+    """Annotate each pool with the named DEBT_TOTALS, 0 where it has no rows"""
+    return pools.annotate(**{name: _total(*DEBT_TOTALS[name]) for name in names})
+
+
+def filter_by_risk(pools, params):
+    """Apply the RISK_FILTERS present in params (a QueryDict); raises ValueError on a bad number"""
+    limits = {}
+    for param, total in RISK_FILTERS.items():
+        if params.get(param):
+            limit = _decimal(params[param], max_digits=14)
+            if limit is None:
+                raise ValueError(f'{param} must be a number')
+            limits[total] = limit
+    if not limits:
+        return pools
+    return with_debt_totals(pools, limits).filter(**{f'{total}__lte': limit for total, limit in limits.items()})
+
+
+def cover_photo():
+    """Annotation: the name of a pool's first photo, without loading the others"""
+    return Subquery(PoolPhoto.objects.filter(pool=OuterRef('pk')).order_by('position').values('name')[:1])
+
+
+def _money(value):
+    return str(value) if value is not None else None
+
+
+def co_owners_payload(pool):
+    return [
+        {'firstName': row.first_name, 'middleName': row.middle_name, 'lastName': row.last_name,
+         'percentage': _money(row.percentage)}
+        for row in pool.co_owner_rows.all()
+    ]
+
+
+def existing_loans_payload(pool):
+    return [
+        {'loanAmount': _money(row.loan_amount), 'remainingBalance': _money(row.remaining_balance)}
+        for row in pool.existing_loan_rows.all()
+    ]
+
+
+def liabilities_payload(pool):
+    return [
+        {'type': row.type, 'amount': _money(row.amount), 'monthlyPayment': _money(row.monthly_payment),
+         'remainingBalance': _money(row.remaining_balance)}
+        for row in pool.liability_rows.all()
+    ]
+
+
+def links_payload(pool):
+    return [
+        {'url': row.url, 'type': row.type, 'addedAt': row.added_at.isoformat() if row.added_at else None}
+        for row in pool.link_rows.all()
+    ]
+
+
+def photo_names(pool):
+    return [row.name for row in pool.photo_rows.all()]
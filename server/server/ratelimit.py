@@ -0,0 +1,207 @@
+"""
+Token-bucket rate limiting for the auth and verification endpoints.
+
+Views opt in with ``@ratelimit(scope, ip='30/m', account='10/m')``. Each
+rate is a bucket of that many tokens refilled evenly over the period; a
+request spends one token from its client-IP bucket and, when given, one
+from the bucket of the email address it names. Throttled requests get a
+429 with Retry-After before the view runs, so they never reach the database,
+the password hasher or SMTP.
+
+Backends (RATELIMIT_BACKEND):
+  memory  buckets live in the worker process; each worker limits on its own
+  cache   buckets live in the Django cache (Redis when REDIS_URL is set) and
+          are shared by every worker and instance
+"""
+
+import json
+import math
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.http import JsonResponse
+
+_PERIODS = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}
+
+_lock = threading.Lock()
+_stats = {}
+
+
+def parse_rate(rate):
+    """'10/m' -> (capacity 10, refill 10/60 tokens per second)"""
+    count, period = rate.split('/')
+    count = int(count)
+    return count, count / _PERIODS[period]
+
+
+def _count(bucket, outcome):
+    with _lock:
+        counters = _stats.setdefault(bucket, {'allowed': 0, 'throttled': 0})
+        counters[outcome] += 1
+
+
+def throttle_stats():
+    """Per-process allowed/throttled counts keyed by scope:kind"""
+    with _lock:
+        return {bucket: dict(counters) for bucket, counters in _stats.items()}
+
+
+def _spend(tokens, updated, now, capacity, refill):
+    """Refill for the time since ``updated`` and try to take one token.
+
+    Returns (allowed, tokens_left, seconds_until_next_token)."""
+    tokens = min(capacity, tokens + (now - updated) * refill)
+    if tokens >= 1:
+        return True, tokens - 1, 0
+    return False, tokens, (1 - tokens) / refill
+
+
+class MemoryBackend:
+    """Buckets in a per-process LRU dict"""
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def consume(self, key, capacity, refill):
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (capacity, now))
+            allowed, tokens, retry_after = _spend(tokens, updated, now, capacity, refill)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return allowed, retry_after
+
+    async def aconsume(self, key, capacity, refill):
+        # Only holds an in-memory lock briefly; nothing to await
+        return self.consume(key, capacity, refill)
+
+
+class CacheBackend:
+    """Buckets in the Django cache.
+
+    Plain get/set keeps this backend-agnostic; two workers hitting the same
+    bucket at the same instant can each spend the last token, so a burst may
+    overshoot the limit by a request or two.
+    """
+
+    def consume(self, key, capacity, refill):
+        now = time.time()
+        cache_key = f'ratelimit:{key}'
+        tokens, updated = cache.get(cache_key) or (capacity, now)
+        allowed, tokens, retry_after = _spend(tokens, updated, now, capacity, refill)
+        # An untouched bucket is full again after capacity / refill seconds
+        cache.set(cache_key, (tokens, now), math.ceil(capacity / refill))
+        return allowed, retry_after
+
+    async def aconsume(self, key, capacity, refill):
+        """consume() for async views, without blocking the event loop on the cache"""
+        now = time.time()
+        cache_key = f'ratelimit:{key}'
+        tokens, updated = await cache.aget(cache_key) or (capacity, now)
+        allowed, tokens, retry_after = _spend(tokens, updated, now, capacity, refill)
+        await cache.aset(cache_key, (tokens, now), math.ceil(capacity / refill))
+        return allowed, retry_after
+
+
+_backends = {'memory': MemoryBackend, 'cache': CacheBackend}
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = _backends[settings.RATELIMIT_BACKEND]()
+    return _backend
+
+
+def client_ip(request):
+    """Client address as seen by the last RATELIMIT_TRUSTED_PROXIES proxies.
+
+    Proxies append to X-Forwarded-For, so entries further left than that are
+    whatever the client chose to send and cannot be trusted.
+    """
+    forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+    proxies = settings.RATELIMIT_TRUSTED_PROXIES
+    if forwarded and proxies:
+        hops = [hop.strip() for hop in forwarded.split(',')]
+        return hops[max(len(hops) - proxies, 0)]
+    return request.META.get('REMOTE_ADDR', '')
+
+
+def account_key(request):
+    """Normalized email the request is about (query string or JSON body), or None"""
+    if request.method == 'GET':
+        email = request.GET.get('email')
+    else:
+        try:
+            email = json.loads(request.body).get('email')
+        except (ValueError, AttributeError):
+            return None
+    if not isinstance(email, str):
+        return None
+    return email.strip().lower() or None
+
+
+def _throttled_response(retry_after):
+    response = JsonResponse({'error': 'Too many requests, please try again later'}, status=429)
+    response['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def _buckets(request, scope, limits):
+    """(stats bucket, bucket key, capacity, refill) for each limit that applies to the request"""
+    for kind, (capacity, refill) in limits:
+        identity = client_ip(request) if kind == 'ip' else account_key(request)
+        if identity is not None:
+            yield f'{scope}:{kind}', f'{scope}:{kind}:{identity}', capacity, refill
+
+
+def _check(request, scope, limits):
+    """Spend a token from each bucket in turn; return a 429 response if one is empty"""
+    if not settings.RATELIMIT_ENABLED:
+        return None
+    backend = get_backend()
+    for bucket, key, capacity, refill in _buckets(request, scope, limits):
+        allowed, retry_after = backend.consume(key, capacity, refill)
+        _count(bucket, 'allowed' if allowed else 'throttled')
+        if not allowed:
+            return _throttled_response(retry_after)
+    return None
+
+
+async def _acheck(request, scope, limits):
+    """_check() for async views"""
+    if not settings.RATELIMIT_ENABLED:
+        return None
+    backend = get_backend()
+    for bucket, key, capacity, refill in _buckets(request, scope, limits):
+        allowed, retry_after = await backend.aconsume(key, capacity, refill)
+        _count(bucket, 'allowed' if allowed else 'throttled')
+        if not allowed:
+            return _throttled_response(retry_after)
+    return None
+
+
+def ratelimit(scope, ip=None, account=None):
+    """Throttle a view per client IP and/or per email address named in the request"""
+    limits = [(kind, parse_rate(rate)) for kind, rate in (('ip', ip), ('account', account)) if rate]
+
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def wrapper_view(request, *args, **kwargs):
+                return await _acheck(request, scope, limits) or await view_func(request, *args, **kwargs)
+        else:
+            @wraps(view_func)
+            def wrapper_view(request, *args, **kwargs):
+                return _check(request, scope, limits) or view_func(request, *args, **kwargs)
+        return wrapper_view
+    return decorator
@@ -0,0 +1,116 @@
+"""
+Pool search by property address: street, city, state and ZIP code.
+
+Each pool has a PoolSearch row whose document is its address, with a
+copy of whether the pool is active, written by signals.py whenever one of
+INDEXED_FIELDS is saved (the row goes with the pool on delete). Having
+the flag here spares a lookup into Pool for every match. Migration 0024
+indexes the document per database:
+
+  PostgreSQL  a generated tsvector column ('simple' config: no stemming or
+              stop words - these are names and numbers) under a GIN index,
+              plus a pg_trgm GIN index on the document itself; both are
+              partial, over active pools only
+  SQLite      an FTS5 table over the document, kept in step by triggers
+
+Every query word is matched as a prefix, so "aus tx 787" finds 123 Main St,
+Austin, TX 78701 as it is typed. Results are active pools ranked by
+ts_rank (PostgreSQL) or bm25 (SQLite), best first. When no document holds
+every word, PostgreSQL falls back to trigram word similarity so a
+misspelled city ("austn") still finds something. That needs the pg_trgm
+extension; where the server lacks it the migration skips the trigram
+index and there is no fallback, as on SQLite.
+
+Pages are LIMIT/OFFSET with one extra row fetched to tell whether there is
+a next page; there is no total count, which would mean ranking every match.
+"""
+
+import re
+
+from django.db import connection
+
+from .models import PoolSearch
+
+SEARCH_FIELDS = ('address_line', 'city', 'state', 'zip_code')
+INDEXED_FIELDS = ('status', *SEARCH_FIELDS)
+MAX_WORDS = 8
+
+_WORD = re.compile(r'[^\W_]+')
+
+
+def document(values):
+    """The search document for a pool's SEARCH_FIELDS values"""
+    return ' '.join(str(value).strip() for value in values if value)
+
+
+def index_pool(pool):
+    text = document(getattr(pool, name) for name in SEARCH_FIELDS)
+    PoolSearch.objects.update_or_create(pool_id=pool.pk, defaults={'document': text, 'active': pool.status == 'active'})
+
+
+def query_words(query):
+    return _WORD.findall((query or '').lower())[:MAX_WORDS]
+
+
+_trigrams = None
+
+
+def _has_trigrams(cursor):
+    """Whether migration 0024 could build the trigram index (pg_trgm is optional contrib)"""
+    global _trigrams
+    if _trigrams is None:
+        cursor.execute("SELECT 1 FROM pg_indexes WHERE indexname = 'server_poolsearch_trgm_idx'")
+        _trigrams = cursor.fetchone() is not None
+    return _trigrams
+
+
+def _postgres(words, limit, offset):
+    table = connection.ops.quote_name(PoolSearch._meta.db_table)
+    tsquery = ' & '.join(f'{word}:*' for word in words)
+    text = ' '.join(words)
+    with connection.cursor() as cursor:
+        def full_text(limit, offset):
+            cursor.execute(
+                f"SELECT s.pool_id, ts_rank(s.vector, q) AS rank "
+                f"FROM {table} s, to_tsquery('simple', %s) q "
+                f"WHERE s.vector @@ q AND s.active "
+                f"ORDER BY rank DESC, s.pool_id DESC LIMIT %s OFFSET %s",
+                [tsquery, limit, offset],
+            )
+            return cursor.fetchall()
+
+        rows = full_text(limit, offset)
+        if rows or (offset and full_text(1, 0)) or not _has_trigrams(cursor):
+            return rows
+        # Nothing holds every word: rank by how closely the words appear, typos and
+        # all (<% keeps documents above pg_trgm.word_similarity_threshold, default 0.6)
+        cursor.execute(
+            f"SELECT s.pool_id, word_similarity(%s, s.document) AS rank "
+            f"FROM {table} s "
+            f"WHERE %s <%% s.document AND s.active "
+            f"ORDER BY rank DESC, s.pool_id DESC LIMIT %s OFFSET %s",
+            [text, text, limit, offset],
+        )
+        return cursor.fetchall()
+
+
+def _sqlite(words, limit, offset):
+    table = connection.ops.quote_name(PoolSearch._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"SELECT f.rowid, -bm25(server_poolsearch_fts) AS rank "
+            f"FROM server_poolsearch_fts f JOIN {table} s ON s.pool_id = f.rowid "
+            f"WHERE server_poolsearch_fts MATCH %s AND s.active "
+            f"ORDER BY rank DESC, f.rowid DESC LIMIT %s OFFSET %s",
+            [' '.join(f'"{word}"*' for word in words), limit, offset],
+        )
+        return cursor.fetchall()
+
+
+def search_pools(query, limit, offset=0):
+    """[(pool_id, rank)] of active pools matching query, best first"""
+    words = query_words(query)
+    if not words:
+        return []
+    search = _postgres if connection.vendor == 'postgresql' else _sqlite
+    return [(pool_id, float(rank)) for pool_id, rank in search(words, limit, offset)]
@@ -0,0 +1,251 @@
+"""
+JSON representations of pools and investments, shared by every view that
+returns them.
+
+A Serializer knows, for each output field, which columns it reads, what it
+needs prefetched or annotated, and how to render it. A view picks the field
+names - its default shape, or the client's ``?fields=`` narrowed to what
+the caller's role may see - and asks for:
+
+  prepare()   the queryset with exactly those columns (``.only()``), the
+              relations they traverse joined, and their child rows
+              prefetched, so a client asking for four fields doesn't load
+              forty
+  renderer()  a function from instance to dict for those names, generated
+              once per distinct set (and cached) as a single dict display -
+              plain columns read inline, like a hand-written view - rather
+              than looping over fields for every row
+
+``id`` is always part of a representation. Money and other decimals render
+as strings, None as null - including zero, which the hand-built dicts this
+replaces used to turn into null.
+"""
+
+from collections import namedtuple
+from functools import lru_cache
+from operator import attrgetter
+
+from .photos import aderivative_urls, derivative_urls
+from .pool_children import (
+    co_owners_payload, cover_photo, existing_loans_payload, liabilities_payload, links_payload, photo_names,
+)
+from .underwriting import METRICS, metrics_payload
+
+# columns: model field paths to load (``a__b`` joins a); get: instance -> JSON value;
+# source: get as a Python expression of obj, for renderer() to inline
+Field = namedtuple('Field', 'columns get prefetch annotations source', defaults=((), None, None))
+
+
+def _money(value):
+    return str(value) if value is not None else None
+
+
+def _iso(value):
+    return value.isoformat() if value is not None else None
+
+
+def _column(name, render=None):
+    get = attrgetter(name)
+    if render is None:
+        return Field((name,), get, source=f'obj.{name}')
+    return Field((name,), lambda obj: render(get(obj)), source=f'{render.__name__}(obj.{name})')
+
+
+class Serializer:
+    """Renders instances of one model as dicts of the named fields.
+
+    fields: {output name: Field}; roles: {role: the names it may see, in output order}"""
+
+    def __init__(self, fields, roles):
+        self.fields = fields
+        self.roles = roles
+        self.renderer = lru_cache(maxsize=128)(self._compile)
+
+    def names(self, role, requested, default):
+        """The field names to render: default, or those listed in requested (a ?fields= value).
+
+        Raises ValueError for a name the role may not see."""
+        if not requested:
+            return default
+        wanted = {name.strip() for name in requested.split(',') if name.strip()}
+        allowed = self.roles[role]
+        unknown = sorted(wanted.difference(allowed))
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        return tuple(name for name in allowed if name in wanted or name == 'id')
+
+    def prepare(self, queryset, names):
+        """queryset loading only what the named fields read"""
+        columns, prefetch, annotations = {'id'}, set(), {}
+        for name in names:
+            field = self.fields[name]
+            columns.update(field.columns)
+            prefetch.update(field.prefetch)
+            annotations.update(field.annotations or {})
+        # Every relation a column goes through: loaded, and joined
+        related = {path.rsplit('__', 1)[0] for path in columns if '__' in path}
+        related = {path.rsplit('__', depth)[0] for path in related for depth in range(path.count('__') + 1)}
+        queryset = queryset.only(*columns, *related)
+        if related:
+            queryset = queryset.select_related(*related)
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset.annotate(**annotations) if annotations else queryset
+
+    def _compile(self, names):
+        # names are checked against self.fields, so only the sources written below end up in the code
+        namespace = {'_money': _money, '_iso': _iso}
+        items = []
+        for n, name in enumerate(names):
+            field = self.fields[name]
+            if field.source is None:
+                namespace[f'get{n}'] = field.get
+            items.append(f"{name!r}: {field.source or f'get{n}(obj)'}")
+        exec(f"def render(obj):\n    return {{{', '.join(items)}}}\n", namespace)
+        return namespace['render']
+
+    def nested(self, relation, names):
+        """A Field rendering obj.<relation> with this serializer's named fields"""
+        fields = [self.fields[name] for name in names]
+        render = self.renderer(names)
+        return Field(
+            (f'{relation}__id', *(f'{relation}__{column}' for field in fields for column in field.columns)),
+            lambda obj: render(getattr(obj, relation)),
+            tuple(f'{relation}__{path}' for field in fields for path in field.prefetch),
+        )
+
+
+POOL_FIELDS = {
+    'id': _column('id'),
+    'poolType': _column('pool_type'),
+    'status': _column('status'),
+    'amount': _column('amount', _money),
+    'roiRate': _column('roi_rate', _money),
+    'term': _column('term'),
+    'termMonths': _column('term_months'),
+    'customTermMonths': _column('custom_term_months'),
+    'fundingProgress': Field((), attrgetter('funding_progress')),
+    'createdAt': _column('created_at', _iso),
+    'updatedAt': _column('updated_at', _iso),
+
+    # Property details
+    'address': Field(('address_line', 'city', 'state', 'zip_code'),
+                     lambda pool: f"{pool.address_line}, {pool.city}, {pool.state} {pool.zip_code}"),
+    'addressLine': _column('address_line'),
+    'city': _column('city'),
+    'state': _column('state'),
+    'zipCode': _column('zip_code'),
+    'location': Field(('latitude', 'longitude', 'geohash'),
+                      lambda pool: {'latitude': pool.latitude, 'longitude': pool.longitude}
+                      if pool.geohash is not None else None),
+    'percentOwned': _column('percent_owned', _money),
+    'coOwner': _column('co_owner'),
+    'propertyValue': _column('property_value', _money),
+    'propertyLink': _column('property_link'),
+    'mortgageBalance': _column('mortgage_balance', _money),
+    'coOwners': Field((), co_owners_payload, ('co_owner_rows',)),
+    'propertyLinks': Field((), links_payload, ('link_rows',)),
+    'existingLoans': Field((), existing_loans_payload, ('existing_loan_rows',)),
+
+    # Borrower
+    'borrowerName': Field(('borrower__first_name', 'borrower__middle_name', 'borrower__last_name'),
+                          lambda pool: pool.borrower.full_name),
+    'borrowerEmail': Field(('borrower__email',), lambda pool: pool.borrower.email),
+
+    # Liabilities and underwriting
+    'otherPropertyLoans': _column('other_property_loans', _money),
+    'creditCardDebt': _column('credit_card_debt', _money),
+    'monthlyDebtPayments': _column('monthly_debt_payments', _money),
+    'liabilities': Field((), liabilities_payload, ('liability_rows',)),
+    'monthlyIncome': _column('monthly_income', _money),
+    'underwriting': Field(METRICS, metrics_payload),
+
+    # Documents and photos
+    'homeInsuranceDoc': _column('home_insurance_doc'),
+    'taxReturnDoc': _column('tax_return_doc'),
+    'appraisalDoc': _column('appraisal_doc'),
+    'propertyPhotos': Field((), photo_names, ('photo_rows',)),
+    # These two render photo names (every photo's; the first one's) and
+    # photo_urls() swaps in their thumbnail URLs, None until rendered
+    'propertyPhotoDerivatives': Field((), photo_names, ('photo_rows',)),
+    'coverPhoto': Field((), attrgetter('cover_photo'), (), {'cover_photo': cover_photo()}),
+}
+
+_PUBLIC = (
+    'id', 'poolType', 'status', 'amount', 'roiRate', 'term', 'termMonths', 'customTermMonths', 'fundingProgress',
+    'createdAt', 'updatedAt', 'address', 'addressLine', 'city', 'state', 'zipCode', 'location', 'percentOwned',
+    'coOwner', 'propertyValue', 'propertyLink', 'mortgageBalance', 'propertyLinks', 'existingLoans',
+)
+_RISK = ('otherPropertyLoans', 'creditCardDebt', 'monthlyDebtPayments', 'liabilities', 'underwriting')
+_FILES = ('homeInsuranceDoc', 'taxReturnDoc', 'appraisalDoc', 'propertyPhotos', 'propertyPhotoDerivatives',
+          'coverPhoto')
+
+POOL = Serializer(POOL_FIELDS, {
+    # The pool's own borrower sees everything they entered
+    'borrower': (*_PUBLIC, 'coOwners', *_RISK, 'monthlyIncome', *_FILES),
+    # Investors see any active pool: who is borrowing, but not co-owners' names or income
+    'investor': (*_PUBLIC, 'borrowerName', 'borrowerEmail', *_RISK, *_FILES),
+})
+
+# Default shapes, per view
+POOL_LIST = ('id', 'poolType', 'amount', 'roiRate', 'term', 'termMonths', 'status', 'fundingProgress', 'createdAt',
+             'address', 'propertyValue', 'mortgageBalance')
+POOL_DETAIL = (
+    'id', 'poolType', 'status', 'amount', 'roiRate', 'term', 'termMonths', 'customTermMonths', 'fundingProgress',
+    'createdAt', 'updatedAt', 'addressLine', 'city', 'state', 'zipCode', 'percentOwned', 'coOwner', 'propertyValue',
+    'propertyLink', 'mortgageBalance', 'coOwners', 'propertyLinks', 'existingLoans', 'otherPropertyLoans',
+    'creditCardDebt', 'monthlyDebtPayments', 'liabilities', 'monthlyIncome', 'underwriting', 'homeInsuranceDoc',
+    'taxReturnDoc', 'appraisalDoc', 'propertyPhotos', 'propertyPhotoDerivatives',
+)
+POOL_UPDATED = tuple(name for name in POOL_DETAIL if name not in (
+    'coOwners', 'propertyLinks', 'existingLoans', 'liabilities', 'propertyPhotoDerivatives'))
+OPPORTUNITY = (*POOL_LIST, 'borrowerName', 'percentOwned', 'underwriting', 'location', 'coverPhoto')
+OPPORTUNITY_DETAIL = tuple(name for name in POOL.roles['investor'] if name not in ('address', 'location', 'coverPhoto'))
+INVESTED_POOL = ('id', 'poolType', 'status', 'amount', 'roiRate', 'term', 'termMonths', 'createdAt', 'addressLine',
+                 'city', 'state', 'zipCode', 'percentOwned', 'coOwner', 'propertyValue', 'propertyLink',
+                 'mortgageBalance', 'borrowerName', 'borrowerEmail')
+
+INVESTMENT = Serializer({
+    'id': _column('id'),
+    'amount': _column('amount', _money),
+    'status': _column('status'),
+    'investedAt': _column('invested_at', _iso),
+    'updatedAt': _column('updated_at', _iso),
+    'poolId': _column('pool_id'),
+    'pool': POOL.nested('pool', INVESTED_POOL),
+}, {
+    'investor': ('id', 'amount', 'status', 'investedAt', 'updatedAt', 'poolId', 'pool'),
+})
+
+MY_INVESTMENT = ('id', 'amount', 'status', 'investedAt', 'pool')
+
+
+def _photo_keys(rows):
+    keys = []
+    for row in rows:
+        if 'coverPhoto' in row:
+            keys.append(row['coverPhoto'])
+        keys.extend(row.get('propertyPhotoDerivatives', ()))
+    return keys
+
+
+def _swap(rows, derivatives):
+    for row in rows:
+        if 'coverPhoto' in row:
+            row['coverPhoto'] = derivatives.get(row['coverPhoto'])
+        if 'propertyPhotoDerivatives' in row:
+            row['propertyPhotoDerivatives'] = [derivatives.get(name) for name in row['propertyPhotoDerivatives']]
+    return rows
+
+
+def photo_urls(rows):
+    """Replace the photo names in rendered pools (coverPhoto, propertyPhotoDerivatives)
+    with their thumbnail URLs, in one query for all of them.
+
+    Every view rendering pools passes them through here (or aphoto_urls() in
+    async views), so no field queries per pool."""
+    return _swap(rows, derivative_urls(_photo_keys(rows)))
+
+
+async def aphoto_urls(rows):
+    return _swap(rows, await aderivative_urls(_photo_keys(rows)))
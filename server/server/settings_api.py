@@ -0,0 +1,28 @@
+"""
+Lean settings for API-only instances: DJANGO_SETTINGS_MODULE=server.settings_api
+
+The frontend is a separate app, so API instances never render the admin,
+flash messages or serve static files. Leaving those apps and their
+middleware out shortens cold starts (see benchmarks/bench_startup.py).
+Run the admin and collectstatic from the full server.settings profile.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+_BROWSER_ONLY_APPS = {
+    'django.contrib.admin',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+}
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in _BROWSER_ONLY_APPS]
+
+_BROWSER_ONLY_MIDDLEWARE = {
+    'server.middleware.WhiteNoiseMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+}
+BROWSER_MIDDLEWARE = [mw for mw in BROWSER_MIDDLEWARE if mw not in _BROWSER_ONLY_MIDDLEWARE]
+
+TEMPLATES[0]['OPTIONS']['context_processors'] = [
+    processor for processor in TEMPLATES[0]['OPTIONS']['context_processors']
+    if processor != 'django.contrib.messages.context_processors.messages'
+]
@@ -0,0 +1,21 @@
+"""
+Settings for test runs: python manage.py test --settings=server.settings_test
+
+Test databases are built straight from the current models (syncdb-style)
+instead of replaying the migration history.
+"""
+
+from .settings import *  # noqa: F401,F403
+
+MIGRATION_MODULES = {
+    app_label: None
+    for app_label in ('admin', 'auth', 'contenttypes', 'sessions', 'server')
+}
+
+# Full-strength hashing only slows the suite down
+PASSWORD_PBKDF2_ITERATIONS = 1000
+
+# The test database is dropped at the end of the run, which an idle pooled
+# connection would block; the pool has its own tests on scratch databases
+for _database in DATABASES.values():
+    _database.pop('POOL', None)
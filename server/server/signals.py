@@ -0,0 +1,110 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .email_registry import email_registered, email_released, normalize_email
+from .geo import geocode_pool
+from . import stats
+from .models import Borrower, Investment, Investor, Pool, RegisteredEmail
+from .pool_children import JSON_FIELDS, write_children
+from .search import INDEXED_FIELDS, index_pool
+
+_ROLES = {Borrower: 'borrower', Investor: 'investor'}
+
+
+@receiver(post_save, sender=Borrower)
+@receiver(post_save, sender=Investor)
+def sync_registered_email(sender, instance, created, update_fields=None, **kwargs):
+    """Mirror the account email into RegisteredEmail"""
+    if update_fields is not None and 'email' not in update_fields:
+        return
+    role = _ROLES[sender]
+    email = normalize_email(instance.email)
+    rows = RegisteredEmail.objects.filter(role=role, user_id=instance.pk)
+    old_email = None if created else rows.values_list('email', flat=True).first()
+    if old_email is None:
+        RegisteredEmail.objects.create(email=email, role=role, user_id=instance.pk)
+    elif old_email != email:
+        rows.update(email=email)
+        transaction.on_commit(lambda: email_released(old_email))
+    # After commit, so a concurrent check can't re-cache "available" before the row is visible
+    transaction.on_commit(lambda: email_registered(email))
+
+
+@receiver(post_delete, sender=Borrower)
+@receiver(post_delete, sender=Investor)
+def drop_registered_email(sender, instance, **kwargs):
+    RegisteredEmail.objects.filter(role=_ROLES[sender], user_id=instance.pk).delete()
+    email = normalize_email(instance.email)
+    transaction.on_commit(lambda: email_released(email))
+
+
+@receiver(post_save, sender=Pool)
+def sync_pool_children(sender, instance, created, update_fields=None, **kwargs):
+    """Mirror the pool's JSON lists into their child tables (see pool_children.py)"""
+    fields = JSON_FIELDS if update_fields is None else [f for f in JSON_FIELDS if f in update_fields]
+    if fields:
+        write_children(instance, fields)
+
+
+@receiver(pre_save, sender=Pool)
+def locate_pool(sender, instance, update_fields=None, **kwargs):
+    """Place the pool at its ZIP code's centroid (see geo.py), saved along with everything else"""
+    if update_fields is None:
+        geocode_pool(instance)
+
+
+@receiver(post_save, sender=Pool)
+def relocate_pool(sender, instance, update_fields=None, **kwargs):
+    # A save limited to update_fields wouldn't write what locate_pool set
+    if update_fields is not None and 'zip_code' in update_fields:
+        changed = geocode_pool(instance)
+        if changed:
+            Pool.objects.filter(pk=instance.pk).update(**{name: getattr(instance, name) for name in changed})
+
+
+@receiver(post_save, sender=Pool)
+def sync_pool_search(sender, instance, update_fields=None, **kwargs):
+    """Rewrite the pool's search document (see search.py); it is deleted with the pool"""
+    if update_fields is None or not set(INDEXED_FIELDS).isdisjoint(update_fields):
+        index_pool(instance)
+
+
+def _tracks(fields, update_fields):
+    return update_fields is None or not set(fields).isdisjoint(update_fields)
+
+
+@receiver(pre_save, sender=Pool)
+def remember_pool_stats(sender, instance, update_fields=None, **kwargs):
+    """Read what the pool counts for in the marketplace stats before it changes (see stats.py)"""
+    if _tracks(stats.POOL_FIELDS, update_fields):
+        instance._stats_before = stats.stored_pool(instance)
+
+
+@receiver(post_save, sender=Pool)
+def update_pool_stats(sender, instance, update_fields=None, **kwargs):
+    if _tracks(stats.POOL_FIELDS, update_fields):
+        stats.pool_changed(instance.__dict__.pop('_stats_before', None), instance)
+
+
+@receiver(post_delete, sender=Pool)
+def drop_pool_stats(sender, instance, **kwargs):
+    stats.pool_changed({name: getattr(instance, name) for name in stats.POOL_FIELDS}, None)
+
+
+@receiver(pre_save, sender=Investment)
+def remember_investment_stats(sender, instance, update_fields=None, **kwargs):
+    if _tracks(('pool', *stats.INVESTMENT_FIELDS), update_fields):
+        instance._stats_before = stats.stored_investment(instance)
+
+
+@receiver(post_save, sender=Investment)
+def update_investment_stats(sender, instance, update_fields=None, **kwargs):
+    if _tracks(('pool', *stats.INVESTMENT_FIELDS), update_fields):
+        stats.investment_changed(instance.__dict__.pop('_stats_before', None), instance)
+
+
+@receiver(pre_delete, sender=Investment)
+def drop_investment_stats(sender, instance, **kwargs):
+    # pre_delete: when a pool delete cascades here, the pool row is still there to bucket by
+    stats.investment_changed({name: getattr(instance, name) for name in stats.INVESTMENT_FIELDS}, None)
@@ -0,0 +1,179 @@
+"""
+Marketplace statistics - active pool volume, average ROI by pool type,
+funding by state - read from MarketplaceSummary in constant time.
+
+MarketplaceSummary holds running totals per bucket: the whole marketplace
+('all', ''), each pool type and each property state. signals.py keeps them
+current. Every Pool or Investment write takes what the row contributed
+before (one primary key lookup) away from its buckets and adds what it
+contributes now, as UPDATE ... SET x = x + delta inside the writer's
+transaction: a rolled-back write leaves no trace, and concurrent writers
+never lose each other's increments. The old row is read FOR UPDATE when
+the write is inside a transaction, so two edits of one pool can't both
+subtract the same old values.
+
+Writes that skip signals - QuerySet.update(), raw SQL, bulk_create() - are
+not counted. ``manage.py refresh_marketplace_stats`` recomputes every row
+from Pool and Investment; run it on a schedule (e.g. nightly) to correct
+any such drift. It locks the table while it runs, so writes racing it wait
+rather than get overwritten.
+
+/api/stats reads the summary rows (a few dozen, however many pools there
+are) and caches the answer for MARKETPLACE_STATS_CACHE_SECONDS.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, Sum
+from django.utils import timezone
+
+from .models import Investment, MarketplaceSummary, Pool
+
+CACHE_KEY = 'marketplace:stats'
+ACTIVE = 'active'  # pool status counted as live volume
+FUNDED = ('active', 'completed')  # investment statuses counted as funding
+POOL_FIELDS = ('status', 'pool_type', 'state', 'amount', 'roi_rate')
+INVESTMENT_FIELDS = ('status', 'amount', 'pool_id')
+
+
+def _decimal(value):
+    return Decimal(str(value)) if value is not None else Decimal(0)
+
+
+def _location(row):
+    return row['pool_type'] or '', (row['state'] or '').strip()
+
+
+def _add(deltas, pool_type, state, sign, **totals):
+    """Add sign * totals to the buckets of a pool with this type and state"""
+    for bucket in (('all', ''), ('pool_type', pool_type or ''), ('state', (state or '').strip())):
+        bucket_totals = deltas.setdefault(bucket, {})
+        for name, value in totals.items():
+            bucket_totals[name] = bucket_totals.get(name, 0) + sign * value
+
+
+def _apply(deltas):
+    now = timezone.now()
+    # Buckets in a fixed order, so concurrent writers lock the rows in the same order
+    for (dimension, key), totals in sorted(deltas.items()):
+        changes = {name: F(name) + value for name, value in totals.items() if value}
+        if not changes:
+            continue
+        while not MarketplaceSummary.objects.filter(dimension=dimension, key=key).update(updated_at=now, **changes):
+            try:
+                with transaction.atomic():
+                    MarketplaceSummary.objects.create(dimension=dimension, key=key)
+            except IntegrityError:
+                pass  # another writer created it first
+
+
+def _stored(model, pk, fields):
+    """The row's stored values, locked when the caller is inside a transaction"""
+    rows = model.objects.filter(pk=pk)
+    if transaction.get_connection().in_atomic_block:
+        rows = rows.select_for_update()
+    return rows.values(*fields).first()
+
+
+def stored_pool(pool):
+    return None if pool._state.adding else _stored(Pool, pool.pk, POOL_FIELDS)
+
+
+def stored_investment(investment):
+    return None if investment._state.adding else _stored(Investment, investment.pk, INVESTMENT_FIELDS)
+
+
+def pool_changed(before, pool):
+    """Move a pool's totals from its stored values (None: new) to pool's (None: deleted)"""
+    after = {name: getattr(pool, name) for name in POOL_FIELDS} if pool is not None else None
+    deltas = {}
+    for row, sign in ((before, -1), (after, 1)):
+        if row and row['status'] == ACTIVE:
+            _add(deltas, row['pool_type'], row['state'], sign, active_pools=1,
+                 active_amount=_decimal(row['amount']), active_roi_total=_decimal(row['roi_rate']))
+    # A pool that changes type or state takes its funding with it
+    if before and after and _location(before) != _location(after):
+        funding = Investment.objects.filter(pool_id=pool.pk, status__in=FUNDED).aggregate(
+            investments=Count('id'), funded_amount=Sum('amount'))
+        if funding['investments']:
+            for row, sign in ((before, -1), (after, 1)):
+                _add(deltas, row['pool_type'], row['state'], sign, investments=funding['investments'],
+                     funded_amount=funding['funded_amount'])
+    _apply(deltas)
+
+
+def investment_changed(before, investment):
+    """Move an investment's totals from its stored values (None: new) to investment's (None: deleted)"""
+    after = {name: getattr(investment, name) for name in INVESTMENT_FIELDS} if investment is not None else None
+    rows = [(row, sign) for row, sign in ((before, -1), (after, 1)) if row and row['status'] in FUNDED]
+    if not rows:
+        return
+    pools = Pool.objects.filter(pk__in={row['pool_id'] for row, _ in rows}).values_list('pk', 'pool_type', 'state')
+    pools = {pk: (pool_type, state) for pk, pool_type, state in pools}
+    deltas = {}
+    for row, sign in rows:
+        if row['pool_id'] in pools:  # else the pool is being deleted with it
+            _add(deltas, *pools[row['pool_id']], sign, investments=1, funded_amount=_decimal(row['amount']))
+    _apply(deltas)
+
+
+def refresh():
+    """Recompute every summary row from Pool and Investment; returns how many rows there are"""
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Blocks signal updates until this commits; SQLite serializes writers anyway
+            with connection.cursor() as cursor:
+                cursor.execute(f'LOCK TABLE {connection.ops.quote_name(MarketplaceSummary._meta.db_table)} '
+                               'IN EXCLUSIVE MODE')
+        deltas = {}
+        pools = (Pool.objects.filter(status=ACTIVE).order_by().values('pool_type', 'state')
+                 .annotate(count=Count('id'), amount=Sum('amount'), roi=Sum('roi_rate')))
+        for row in pools:
+            _add(deltas, row['pool_type'], row['state'], 1, active_pools=row['count'],
+                 active_amount=row['amount'], active_roi_total=row['roi'])
+        investments = (Investment.objects.filter(status__in=FUNDED).order_by()
+                       .values('pool__pool_type', 'pool__state').annotate(count=Count('id'), amount=Sum('amount')))
+        for row in investments:
+            _add(deltas, row['pool__pool_type'], row['pool__state'], 1, investments=row['count'],
+                 funded_amount=row['amount'])
+        deltas.setdefault(('all', ''), {})
+        MarketplaceSummary.objects.all().delete()
+        MarketplaceSummary.objects.bulk_create([
+            MarketplaceSummary(dimension=dimension, key=key, **totals)
+            for (dimension, key), totals in sorted(deltas.items())
+        ])
+    cache.delete(CACHE_KEY)
+    return len(deltas)
+
+
+def _bucket_payload(row):
+    return {
+        'activePools': row.active_pools,
+        'activeVolume': str(row.active_amount),
+        'averageRoi': str((row.active_roi_total / row.active_pools).quantize(Decimal('0.01')))
+                      if row.active_pools else None,
+        'investments': row.investments,
+        'fundedAmount': str(row.funded_amount),
+    }
+
+
+def marketplace_stats():
+    """The /api/stats payload, cached for MARKETPLACE_STATS_CACHE_SECONDS"""
+    stats = cache.get(CACHE_KEY)
+    if stats is None:
+        rows = list(MarketplaceSummary.objects.all())
+        overall = next((row for row in rows if row.dimension == 'all'), MarketplaceSummary())
+        stats = {
+            **_bucket_payload(overall),
+            'byPoolType': {},
+            'byState': {},
+            'updatedAt': max((row.updated_at for row in rows), default=timezone.now()).isoformat(),
+        }
+        for row in sorted(rows, key=lambda row: row.key):
+            if row.dimension != 'all' and (row.active_pools or row.investments):
+                stats['byPoolType' if row.dimension == 'pool_type' else 'byState'][row.key] = _bucket_payload(row)
+        cache.set(CACHE_KEY, stats, settings.MARKETPLACE_STATS_CACHE_SECONDS)
+    return stats
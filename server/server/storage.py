@@ -0,0 +1,128 @@
+"""
+Where pool documents and property photos are stored.
+
+UPLOAD_STORAGE picks the backend: the local filesystem under MEDIA_ROOT, or
+an S3-compatible bucket through django-storages, configured by the AWS_*
+settings (point AWS_S3_ENDPOINT_URL at MinIO for a local stand-in). boto3
+is slow to import, so the S3 backend is only loaded on first use.
+
+Objects are content-addressed - <prefix>/<sha256[:2]>/<sha256><ext> - so
+identical bytes map to a single object whoever uploads them.
+
+With S3, clients can also upload straight to the bucket: presigned_put()
+signs a PUT whose SHA-256 the store itself enforces, and head() reads back
+the size and checksum the store recorded, so the bytes never pass through
+Django.
+"""
+
+import base64
+import os
+import re
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+EXTENSION_RE = re.compile(r'\.[a-z0-9]{1,8}')
+
+_storage = None
+
+
+def get_storage():
+    global _storage
+    if _storage is None:
+        if settings.UPLOAD_STORAGE == 's3':
+            from storages.backends.s3 import S3Storage
+            # Private objects with short-lived presigned url()s; SigV4 so that
+            # presigned uploads can sign their checksum header
+            _storage = S3Storage(default_acl='private', querystring_auth=True, file_overwrite=True,
+                                 signature_version='s3v4')
+        else:
+            _storage = FileSystemStorage(location=settings.MEDIA_ROOT, base_url=settings.MEDIA_URL)
+    return _storage
+
+
+def content_name(prefix, sha256, filename):
+    """Storage key for content with this digest, keeping a sane extension from the original filename"""
+    ext = os.path.splitext(filename or '')[1].lower()
+    return f"{prefix}/{sha256[:2]}/{sha256}{ext if EXTENSION_RE.fullmatch(ext) else ''}"
+
+
+class StagedFile(File):
+    """A complete file on local disk. FileSystemStorage moves anything with a
+    temporary_file_path() into place instead of copying it; S3 streams it up
+    in multipart chunks."""
+
+    def __init__(self, path, content_type=''):
+        super().__init__(open(path, 'rb'), name=os.path.basename(path))
+        self.path = path
+        self.content_type = content_type
+
+    def temporary_file_path(self):
+        return self.path
+
+
+def save_content(name, path, content_type=''):
+    """Store the file at path as name unless that object already exists; returns the stored name"""
+    storage = get_storage()
+    if storage.exists(name):
+        return name
+    with StagedFile(path, content_type) as content:
+        return storage.save(name, content)
+
+
+def file_url(name):
+    return get_storage().url(name) if name else None
+
+
+def supports_direct_uploads():
+    return settings.UPLOAD_STORAGE == 's3'
+
+
+def _s3():
+    storage = get_storage()
+    return storage.connection.meta.client, storage.bucket_name
+
+
+def presigned_put(name, content_type, sha256, expires):
+    """URL and headers for a client PUT to name; the store rejects a body whose SHA-256 differs"""
+    client, bucket = _s3()
+    checksum = base64.b64encode(bytes.fromhex(sha256)).decode()
+    url = client.generate_presigned_url('put_object', ExpiresIn=expires, Params={
+        'Bucket': bucket, 'Key': name, 'ContentType': content_type,
+        'ChecksumAlgorithm': 'SHA256', 'ChecksumSHA256': checksum,
+    })
+    headers = {
+        'Content-Type': content_type,
+        'x-amz-sdk-checksum-algorithm': 'SHA256',
+        'x-amz-checksum-sha256': checksum,
+    }
+    return url, headers
+
+
+def head(name):
+    """(size, hex SHA-256 or None) of a stored object as the store reports them, or None if it is missing"""
+    from botocore.exceptions import ClientError
+    client, bucket = _s3()
+    try:
+        response = client.head_object(Bucket=bucket, Key=name, ChecksumMode='ENABLED')
+    except ClientError as e:
+        if e.response['ResponseMetadata']['HTTPStatusCode'] == 404:
+            return None
+        raise
+    checksum = response.get('ChecksumSHA256')
+    # Multipart objects report a checksum of part checksums ("...-N"), not of the content
+    sha256 = base64.b64decode(checksum).hex() if checksum and '-' not in checksum else None
+    return response['ContentLength'], sha256
+
+
+def copy(source, name, content_type=''):
+    """Server-side copy within the bucket (multipart for large objects); no bytes come through here"""
+    client, bucket = _s3()
+    extra = {'ContentType': content_type} if content_type else {}
+    client.copy({'Bucket': bucket, 'Key': source}, bucket, name, ExtraArgs=extra)
+    return name
+
+
+def delete(name):
+    get_storage().delete(name)
@@ -0,0 +1,1238 @@
+"""
+Tests: python manage.py test --settings=server.settings_test
+"""
+
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+import warnings
+from datetime import timedelta
+from decimal import Decimal
+from importlib import import_module
+from unittest import mock
+
+import numpy as np
+from django.apps import apps
+from django.core import mail
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import OperationalError, connection, connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.http import JsonResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from . import accounts, email_registry, geo, hashers, ratelimit, search, storage, underwriting, views
+from .db import instrumentation, migrate, pool, routers
+from .db.backends.sqlite3.base import DatabaseWrapper as SQLiteDatabaseWrapper
+from .accounts import create_account
+from .models import (
+    Borrower, EmailVerification, Investment, Investor, MarketplaceSummary, Pool, PoolCoOwner, PoolExistingLoan,
+    PoolLiability, PoolPhoto, RegisteredEmail, StoredFile, Upload,
+)
+from .serializers import INVESTMENT, POOL
+
+SHA_PHOTO = hashlib.sha256(b'0123456789').hexdigest()
+BORROWER_SIGNUP = {
+    'firstName': 'Ada', 'lastName': 'Lovelace', 'email': 'Ada@Example.com', 'phone': '555-555-0100',
+    'dateOfBirth': '1990-01-01', 'password': 'correct horse',
+}
+POOL_CREATE = {
+    'poolType': 'equity', 'firstName': 'Ada', 'lastName': 'Lovelace', 'email': 'ada@example.com',
+    'phone': '555-555-0100', 'dateOfBirth': '1990-01-01', 'ssn': '123-45-6789', 'addressLine1': '1 Main St',
+    'mailingCity': 'Austin', 'mailingState': 'TX', 'mailingZipCode': '78701', 'addressLine': '123 Congress Ave',
+    'city': 'Austin', 'state': 'TX', 'zipCode': '78701', 'percentOwned': '100', 'amount': '100000', 'roiRate': '8',
+    'term': '12', 'propertyValue': '500000', 'mortgageBalance': '100000', 'monthlyIncome': '9000',
+    'coOwners': [{'firstName': 'Charles', 'lastName': 'Babbage', 'percentage': 10}],
+    'liabilities': [{'type': 'card', 'amount': '1000', 'monthlyPayment': '50', 'remainingBalance': '900'}],
+    'existingLoans': [{'loan_amount': 1000, 'remaining_balance': 500}],
+}
+INVESTOR_SIGNUP = {
+    'fullName': 'Grace Hopper', 'email': 'grace@example.com', 'phone': '555-555-0101', 'dateOfBirth': '1985-06-15',
+    'ssn': '123-45-6789', 'address1': '1 Main St', 'city': 'Austin', 'state': 'TX', 'zip': '78701',
+    'country': 'United States', 'password': 'correct horse',
+}
+
+
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        ratelimit._backend = None
+        self.addCleanup(setattr, ratelimit, '_backend', None)
+        self.calls = 0
+
+    def request(self):
+        return RequestFactory().post('/throttled', {'email': 'Someone@Example.com'}, content_type='application/json')
+
+    def sync_view(self):
+        @ratelimit.ratelimit('test', ip='5/m', account='2/m')
+        def view(request):
+            self.calls += 1
+            return JsonResponse({})
+        return view
+
+    def async_view(self):
+        @ratelimit.ratelimit('test', ip='5/m', account='2/m')
+        async def view(request):
+            self.calls += 1
+            return JsonResponse({})
+        return view
+
+    def assert_throttled(self, response):
+        self.assertEqual(response.status_code, 429)
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+    def test_throttles_before_the_view_runs(self):
+        for backend in ('memory', 'cache'):
+            with self.subTest(backend=backend), override_settings(RATELIMIT_BACKEND=backend):
+                cache.clear()
+                ratelimit._backend = None
+                self.calls = 0
+                view = self.sync_view()
+                self.assertEqual([view(self.request()).status_code for _ in range(2)], [200, 200])
+                self.assert_throttled(view(self.request()))
+                self.assertEqual(self.calls, 2)
+
+    async def test_async_view_throttles_before_the_view_runs(self):
+        for backend in ('memory', 'cache'):
+            with self.subTest(backend=backend), override_settings(RATELIMIT_BACKEND=backend):
+                await cache.aclear()
+                ratelimit._backend = None
+                self.calls = 0
+                view = self.async_view()
+                self.assertEqual([(await view(self.request())).status_code for _ in range(2)], [200, 200])
+                self.assert_throttled(await view(self.request()))
+                self.assertEqual(self.calls, 2)
+
+    def test_ip_limit_applies_across_accounts(self):
+        view = self.sync_view()
+        factory = RequestFactory()
+        statuses = [
+            view(factory.post('/throttled', {'email': f'user{n}@example.com'}, content_type='application/json'))
+            .status_code
+            for n in range(6)
+        ]
+        self.assertEqual(statuses, [200] * 5 + [429])
+        self.assertEqual(self.calls, 5)
+
+    @override_settings(RATELIMIT_ENABLED=False)
+    def test_disabled(self):
+        view = self.sync_view()
+        self.assertEqual({view(self.request()).status_code for _ in range(5)}, {200})
+
+
+@override_settings(ADMIN_API_TOKEN='admin-token')
+class AdminStatsTests(TestCase):
+    urls = ('/api/health/connections', '/api/health/ratelimits', '/api/health/email-checks')
+
+    def test_requires_admin(self):
+        for url in self.urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 403)
+                self.assertEqual(self.client.get(url, HTTP_X_ADMIN_TOKEN='wrong').status_code, 403)
+                self.assertEqual(self.client.get(url, HTTP_X_ADMIN_TOKEN='admin-token').status_code, 200)
+
+
+class RegisteredEmailTests(TestCase):
+    def signup(self, role, payload):
+        response = self.client.post(f'/api/{role}s/signup', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+    def test_borrower_signup_registers_email(self):
+        user_id = self.signup('borrower', BORROWER_SIGNUP)
+        self.assertEqual(
+            list(RegisteredEmail.objects.values_list('email', 'role', 'user_id')),
+            [('ada@example.com', 'borrower', user_id)],
+        )
+
+    def test_investor_signup_registers_email(self):
+        user_id = self.signup('investor', INVESTOR_SIGNUP)
+        self.assertEqual(
+            list(RegisteredEmail.objects.values_list('email', 'role', 'user_id')),
+            [('grace@example.com', 'investor', user_id)],
+        )
+
+    def test_email_change_updates_row(self):
+        user_id = self.signup('borrower', BORROWER_SIGNUP)
+        borrower = Borrower.objects.get(pk=user_id)
+        borrower.email = 'ada.king@example.com'
+        borrower.save(update_fields=['email'])
+        self.assertEqual(list(RegisteredEmail.objects.values_list('email', flat=True)), ['ada.king@example.com'])
+
+    def test_delete_removes_row(self):
+        borrower_id = self.signup('borrower', BORROWER_SIGNUP)
+        investor_id = self.signup('investor', INVESTOR_SIGNUP)
+        Borrower.objects.get(pk=borrower_id).delete()
+        self.assertEqual(list(RegisteredEmail.objects.values_list('role', flat=True)), ['investor'])
+        Investor.objects.get(pk=investor_id).delete()
+        self.assertFalse(RegisteredEmail.objects.exists())
+
+    def check_registered(self, email):
+        with mock.patch.object(email_registry, '_current_filter', return_value=None):
+            return email_registry.is_email_registered(email)
+
+    def test_email_change_releases_old_email(self):
+        cache.clear()
+        user_id = self.signup('borrower', BORROWER_SIGNUP)
+        self.assertTrue(self.check_registered('ada@example.com'))
+        self.assertFalse(self.check_registered('ada.king@example.com'))
+        borrower = Borrower.objects.get(pk=user_id)
+        borrower.email = 'ada.king@example.com'
+        with self.captureOnCommitCallbacks(execute=True):
+            borrower.save(update_fields=['email'])
+        self.assertFalse(self.check_registered('ada@example.com'))
+        self.assertTrue(self.check_registered('ada.king@example.com'))
+
+    def test_delete_releases_email(self):
+        cache.clear()
+        user_id = self.signup('borrower', BORROWER_SIGNUP)
+        self.assertTrue(self.check_registered('ada@example.com'))
+        with self.captureOnCommitCallbacks(execute=True):
+            Borrower.objects.get(pk=user_id).delete()
+        self.assertFalse(self.check_registered('ada@example.com'))
+
+
+class EmailRegistryTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(email_registry, '_start_rebuild')
+        self.start_rebuild = patcher.start()
+        self.addCleanup(patcher.stop)
+        filter_patcher = mock.patch.object(email_registry, '_filter', None)
+        filter_patcher.start()
+        self.addCleanup(filter_patcher.stop)
+        RegisteredEmail.objects.create(email='taken@example.com', role='borrower', user_id=1)
+
+    def test_answers_from_database_until_filter_is_built(self):
+        with self.assertNumQueries(2):
+            self.assertTrue(email_registry.is_email_registered('Taken@Example.com'))
+            self.assertFalse(email_registry.is_email_registered('free@example.com'))
+        self.start_rebuild.assert_called()
+
+    def test_filter_answers_unregistered_emails_without_queries(self):
+        bloom = email_registry.BloomFilter(10)
+        bloom.add('taken@example.com')
+        with mock.patch.object(email_registry, '_filter', bloom), \
+                mock.patch.object(email_registry, '_filter_built_at', email_registry.time.monotonic()):
+            with self.assertNumQueries(0):
+                self.assertFalse(email_registry.is_email_registered('free@example.com'))
+            with self.assertNumQueries(1):
+                self.assertTrue(email_registry.is_email_registered('taken@example.com'))
+        self.start_rebuild.assert_not_called()
+
+
+class SignupQueryCountTests(TestCase):
+    """Signups write the account, its RegisteredEmail row, its token and its session
+    (existence check and insert) in one transaction, with no read-back; the
+    session middleware then saves the session once more (BEGIN, UPDATE, COMMIT)."""
+
+    def assert_signup_queries(self, role, payload):
+        with self.assertNumQueries(12):
+            response = self.client.post(f'/api/{role}s/signup', payload, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(response.json()['token'])
+        self.assertEqual(self.client.session[f'{role}_id'], response.json()['id'])
+
+    def test_borrower_signup(self):
+        self.assert_signup_queries('borrower', BORROWER_SIGNUP)
+
+    def test_investor_signup(self):
+        self.assert_signup_queries('investor', INVESTOR_SIGNUP)
+
+    def test_verified_signup(self):
+        verification = EmailVerification(email='ada@example.com', user_type='borrower', user_data=BORROWER_SIGNUP)
+        code = verification.set_code()
+        verification.save()
+        # An unlocked verification lookup (the password is hashed after it),
+        # then in a savepoint the locked lookup, the consumed verification,
+        # account, RegisteredEmail row and token; no session
+        with self.assertNumQueries(10):
+            response = self.client.post('/api/auth/verify-email-code', {
+                'email': 'ada@example.com', 'code': code, 'user_type': 'borrower',
+            }, content_type='application/json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(Borrower.objects.get(email='ada@example.com').email_verified)
+        verification.refresh_from_db()
+        self.assertTrue(verification.verified)
+
+
+class LoginHasherTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.borrower, _ = create_account('borrower', {
+            'first_name': 'Ada', 'last_name': 'Lovelace', 'email': 'ada@example.com', 'phone': '555-555-0100',
+            'date_of_birth': '1990-01-01', 'password': 'correct horse',
+        })
+
+    def login(self, password='correct horse'):
+        return self.client.post('/api/borrowers/login', {'email': 'ada@example.com', 'password': password},
+                                content_type='application/json')
+
+    def test_login_rehashes_with_new_cost(self):
+        self.assertTrue(self.borrower.password_hash.startswith('pbkdf2_sha256$1000$'))
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=1200):
+            self.assertEqual(self.login().status_code, 200)
+        self.borrower.refresh_from_db()
+        self.assertTrue(self.borrower.password_hash.startswith('pbkdf2_sha256$1200$'))
+        self.assertEqual(self.login().status_code, 200)
+
+    def test_login_rehashes_with_new_algorithm(self):
+        with override_settings(PASSWORD_HASHERS=['server.hashers.ScryptPasswordHasher',
+                                                 'server.hashers.PBKDF2PasswordHasher'],
+                               PASSWORD_SCRYPT_WORK_FACTOR=2 ** 10):
+            self.assertEqual(self.login().status_code, 200)
+            self.borrower.refresh_from_db()
+            self.assertTrue(self.borrower.password_hash.startswith('scrypt$1024$'))
+            self.assertEqual(self.login().status_code, 200)
+
+    def test_wrong_password_is_not_rehashed(self):
+        original = self.borrower.password_hash
+        with override_settings(PASSWORD_PBKDF2_ITERATIONS=1200):
+            self.assertEqual(self.login('wrong horse').status_code, 401)
+        self.borrower.refresh_from_db()
+        self.assertEqual(self.borrower.password_hash, original)
+
+    def test_busy_hasher_returns_503(self):
+        # No free slots: every worker and queue place is taken
+        with mock.patch.object(hashers, '_get_executor', return_value=(None, threading.Semaphore(0))):
+            response = self.login()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response['Retry-After'], '1')
+
+
+@override_settings(DEFAULT_FROM_EMAIL='noreply@example.com', EMAIL_VERIFICATION_MAX_ATTEMPTS=3,
+                   RATELIMIT_ENABLED=False)
+class EmailVerificationTests(TestCase):
+    def post(self, path, payload):
+        return self.client.post(f'/api/auth/{path}', payload, content_type='application/json')
+
+    def send(self, path='send-verification-email'):
+        mail.outbox.clear()
+        response = self.post(path, {'email': 'ada@example.com', 'user_type': 'borrower', 'user_data': BORROWER_SIGNUP})
+        self.assertEqual(response.status_code, 200, response.content)
+        return mail.outbox[0].body.split('Your verification code is: ')[1][:4]
+
+    def verify(self, code):
+        return self.post('verify-email-code', {'email': 'ada@example.com', 'code': code, 'user_type': 'borrower'})
+
+    def wrong(self, code):
+        return f'{(int(code) + 1) % 10000:04d}'
+
+    def guess_wrong(self, code, times):
+        for _ in range(times):
+            self.assertEqual(self.verify(self.wrong(code)).status_code, 400)
+
+    def test_correct_code_creates_account(self):
+        response = self.verify(self.send())
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertTrue(Borrower.objects.get(email='ada@example.com').email_verified)
+
+    def test_password_is_hashed_before_the_row_lock(self):
+        code = self.send()
+        outer = len(connection.atomic_blocks)
+        depths = []
+
+        def make_password(password, make_password=accounts.make_password):
+            depths.append(len(connection.atomic_blocks))
+            return make_password(password)
+
+        with mock.patch.object(accounts, 'make_password', make_password):
+            self.assertEqual(self.verify(self.wrong(code)).status_code, 400)
+            self.assertEqual(depths, [])
+            self.assertEqual(self.verify(code).status_code, 201)
+        self.assertEqual(depths, [outer])
+
+    def test_locks_after_max_attempts(self):
+        code = self.send()
+        self.guess_wrong(code, 3)
+        response = self.verify(code)
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 3000)
+        self.assertFalse(Borrower.objects.exists())
+
+    def test_new_codes_keep_counting_attempts(self):
+        self.guess_wrong(self.send(), 2)
+        self.guess_wrong(self.send('resend-verification-email'), 1)
+        for path in ('resend-verification-email', 'send-verification-email'):
+            with self.subTest(path=path):
+                self.assertEqual(self.verify(self.send(path)).status_code, 429)
+        self.assertEqual(EmailVerification.objects.count(), 1)
+
+    def test_attempts_reset_after_window(self):
+        self.guess_wrong(self.send(), 3)
+        EmailVerification.objects.update(attempts_reset_at=timezone.now() - timedelta(seconds=1))
+        code = self.send('resend-verification-email')
+        verification = EmailVerification.objects.get()
+        self.assertEqual(verification.attempts, 0)
+        self.assertEqual(self.verify(code).status_code, 201)
+
+    def test_wrong_code_after_window_starts_a_new_one(self):
+        code = self.send()
+        self.guess_wrong(code, 2)
+        EmailVerification.objects.update(attempts_reset_at=timezone.now() - timedelta(seconds=1))
+        self.guess_wrong(code, 1)
+        verification = EmailVerification.objects.get()
+        self.assertEqual(verification.attempts, 1)
+        self.assertGreater(verification.attempts_reset_at, timezone.now())
+
+    @override_settings(RATELIMIT_ENABLED=True, RATELIMIT_BACKEND='memory')
+    def test_sends_are_rate_limited_per_email(self):
+        cache.clear()
+        ratelimit._backend = None
+        self.addCleanup(setattr, ratelimit, '_backend', None)
+        for _ in range(3):
+            self.send()
+        response = self.post('send-verification-email',
+                             {'email': 'ada@example.com', 'user_type': 'borrower', 'user_data': BORROWER_SIGNUP})
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+
+@override_settings(ZIP_CENTROIDS_FILE='/nonexistent/zcta_centroids.txt')
+class MissingZipCentroidsTests(TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(geo, '_centroids', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_system_check_warns(self):
+        self.assertEqual([warning.id for warning in geo.check_zip_centroids()], ['server.W001'])
+
+    def test_geocode_command_fails(self):
+        with self.assertLogs('server.geo', 'WARNING'), self.assertRaisesMessage(CommandError, '/nonexistent/'):
+            call_command('geocode_pools')
+
+
+class PoolTestCase(TestCase):
+    """A borrower and an investor; create_pool() adds a pool through the API"""
+
+    @classmethod
+    def setUpTestData(cls):
+        _, cls.borrower_token = create_account('borrower', {
+            'first_name': 'Ada', 'last_name': 'Lovelace', 'email': 'ada@example.com', 'phone': '555-555-0100',
+            'date_of_birth': '1990-01-01', 'password': 'correct horse',
+        })
+        _, cls.investor_token = create_account('investor', {
+            'full_name': 'Grace Hopper', 'email': 'grace@example.com', 'phone': '555-555-0101',
+            'date_of_birth': '1985-06-15', 'ssn': '123-45-6789', 'address1': '1 Main St', 'city': 'Austin',
+            'state': 'TX', 'zip_code': '78701', 'password': 'correct horse',
+        })
+
+    def auth(self, token):
+        return {'HTTP_AUTHORIZATION': f'Bearer {token}'}
+
+    def create_pool(self, **fields):
+        response = self.client.post('/api/pools/create', {**POOL_CREATE, **fields}, content_type='application/json',
+                                    **self.auth(self.borrower_token))
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()['id']
+
+
+class PoolFieldsTests(PoolTestCase):
+    """Every field a role may ask for through ?fields= renders on every view that offers it"""
+
+    def setUp(self):
+        self.pool_id = self.create_pool()
+        Pool.objects.filter(pk=self.pool_id).update(status='active', latitude=30.27, longitude=-97.74,
+                                                    geohash=geo.geohash(30.27, -97.74))
+        PoolPhoto.objects.create(pool_id=self.pool_id, position=0, name='photos/front.jpg')
+        PoolPhoto.objects.create(pool_id=self.pool_id, position=1, name='photos/back.jpg')
+        StoredFile.objects.create(sha256='0' * 64, name='photos/front.jpg', size=1, derivatives_status='ready',
+                                  derivatives={'small.webp': 'photos/front-small.webp'})
+        response = self.client.post(f'/api/investor/pools/{self.pool_id}/invest', {'amount': '1000'},
+                                    content_type='application/json', **self.auth(self.investor_token))
+        self.assertEqual(response.status_code, 201, response.content)
+
+    def fetch(self, url, token, field, method='get'):
+        separator = '&' if '?' in url else '?'
+        # The update view renders the pool after a PATCH (here one that changes nothing)
+        data = {'city': 'Austin'} if method == 'patch' else None
+        response = getattr(self.client, method)(f'{url}{separator}fields={field}', data,
+                                                content_type='application/json', **self.auth(token))
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_every_allowed_field_on_every_view(self):
+        pool_id = self.pool_id
+        views = [
+            # role, url, items in the response, token
+            ('borrower', '/api/pools', lambda data: data['pools'], self.borrower_token, 'get'),
+            ('borrower', f'/api/pools/{pool_id}', lambda data: [data], self.borrower_token, 'get'),
+            ('borrower', f'/api/pools/{pool_id}/update', lambda data: [data], self.borrower_token, 'patch'),
+            ('investor', '/api/investor/pools', lambda data: data['pools'], self.investor_token, 'get'),
+            ('investor', f'/api/investor/pools/{pool_id}', lambda data: [data], self.investor_token, 'get'),
+            ('investor', '/api/investor/pools/nearby?lat=30.27&lon=-97.74', lambda data: data['pools'],
+             self.investor_token, 'get'),
+            ('investor', '/api/investor/pools/map?south=30&west=-98&north=31&east=-97', lambda data: data['pools'],
+             self.investor_token, 'get'),
+        ]
+        for role, url, items, token, method in views:
+            for field in POOL.roles[role]:
+                with self.subTest(url=url, field=field):
+                    [item] = items(self.fetch(url, token, field, method))
+                    self.assertIn(field, item)
+        for field in INVESTMENT.roles['investor']:
+            with self.subTest(url='/api/investor/investments', field=field):
+                [item] = self.fetch('/api/investor/investments', self.investor_token, field)['investments']
+                self.assertIn(field, item)
+
+    def test_photo_urls(self):
+        front = {'small': {'webp': '/media/photos/front-small.webp'}}
+        for url, items in (
+            (f'/api/pools/{self.pool_id}', lambda data: [data]),
+            ('/api/investor/pools', lambda data: data['pools']),
+            (f'/api/investor/pools/{self.pool_id}', lambda data: [data]),
+        ):
+            token = self.borrower_token if url.startswith('/api/pools') else self.investor_token
+            with self.subTest(url=url):
+                [item] = items(self.fetch(url, token, 'propertyPhotoDerivatives'))
+                self.assertEqual(item['propertyPhotoDerivatives'], [front, None])
+        [item] = self.fetch('/api/investor/pools', self.investor_token, 'coverPhoto')['pools']
+        self.assertEqual(item['coverPhoto'], front)
+
+
+class PoolChildrenTests(PoolTestCase):
+    """The child tables mirror the pool's JSON lists, and the risk filters sum them"""
+
+    def setUp(self):
+        self.pool_id = self.create_pool(loanAmount='1000', remainingBalance='500')
+
+    def rows(self, model, *columns):
+        return list(model.objects.filter(pool_id=self.pool_id).order_by('position').values_list('position', *columns))
+
+    def test_create_mirrors_lists(self):
+        self.assertEqual(self.rows(PoolCoOwner, 'first_name', 'last_name', 'percentage'),
+                         [(0, 'Charles', 'Babbage', Decimal('10.00'))])
+        self.assertEqual(self.rows(PoolLiability, 'type', 'amount', 'monthly_payment', 'remaining_balance'),
+                         [(0, 'card', Decimal('1000.00'), Decimal('50.00'), Decimal('900.00'))])
+        self.assertEqual(self.rows(PoolExistingLoan, 'loan_amount', 'remaining_balance'),
+                         [(0, Decimal('1000.00'), Decimal('500.00'))])
+        self.assertEqual(self.rows(PoolPhoto, 'name'), [])
+
+    def test_update_fields_save_rewrites_only_those_lists(self):
+        co_owner_ids = list(PoolCoOwner.objects.filter(pool_id=self.pool_id).values_list('id', flat=True))
+        pool = Pool.objects.get(pk=self.pool_id)
+        pool.liabilities = [{'type': 'car', 'amount': '$2,500', 'monthlyPayment': '300'}, 'junk', {'type': 'boat'}]
+        pool.property_photos = ['photos/a.jpg', '', 'photos/b.jpg']
+        pool.save(update_fields=['liabilities', 'property_photos'])
+        self.assertEqual(self.rows(PoolLiability, 'type', 'amount', 'monthly_payment'),
+                         [(0, 'car', Decimal('2500.00'), Decimal('300.00')), (2, 'boat', None, None)])
+        self.assertEqual(self.rows(PoolPhoto, 'name'), [(0, 'photos/a.jpg'), (2, 'photos/b.jpg')])
+        self.assertEqual(list(PoolCoOwner.objects.filter(pool_id=self.pool_id).values_list('id', flat=True)),
+                         co_owner_ids)
+
+        # A save that leaves the lists out doesn't touch their rows, even if they changed in memory
+        pool.liabilities = []
+        pool.city = 'Round Rock'
+        pool.save(update_fields=['city'])
+        self.assertEqual(len(self.rows(PoolLiability)), 2)
+
+    def test_risk_filters_use_child_rows(self):
+        other_id = self.create_pool()
+        other = Pool.objects.get(pk=other_id)
+        other.liabilities = [{'amount': '4000', 'monthlyPayment': '200'}, {'amount': '1000', 'monthlyPayment': '100'}]
+        other.existing_loans = []
+        other.save(update_fields=['liabilities', 'existing_loans'])
+        Pool.objects.update(status='active')
+        # The JSON stays as sent; only the rows are read
+        Pool.objects.filter(pk=other_id).update(liabilities=[])
+
+        for query, expected in (
+            ('maxLiabilities=1000', [self.pool_id]),
+            ('maxLiabilities=5000', [other_id, self.pool_id]),
+            ('maxMonthlyLiabilityPayments=$299.99', [self.pool_id]),
+            ('maxExistingLoanBalance=0', [other_id]),
+            ('maxLiabilities=5000&maxExistingLoanBalance=100', [other_id]),
+        ):
+            with self.subTest(query=query):
+                response = self.client.get(f'/api/investor/pools?{query}&fields=id', **self.auth(self.investor_token))
+                self.assertEqual(response.status_code, 200, response.content)
+                self.assertEqual([pool['id'] for pool in response.json()['pools']], expected)
+        response = self.client.get('/api/investor/pools?maxLiabilities=lots', **self.auth(self.investor_token))
+        self.assertEqual(response.status_code, 400)
+
+
+class UnderwritingTests(PoolTestCase):
+    def setUp(self):
+        # liens = 100000 mortgage + 500 existing loan; monthly debts = the 50 liability payment
+        self.pool_id = self.create_pool(loanAmount='1000', remainingBalance='500')
+
+    def metrics(self):
+        return Pool.objects.values(*underwriting.METRICS).get(pk=self.pool_id)
+
+    def patch(self, **fields):
+        response = self.client.patch(f'/api/pools/{self.pool_id}/update?fields=underwriting', fields,
+                                     content_type='application/json', **self.auth(self.borrower_token))
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()['underwriting']
+
+    def test_known_values(self):
+        self.assertEqual(self.metrics(), {
+            'ltv': Decimal('20.00'),  # 100000 / 500000
+            'cltv': Decimal('40.10'),  # (100500 + 100000) / 500000
+            'equity_available': Decimal('399500.00'),  # 500000 - 100500
+            'dti': Decimal('7.96'),  # (50 + 100000 * 8% / 12) / 9000
+        })
+
+    def test_declared_debts_replace_liability_payments(self):
+        self.assertEqual(self.patch(monthlyDebtPayments='1000')['dti'], '18.52')  # (1000 + 666.67) / 9000
+
+    def test_zero_or_missing_denominators(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            self.assertEqual(self.patch(propertyValue='0', monthlyIncome='0'),
+                             {'ltv': None, 'cltv': None, 'equityAvailable': '-100500.00', 'dti': None})
+            self.assertEqual(self.patch(propertyValue=None, monthlyIncome=None),
+                             {'ltv': None, 'cltv': None, 'equityAvailable': None, 'dti': None})
+
+    def test_update_recomputes(self):
+        self.assertEqual(self.patch(mortgageBalance='200000'),
+                         {'ltv': '40.00', 'cltv': '60.10', 'equityAvailable': '299500.00', 'dti': '7.96'})
+        self.assertEqual(self.metrics()['ltv'], Decimal('40.00'))
+        # Columns the metrics don't read leave them alone
+        with mock.patch.object(views, 'underwrite_pool') as underwrite_pool:
+            self.patch(city='Round Rock')
+        underwrite_pool.assert_not_called()
+
+
+class MarketplaceSummaryTests(PoolTestCase):
+    """The running totals match a fresh aggregate after every kind of write"""
+
+    TOTALS = ('active_pools', 'active_amount', 'active_roi_total', 'investments', 'funded_amount')
+
+    def summary(self):
+        return {
+            (row['dimension'], row['key']): {name: row[name] for name in self.TOTALS}
+            for row in MarketplaceSummary.objects.values('dimension', 'key', *self.TOTALS)
+            if any(row[name] for name in self.TOTALS)
+        }
+
+    def aggregate(self):
+        totals = {}
+
+        def add(pool, **values):
+            for bucket in (('all', ''), ('pool_type', pool.pool_type), ('state', pool.state.strip())):
+                bucket_totals = totals.setdefault(bucket, dict.fromkeys(self.TOTALS, 0))
+                for name, value in values.items():
+                    bucket_totals[name] += value
+
+        for pool in Pool.objects.filter(status='active'):
+            add(pool, active_pools=1, active_amount=pool.amount, active_roi_total=pool.roi_rate)
+        for investment in Investment.objects.filter(status__in=('active', 'completed')).select_related('pool'):
+            add(investment.pool, investments=1, funded_amount=investment.amount)
+        return totals
+
+    def assert_summary_matches(self):
+        self.assertEqual(self.summary(), self.aggregate())
+
+    def set_pool(self, pool_id, **fields):
+        pool = Pool.objects.get(pk=pool_id)
+        for name, value in fields.items():
+            setattr(pool, name, value)
+        pool.save(update_fields=[*fields, 'updated_at'])
+
+    def test_summary_follows_every_write(self):
+        first, second = self.create_pool(), self.create_pool(poolType='refinance', state='CA', amount='250000')
+        self.assert_summary_matches()
+        self.set_pool(first, status='active')
+        self.set_pool(second, status='active')
+        self.assert_summary_matches()
+
+        response = self.client.post(f'/api/investor/pools/{first}/invest', {'amount': '1000'},
+                                    content_type='application/json', **self.auth(self.investor_token))
+        self.assertEqual(response.status_code, 201, response.content)
+        investment = Investment.objects.get()
+        investment.status = 'active'
+        investment.save()
+        self.assert_summary_matches()
+
+        response = self.client.patch(f'/api/pools/{first}/update', {'amount': '120000', 'roiRate': '9.5'},
+                                     content_type='application/json', **self.auth(self.borrower_token))
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assert_summary_matches()
+
+        # Moving state moves the pool's funding with it
+        self.set_pool(first, state='NM')
+        self.assert_summary_matches()
+
+        self.set_pool(second, status='funded')
+        self.assert_summary_matches()
+        self.set_pool(second, status='active')
+        self.assert_summary_matches()
+
+        investment.delete()
+        self.assert_summary_matches()
+        Pool.objects.get(pk=second).delete()
+        self.assert_summary_matches()
+        Pool.objects.get(pk=first).delete()
+        self.assertEqual(self.summary(), {})
+
+
+class PoolSearchTests(PoolTestCase):
+    """The test database is built without migrations, so the full-text index
+    migration 0024 creates is built here and dropped afterwards"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Outside the class-wide transaction: SQLite can't change schema inside one
+        with connection.schema_editor() as editor:
+            import_module('server.migrations.0024_pool_search').create_search_index(apps, editor)
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        with connection.schema_editor() as editor:
+            if connection.vendor == 'postgresql':
+                editor.execute('DROP INDEX IF EXISTS server_poolsearch_trgm_idx')
+                editor.execute('ALTER TABLE server_poolsearch DROP COLUMN vector')
+            else:
+                for trigger in ('ai', 'ad', 'au'):
+                    editor.execute(f'DROP TRIGGER server_poolsearch_{trigger}')
+                editor.execute('DROP TABLE server_poolsearch_fts')
+        search._trigrams = None
+
+    def setUp(self):
+        search._trigrams = None
+        self.congress = self.create_pool(addressLine='123 Congress Ave', zipCode='78701')
+        self.main = self.create_pool(addressLine='9 Main St', city='Dallas', zipCode='75201')
+        self.oak = self.create_pool(addressLine='5 Oak St', zipCode='78702')
+        self.set_status(self.oak, 'draft')
+
+    def set_status(self, pool_id, status):
+        pool = Pool.objects.get(pk=pool_id)
+        pool.status = status
+        pool.save(update_fields=['status', 'updated_at'])
+
+    def search(self, q, **params):
+        response = self.client.get('/api/investor/pools/search', {'q': q, 'fields': 'id', **params},
+                                   **self.auth(self.investor_token))
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def found(self, q):
+        return [pool['id'] for pool in self.search(q)['pools']]
+
+    def test_words_match_as_prefixes(self):
+        self.assertEqual(self.found('aus tx 787'), [self.congress])
+        self.assertEqual(self.found('Congress, Austin'), [self.congress])
+        self.assertEqual(self.found('dal'), [self.main])
+        self.assertEqual(self.found('austin houston'), [])
+
+    def test_only_active_pools(self):
+        self.assertEqual(self.found('oak'), [])
+        self.set_status(self.oak, 'active')
+        self.set_status(self.congress, 'funded')
+        self.assertEqual(self.found('austin'), [self.oak])
+
+    def test_ranking_and_pages(self):
+        # "austin" twice in a document of the same length ranks it first. Other
+        # documents make the word rare enough for bm25 to weigh it at all.
+        for number in range(4):
+            self.create_pool(addressLine=f'{number} Elm St', city='Dallas', zipCode='75201')
+        best = self.create_pool(addressLine='1 Austin Ave', zipCode='78703')
+        first = self.search('austin', pageSize=1)
+        self.assertEqual([pool['id'] for pool in first['pools']], [best])
+        self.assertTrue(first['hasMore'])
+        second = self.search('austin', pageSize=1, page=2)
+        self.assertEqual([pool['id'] for pool in second['pools']], [self.congress])
+        self.assertFalse(second['hasMore'])
+        self.assertGreater(first['pools'][0]['rank'], second['pools'][0]['rank'])
+        self.assertEqual(self.search('austin', pageSize=1, page=3), {'pools': [], 'page': 3, 'pageSize': 1,
+                                                                     'hasMore': False})
+
+    def test_index_follows_updates(self):
+        response = self.client.patch(f'/api/pools/{self.congress}/update',
+                                     {'addressLine': '77 Pecan St', 'city': 'Round Rock', 'zipCode': '78664'},
+                                     content_type='application/json', **self.auth(self.borrower_token))
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.found('pecan round rock 786'), [self.congress])
+        self.assertEqual(self.found('congress'), [])
+        self.assertEqual(self.found('austin'), [])
+        self.set_status(self.congress, 'cancelled')
+        self.assertEqual(self.found('pecan'), [])
+
+
+class GeoTests(PoolTestCase):
+    """Geocoding from a small ZIP_CENTROIDS_FILE, the geohash index and nearby queries"""
+
+    CENTROIDS = {
+        '78701': (30.270, -97.740),  # Austin
+        '78702': (30.263, -97.714),  # East Austin, ~2.6 km away
+        '78664': (30.510, -97.680),  # Round Rock, ~27.3 km away
+        '75201': (32.790, -96.800),  # Dallas, ~295 km away
+    }
+
+    def setUp(self):
+        centroids = tempfile.NamedTemporaryFile('w', suffix='.txt', delete=False)
+        self.addCleanup(os.remove, centroids.name)
+        with centroids:
+            # The Gazetteer's layout: tab-separated, other columns too, a padded last header
+            centroids.write('GEOID\tALAND\tINTPTLAT\tINTPTLONG                  \n')
+            for zip_code, (lat, lon) in self.CENTROIDS.items():
+                centroids.write(f'{zip_code}\t1000\t{lat:.6f}\t{lon:.6f}\n')
+        settings_override = override_settings(ZIP_CENTROIDS_FILE=centroids.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        patcher = mock.patch.object(geo, '_centroids', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.pools = {zip_code: self.create_pool(zipCode=zip_code) for zip_code in self.CENTROIDS}
+
+    def test_geohash_matches_base32_geohash(self):
+        alphabet = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+        def from_base32(text):
+            value = 0
+            for char in text:
+                value = value << 5 | alphabet.index(char)
+            return value
+
+        # The example point from the geohash reference: u4pruydqqvj
+        self.assertEqual(geo.geohash(57.64911, 10.40744), from_base32('u4pruydqqv'))
+        self.assertEqual(geo.geohash(-90, -180), 0)
+        self.assertEqual(geo.geohash(90, 180), (1 << geo.GEOHASH_BITS) - 1)
+        latitudes, longitudes = zip(*self.CENTROIDS.values())
+        self.assertEqual(geo.geohashes(np.array(latitudes), np.array(longitudes)).tolist(),
+                         [geo.geohash(lat, lon) for lat, lon in self.CENTROIDS.values()])
+
+    def test_pools_are_geocoded(self):
+        pool = Pool.objects.get(pk=self.pools['78664'])
+        self.assertEqual((pool.latitude, pool.longitude), self.CENTROIDS['78664'])
+        self.assertEqual(pool.geohash, geo.geohash(*self.CENTROIDS['78664']))
+
+    def test_cover_holds_every_point_in_the_box(self):
+        for box in ((30.1, -97.9, 30.5, -97.5), (-10.0, -5.0, 10.0, 5.0), (29.0, -100.0, 33.5, -95.0)):
+            with self.subTest(box=box):
+                ranges = geo._cover(*box)
+                self.assertLessEqual(len(ranges), geo.MAX_CELLS)
+                self.assertEqual(ranges, sorted(ranges))
+                south, west, north, east = box
+                for lat in np.linspace(south, north, 25):
+                    for lon in np.linspace(west, east, 25):
+                        code = geo.geohash(lat, lon)
+                        self.assertTrue(any(low <= code < high for low, high in ranges), (lat, lon))
+        # Dallas is well outside the cells of an Austin viewport
+        code = geo.geohash(*self.CENTROIDS['75201'])
+        self.assertFalse(any(low <= code < high for low, high in geo._cover(30.1, -97.9, 30.5, -97.5)))
+
+    def nearby(self, **params):
+        params = {'lat': 30.27, 'lon': -97.74, 'fields': 'id', **params}
+        response = self.client.get('/api/investor/pools/nearby', params, **self.auth(self.investor_token))
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_radius_is_exact(self):
+        # Round Rock is inside the box around a 27 km radius but 27.3 km away
+        self.assertEqual([pool['id'] for pool in self.nearby(radiusKm=27)['pools']],
+                         [self.pools['78701'], self.pools['78702']])
+        pools = self.nearby(radiusKm=30)['pools']
+        self.assertEqual([pool['id'] for pool in pools],
+                         [self.pools['78701'], self.pools['78702'], self.pools['78664']])
+        self.assertEqual(pools[0]['distanceKm'], 0)
+        self.assertAlmostEqual(pools[1]['distanceKm'], 2.6, delta=0.1)
+        self.assertAlmostEqual(pools[2]['distanceKm'], 27.3, delta=0.1)
+        self.assertEqual(len(self.nearby(radiusKm=300)['pools']), 4)
+
+    def test_nearest_first_in_pages(self):
+        Pool.objects.filter(pk=self.pools['78702']).update(status='draft')
+        first = self.nearby(radiusKm=300, pageSize=2)
+        self.assertEqual([pool['id'] for pool in first['pools']], [self.pools['78701'], self.pools['78664']])
+        self.assertEqual((first['count'], first['hasMore']), (3, True))
+        second = self.nearby(radiusKm=300, pageSize=2, page=2)
+        self.assertEqual([pool['id'] for pool in second['pools']], [self.pools['75201']])
+        self.assertFalse(second['hasMore'])
+        response = self.client.get('/api/investor/pools/nearby', {'lat': 91, 'lon': 0},
+                                   **self.auth(self.investor_token))
+        self.assertEqual(response.status_code, 400)
+
+
+class UpdatePoolTests(PoolTestCase):
+    def setUp(self):
+        self.pool_id = self.create_pool()
+
+    def patch(self, body, **headers):
+        return self.client.patch(f'/api/pools/{self.pool_id}/update', body, content_type='application/json',
+                                 **self.auth(self.borrower_token), **headers)
+
+    def pool_updates(self, queries):
+        """The columns set by each UPDATE of server_pool"""
+        updates = []
+        for query in queries:
+            sql = query['sql']
+            if sql.startswith('UPDATE "server_pool" SET'):
+                assignments = sql[len('UPDATE "server_pool" SET'):sql.index(' WHERE ')]
+                updates.append(set(re.findall(r'"(\w+)" = ', assignments)))
+        return updates
+
+    def test_writes_only_changed_columns(self):
+        # state is unchanged, so only city and roi_rate (plus updated_at) are written
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch({'city': 'Dallas', 'state': 'TX', 'roiRate': '9'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.pool_updates(queries), [{'city', 'roi_rate', 'updated_at'}])
+        pool = Pool.objects.get(pk=self.pool_id)
+        self.assertEqual((pool.city, pool.state, pool.roi_rate), ('Dallas', 'TX', Decimal('9.00')))
+        self.assertEqual(response.json()['city'], 'Dallas')
+
+    def test_unchanged_body_writes_nothing(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.patch({'city': 'Austin'})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.pool_updates(queries), [])
+
+    def test_stale_updated_at_conflicts(self):
+        updated_at = Pool.objects.get(pk=self.pool_id).updated_at.isoformat()
+        self.assertEqual(self.patch({'city': 'Dallas', 'updatedAt': updated_at}).status_code, 200)
+        response = self.patch({'city': 'Houston', 'updatedAt': updated_at})
+        self.assertEqual(response.status_code, 409)
+        pool = Pool.objects.get(pk=self.pool_id)
+        self.assertEqual(response.json()['updatedAt'], pool.updated_at.isoformat())
+        self.assertEqual(pool.city, 'Dallas')
+
+    def test_return_minimal(self):
+        response = self.patch({'city': 'Dallas'}, HTTP_PREFER='return=minimal')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(response['Preference-Applied'], 'return=minimal')
+        pool = Pool.objects.get(pk=self.pool_id)
+        self.assertEqual(response['X-Updated-At'], pool.updated_at.isoformat())
+        # The header is good for the next conditional update
+        response = self.patch({'city': 'Houston', 'updatedAt': response['X-Updated-At']},
+                              HTTP_PREFER='return=minimal')
+        self.assertEqual(response.status_code, 204)
+
+
+class UploadTests(PoolTestCase):
+    """Chunked uploads into a temporary MEDIA_ROOT; direct uploads with S3 stubbed out"""
+
+    PHOTO = b'0123456789'
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        settings_override = override_settings(MEDIA_ROOT=media_root, IMAGE_DERIVATIVES_ENABLED=False,
+                                              UPLOAD_STAGING_DIR=os.path.join(media_root, '.staging'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        storage_patcher = mock.patch.object(storage, '_storage', None)
+        storage_patcher.start()
+        self.addCleanup(storage_patcher.stop)
+        self.media_root = media_root
+        self.pool_id = self.create_pool()
+
+    def start(self, content=PHOTO, kind='property_photo', sha256='', path='uploads'):
+        response = self.client.post(f'/api/pools/{self.pool_id}/{path}', {
+            'kind': kind, 'filename': 'house.jpg', 'size': len(content), 'contentType': 'image/jpeg',
+            'sha256': sha256,
+        }, content_type='application/json', **self.auth(self.borrower_token))
+        self.assertEqual(response.status_code, 201, response.content)
+        return response.json()
+
+    def put(self, upload, content, start, content_range=None):
+        end = start + len(content) - 1
+        return self.client.put(f"/api/uploads/{upload['uploadId']}", content, content_type='application/octet-stream',
+                               HTTP_CONTENT_RANGE=content_range or f"bytes {start}-{end}/{upload['size']}",
+                               **self.auth(self.borrower_token))
+
+    def test_photo_is_stored_and_added_to_pool(self):
+        upload = self.start()
+        self.assertEqual(self.put(upload, self.PHOTO[:4], 0).json()['offset'], 4)
+        response = self.put(upload, self.PHOTO[4:], 4)
+        self.assertEqual(response.status_code, 200, response.content)
+        path = response.json()['path']
+        self.assertEqual(response.json()['status'], 'complete')
+        self.assertEqual(path, f'photos/{SHA_PHOTO[:2]}/{SHA_PHOTO}.jpg')
+        with open(os.path.join(self.media_root, path), 'rb') as f:
+            self.assertEqual(f.read(), self.PHOTO)
+        self.assertEqual(Pool.objects.get(pk=self.pool_id).property_photos, [path])
+        self.assertFalse(os.listdir(os.path.join(self.media_root, '.staging')))
+
+    def test_out_of_order_and_duplicate_chunks_conflict(self):
+        upload = self.start()
+        response = self.put(upload, self.PHOTO[4:], 4)
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 0))
+        self.assertEqual(self.put(upload, self.PHOTO[:4], 0).status_code, 200)
+        response = self.put(upload, self.PHOTO[:4], 0)
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 4))
+
+    def test_bad_content_range(self):
+        upload = self.start()
+        for content_range in ('bytes 0-10/10', 'bytes 0-3/11', 'bytes 4-3/10'):
+            with self.subTest(content_range=content_range):
+                self.assertEqual(self.put(upload, self.PHOTO[:4], 0, content_range).status_code, 416)
+        self.assertEqual(self.put(upload, self.PHOTO[:4], 0, 'bytes=0-3').status_code, 400)
+
+    def test_resume_from_received_offset(self):
+        upload = self.start()
+        self.put(upload, self.PHOTO[:4], 0)
+        response = self.client.get(f"/api/uploads/{upload['uploadId']}", **self.auth(self.borrower_token))
+        offset = response.json()['offset']
+        self.assertEqual(offset, 4)
+        response = self.put(upload, self.PHOTO[offset:], offset)
+        self.assertEqual(response.json()['status'], 'complete')
+        self.assertEqual(StoredFile.objects.get().size, len(self.PHOTO))
+
+    def test_checksum_mismatch_aborts(self):
+        upload = self.start(sha256=hashlib.sha256(b'something else').hexdigest())
+        response = self.put(upload, self.PHOTO, 0)
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Upload.objects.get(pk=upload['uploadId']).status, 'aborted')
+        self.assertFalse(StoredFile.objects.exists())
+        self.assertFalse(os.listdir(os.path.join(self.media_root, '.staging')))
+        self.assertEqual(self.put(upload, self.PHOTO, 0).status_code, 409)
+
+    def test_identical_bytes_are_stored_once(self):
+        photo = self.start()
+        self.put(photo, self.PHOTO, 0)
+        appraisal = self.start(kind='appraisal_doc')
+        response = self.put(appraisal, self.PHOTO, 0)
+        self.assertEqual(response.json()['path'], f'photos/{SHA_PHOTO[:2]}/{SHA_PHOTO}.jpg')
+        self.assertEqual(StoredFile.objects.count(), 1)
+        self.assertEqual(Pool.objects.get(pk=self.pool_id).appraisal_doc, response.json()['path'])
+
+    @override_settings(UPLOAD_STORAGE='s3')
+    def start_direct(self):
+        with mock.patch.object(storage, 'presigned_put', return_value=('https://bucket/incoming', {})):
+            return self.start(sha256=SHA_PHOTO, path='uploads/direct')
+
+    def complete(self, upload, found):
+        with mock.patch.object(storage, 'head', return_value=found) as head, \
+                mock.patch.object(storage, 'copy', side_effect=lambda source, name, content_type: name) as copy, \
+                mock.patch.object(storage, 'delete') as delete:
+            response = self.client.post(f"/api/uploads/{upload['uploadId']}/complete",
+                                        **self.auth(self.borrower_token))
+        head.assert_called_once_with(f"incoming/{upload['uploadId']}")
+        return response, copy, delete
+
+    def test_direct_upload_mismatch_aborts(self):
+        upload = self.start_direct()
+        response, copy, delete = self.complete(upload, (len(self.PHOTO), hashlib.sha256(b'other').hexdigest()))
+        self.assertEqual(response.status_code, 422)
+        copy.assert_not_called()
+        delete.assert_called_once_with(f"incoming/{upload['uploadId']}")
+        self.assertEqual(Upload.objects.get(pk=upload['uploadId']).status, 'aborted')
+        self.assertEqual(Pool.objects.get(pk=self.pool_id).property_photos, [])
+
+    def test_direct_upload_completes(self):
+        upload = self.start_direct()
+        response, copy, delete = self.complete(upload, None)
+        self.assertEqual(response.status_code, 409)
+
+        response, copy, delete = self.complete(upload, (len(self.PHOTO), SHA_PHOTO))
+        self.assertEqual(response.status_code, 200, response.content)
+        path = f'photos/{SHA_PHOTO[:2]}/{SHA_PHOTO}.jpg'
+        copy.assert_called_once_with(f"incoming/{upload['uploadId']}", path, 'image/jpeg')
+        delete.assert_called_once_with(f"incoming/{upload['uploadId']}")
+        self.assertEqual(response.json()['path'], path)
+        self.assertEqual(Pool.objects.get(pk=self.pool_id).property_photos, [path])
+
+
+class ConnectionPoolTests(SimpleTestCase):
+    """DB_POOL_MODE=pool on the SQLite backend, against a scratch database file"""
+
+    def setUp(self):
+        handle, self.path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(handle)
+        self.addCleanup(os.remove, self.path)
+
+    def database(self, alias, **settings_dict):
+        settings_dict = connections.configure_settings({'default': {
+            'ENGINE': 'server.db.backends.sqlite3', 'NAME': self.path, 'CONN_HEALTH_CHECKS': True, **settings_dict,
+        }})['default']
+        database = SQLiteDatabaseWrapper(settings_dict, alias)
+        self.addCleanup(pool._pools.pop, alias, None)
+        self.addCleanup(database.close)
+        return database
+
+    def stats(self, alias):
+        return instrumentation.connection_stats().get(alias, {})
+
+    def test_checkout_and_reuse(self):
+        database = self.database('pool-reuse', POOL={'max_size': 2, 'timeout': 1})
+        database.ensure_connection()
+        physical = database.connection
+        database.close()
+        self.assertEqual(pool.pool_stats()['pool-reuse'], {'open': 1, 'idle': 1, 'max_size': 2})
+        with database.cursor() as cursor:
+            cursor.execute('SELECT 1')
+        self.assertIs(database.connection, physical)
+        self.assertEqual(pool.pool_stats()['pool-reuse']['idle'], 0)
+        self.assertEqual((self.stats('pool-reuse')['connects'], self.stats('pool-reuse')['reuses']), (1, 1))
+
+    def test_open_transaction_is_rolled_back_on_checkin(self):
+        database = self.database('pool-rollback', POOL={'max_size': 1, 'timeout': 1})
+        database.ensure_connection()
+        physical = database.connection
+        physical.execute('CREATE TABLE t (x int)')
+        physical.execute('BEGIN')
+        physical.execute('INSERT INTO t VALUES (1)')
+        database.close()
+        self.assertFalse(physical.in_transaction)
+        self.assertEqual(physical.execute('SELECT count(*) FROM t').fetchone(), (0,))
+
+    def test_discards_connection_failing_health_check(self):
+        database = self.database('pool-health', POOL={'max_size': 2, 'timeout': 1})
+        database.ensure_connection()
+        stale = database.connection
+        database.close()
+        stale.close()  # dropped while idle in the pool
+        database.ensure_connection()
+        self.assertIsNot(database.connection, stale)
+        self.assertEqual(self.stats('pool-health')['health_check_failures'], 1)
+        self.assertEqual(pool.pool_stats()['pool-health']['open'], 1)
+
+    def test_times_out_when_exhausted(self):
+        connection_pool = pool.ConnectionPool(object, max_size=1, timeout=0.05)
+        held, reused = connection_pool.checkout()
+        self.assertFalse(reused)
+        with self.assertRaises(pool.PoolTimeout):
+            connection_pool.checkout()
+
+        database = self.database('pool-timeout', POOL={'max_size': 1, 'timeout': 0.05})
+        database.ensure_connection()
+        other = self.database('pool-timeout', POOL={'max_size': 1, 'timeout': 0.05})
+        with self.assertRaises(OperationalError):
+            other.ensure_connection()
+
+    def test_off_behaves_like_stock_django(self):
+        database = self.database('pool-off')
+        database.ensure_connection()
+        physical = database.connection
+        database.close()
+        self.assertIsNone(database.connection)
+        with self.assertRaises(Exception):
+            physical.execute('SELECT 1')  # really closed
+        database.ensure_connection()
+        self.assertIsNot(database.connection, physical)
+        self.assertNotIn('pool-off', pool.pool_stats())
+        self.assertEqual(self.stats('pool-off')['connects'], 2)
+
+
+class ReplicaRouterTests(TransactionTestCase):
+    """A 'replica' alias on the same SQLite database as 'default'; the rows are
+    committed (TransactionTestCase) so both connections see them. The alias is
+    added after the test database exists, so the runner never tries to create it."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        connections.settings[routers.REPLICA_ALIAS] = dict(connections['default'].settings_dict)
+
+    @classmethod
+    def tearDownClass(cls):
+        connections[routers.REPLICA_ALIAS].close()
+        del connections[routers.REPLICA_ALIAS]
+        del connections.settings[routers.REPLICA_ALIAS]
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        self.investor, self.token = create_account('investor', {
+            'full_name': 'Grace Hopper', 'email': 'grace@example.com', 'phone': '555-555-0101',
+            'date_of_birth': '1985-06-15', 'ssn': '123-45-6789', 'address1': '1 Main St', 'city': 'Austin',
+            'state': 'TX', 'zip_code': '78701', 'password': 'correct horse',
+        })
+        _, borrower_token = create_account('borrower', {
+            'first_name': 'Ada', 'last_name': 'Lovelace', 'email': 'ada@example.com', 'phone': '555-555-0100',
+            'date_of_birth': '1990-01-01', 'password': 'correct horse',
+        })
+        response = self.client.post('/api/pools/create', POOL_CREATE, content_type='application/json',
+                                    HTTP_AUTHORIZATION=f'Bearer {borrower_token}')
+        self.pool_id = response.json()['id']
+        Pool.objects.filter(pk=self.pool_id).update(status='active')
+
+    def request(self, token=None):
+        token = token or self.token
+        return RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def read_alias(self, view_decorator, token=None, write=False):
+        @view_decorator
+        def view(request):
+            if write:
+                Investment.objects.create(investor=self.investor, pool_id=self.pool_id, amount=10)
+            return JsonResponse({'pool': Pool.objects.all().db, 'borrower': Borrower.objects.all().db})
+        return json.loads(view(self.request(token)).content)
+
+    def test_reads_outside_replica_views_use_primary(self):
+        self.assertEqual(Pool.objects.all().db, 'default')
+
+    def test_replica_reads(self):
+        # Only the browsing models go to the replica; auth lookups stay on the primary
+        self.assertEqual(self.read_alias(routers.replica_reads), {'pool': 'replica', 'borrower': 'default'})
+
+    def test_write_sends_rest_of_request_to_primary(self):
+        self.assertEqual(self.read_alias(routers.replica_reads, write=True)['pool'], 'default')
+
+    def test_without_replica_everything_uses_primary(self):
+        with mock.patch.object(routers, 'replica_configured', return_value=False):
+            self.assertEqual(self.read_alias(routers.replica_reads)['pool'], 'default')
+
+    def test_write_pins_caller_to_primary(self):
+        other_token = 'someone-else'
+        with CaptureQueriesContext(connections['replica']) as replica, \
+                CaptureQueriesContext(connections['default']) as primary:
+            response = self.client.get(f'/api/investor/pools/{self.pool_id}', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(any('"server_pool"' in query['sql'] for query in replica.captured_queries))
+        self.assertFalse(any('"server_pool"' in query['sql'] for query in primary.captured_queries))
+
+        response = self.client.post(f'/api/investor/pools/{self.pool_id}/invest', {'amount': '1000'},
+                                    content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, 201, response.content)
+        with CaptureQueriesContext(connections['replica']) as replica:
+            response = self.client.get(f'/api/investor/pools/{self.pool_id}', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(replica.captured_queries, [])
+        # Only the caller who wrote is pinned
+        self.assertEqual(self.read_alias(routers.replica_reads, token=other_token)['pool'], 'replica')
+
+    def test_failed_write_does_not_pin(self):
+        response = self.client.post(f'/api/investor/pools/{self.pool_id}/invest', {'amount': 'lots'},
+                                    content_type='application/json', HTTP_AUTHORIZATION=f'Bearer {self.token}')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.read_alias(routers.replica_reads)['pool'], 'replica')
+
+
+class MigrateIfNeededTests(TestCase):
+    """The test database is built without migrations, so django_migrations is
+    created and filled in by hand and the real migrate is stubbed out"""
+
+    @classmethod
+    def setUpClass(cls):
+        # Schema changes can't run inside the class-wide transaction on SQLite
+        MigrationRecorder(connection).ensure_schema()
+        super().setUpClass()
+
+    def setUp(self):
+        self.on_disk = sorted(migrate.migration_files_on_disk())
+        recorder = MigrationRecorder(connection)
+        recorder.flush()
+        for app, name in self.on_disk:
+            recorder.record_applied(app, name)
+
+    def test_nothing_pending(self):
+        # Table introspection plus one SELECT of django_migrations
+        with mock.patch.object(migrate, 'call_command') as call, self.assertNumQueries(2):
+            self.assertEqual(migrate.migrate_if_needed(), [])
+        call.assert_not_called()
+        out = io.StringIO()
+        call_command('migrate_if_needed', '--check', stdout=out)
+        self.assertIn('Migrations up to date', out.getvalue())
+
+    def test_missing_migration_is_applied(self):
+        missing = ('server', max(name for app, name in self.on_disk if app == 'server'))
+        MigrationRecorder(connection).record_unapplied(*missing)
+        with self.assertRaisesMessage(CommandError, f'1 pending migration(s): server.{missing[1]}'):
+            call_command('migrate_if_needed', '--check')
+
+        with mock.patch.object(migrate, 'call_command') as call:
+            self.assertEqual(migrate.migrate_if_needed(), [missing])
+        call.assert_called_once_with('migrate', database='default', interactive=False, verbosity=1, stdout=None)
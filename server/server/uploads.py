@@ -0,0 +1,287 @@
+"""
+Chunked, resumable uploads of pool documents and property photos.
+
+A client opens an upload (kind, filename, size), then PUTs the bytes in
+order, each chunk carrying ``Content-Range: bytes start-end/size``. Chunks
+are streamed from the request into a staging file in 64 KiB reads -
+request.body is never touched - so memory stays flat whatever the file
+size. ``received`` only advances once a whole chunk is on disk: after a
+dropped connection the client asks for the offset and carries on from
+there, overwriting whatever part of the interrupted chunk was written.
+
+When the last byte arrives, the staging file is hashed in one sequential
+read and handed to storage.py under a content-addressed name. Bytes that
+are already stored are not stored again, and the filesystem backend moves
+the staging file into place rather than copying it. The stored name is
+then recorded on the pool: in the document field, or appended to
+property_photos (whose thumbnails photos.py then renders).
+
+Staging is local disk, so every chunk of an upload must reach the same
+instance, or UPLOAD_STAGING_DIR must be a shared volume.
+
+With the S3 backend, a direct upload skips Django altogether: the client
+declares size and SHA-256, PUTs the file to a presigned URL whose checksum
+header S3 enforces, then asks for it to be completed. The object lands on a
+key of its own (incoming/<upload id>) and is only copied to - or, if those
+bytes are already stored, dropped in favour of - the content-addressed key
+once HEAD confirms its size and checksum. Landing straight on the shared
+key would let a client "upload" any file whose digest it merely knew.
+"""
+
+import hashlib
+import os
+import re
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from . import storage
+from .models import Pool, StoredFile, Upload
+from .photos import queue_derivatives
+from .storage import content_name, save_content
+
+READ_BYTES = 64 * 1024
+HASH_READ_BYTES = 1024 * 1024
+CONTENT_RANGE_RE = re.compile(r'bytes (\d+)-(\d+)/(\d+)')
+SHA256_RE = re.compile(r'[0-9a-f]{64}')
+UPLOAD_KINDS = dict(Upload.KIND_CHOICES)
+
+
+class UploadError(Exception):
+    """Rejected upload request; the message is safe to return with the given status"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def staging_path(upload):
+    return os.path.join(settings.UPLOAD_STAGING_DIR, f'{upload.id}.part')
+
+
+def _discard_staging(upload):
+    try:
+        os.remove(staging_path(upload))
+    except FileNotFoundError:
+        pass
+
+
+def _clean(kind, filename, size, content_type, sha256):
+    """Validated Upload fields for a new upload"""
+    if kind not in UPLOAD_KINDS:
+        raise UploadError(f"kind must be one of: {', '.join(UPLOAD_KINDS)}")
+    if not isinstance(size, int) or isinstance(size, bool) or size <= 0:
+        raise UploadError('size must be a positive number of bytes')
+    if size > settings.UPLOAD_MAX_BYTES:
+        raise UploadError(f'File too large; the limit is {settings.UPLOAD_MAX_BYTES} bytes', status=413)
+    filename = os.path.basename(filename if isinstance(filename, str) else '').strip()
+    if not filename:
+        raise UploadError('filename required')
+    sha256 = (sha256 if isinstance(sha256, str) else '').strip().lower()
+    if sha256 and not SHA256_RE.fullmatch(sha256):
+        raise UploadError('sha256 must be a hex SHA-256 digest')
+    content_type = content_type if isinstance(content_type, str) else ''
+    return {'kind': kind, 'filename': filename[:255], 'size': size,
+            'content_type': content_type[:100], 'sha256': sha256}
+
+
+def start_upload(pool, kind, filename, size, content_type='', sha256=''):
+    """Open a chunked upload for pool and create its empty staging file"""
+    upload = Upload.objects.create(pool=pool, **_clean(kind, filename, size, content_type, sha256))
+    os.makedirs(settings.UPLOAD_STAGING_DIR, exist_ok=True)
+    open(staging_path(upload), 'wb').close()
+    return upload
+
+
+def _parse_content_range(header, size):
+    match = CONTENT_RANGE_RE.fullmatch(header or '')
+    if not match:
+        raise UploadError('Content-Range header required: bytes <start>-<end>/<size>')
+    start, end, total = map(int, match.groups())
+    if total != size or start > end or end >= size:
+        raise UploadError('Content-Range does not fit this upload', status=416)
+    return start, end
+
+
+def write_chunk(upload, stream, content_range, content_length):
+    """Stream one chunk from stream into the staging file, finishing the
+    upload if it was the last one. Raises UploadError; upload.received is
+    then the offset to resume from."""
+    if upload.status != 'uploading':
+        raise UploadError(f'Upload is {upload.status}', status=409)
+    if upload.direct:
+        raise UploadError('This upload goes straight to storage; PUT it to its presigned URL', status=409)
+    if upload.received == upload.size:
+        return finish_upload(upload)  # every byte arrived but finishing failed; retry it
+    start, end = _parse_content_range(content_range, upload.size)
+    length = end - start + 1
+    if content_length != length:
+        raise UploadError('Content-Length does not match Content-Range')
+    if start != upload.received:
+        raise UploadError(f'Expected a chunk starting at byte {upload.received}', status=409)
+
+    try:
+        staging = open(staging_path(upload), 'r+b')
+    except FileNotFoundError:
+        raise UploadError('Upload data is not on this server; start a new upload', status=410)
+    with staging:
+        staging.seek(start)
+        remaining = length
+        while remaining:
+            data = stream.read(min(READ_BYTES, remaining))
+            if not data:
+                raise UploadError('Chunk ended early; resend it')
+            staging.write(data)
+            remaining -= len(data)
+
+    # Conditional on the old offset, so two copies of the same chunk cannot both advance it
+    advanced = Upload.objects.filter(pk=upload.pk, status='uploading', received=start).update(
+        received=end + 1, updated_at=timezone.now(),
+    )
+    if not advanced:
+        upload.refresh_from_db(fields=['received', 'status'])
+        raise UploadError('Chunk was already received', status=409)
+    upload.received = end + 1
+    if upload.received == upload.size:
+        finish_upload(upload)
+    return upload
+
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_READ_BYTES), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _stored_file(upload, sha256, save):
+    """The StoredFile for these bytes; if they are new, save(name) stores them first"""
+    stored = StoredFile.objects.filter(sha256=sha256).first()
+    if stored is not None:
+        return stored
+    prefix = 'photos' if upload.kind == 'property_photo' else 'documents'
+    name = save(content_name(prefix, sha256, upload.filename))
+    try:
+        with transaction.atomic():
+            return StoredFile.objects.create(sha256=sha256, name=name, size=upload.size,
+                                             content_type=upload.content_type)
+    except IntegrityError:
+        # The same bytes finished uploading concurrently; both wrote the same object
+        return StoredFile.objects.get(sha256=sha256)
+
+
+def record_on_pool(pool_id, kind, name):
+    """Point the pool's document field at name, or add name to its photos"""
+    if kind == 'property_photo':
+        pool = Pool.objects.select_for_update().only('id', 'property_photos').get(pk=pool_id)
+        if name not in pool.property_photos:
+            pool.property_photos.append(name)
+            pool.save(update_fields=['property_photos', 'updated_at'])
+    else:
+        Pool.objects.filter(pk=pool_id).update(**{kind: name, 'updated_at': timezone.now()})
+
+
+def _complete(upload, stored):
+    with transaction.atomic():
+        Upload.objects.filter(pk=upload.pk).update(
+            status='complete', received=upload.size, sha256=stored.sha256, stored_file=stored,
+            updated_at=timezone.now(),
+        )
+        record_on_pool(upload.pool_id, upload.kind, stored.name)
+        if upload.kind == 'property_photo':
+            queue_derivatives(stored)
+    upload.status, upload.received, upload.sha256, upload.stored_file = 'complete', upload.size, stored.sha256, stored
+    return upload
+
+
+def finish_upload(upload):
+    sha256 = _sha256_file(staging_path(upload))
+    if upload.sha256 and upload.sha256 != sha256:
+        abort_upload(upload)
+        raise UploadError('Checksum mismatch; the upload was discarded', status=422)
+
+    path = staging_path(upload)
+    _complete(upload, _stored_file(upload, sha256, lambda name: save_content(name, path, upload.content_type)))
+    _discard_staging(upload)  # already gone if the filesystem backend moved it
+    return upload
+
+
+def incoming_name(upload):
+    """Where a direct upload lands: a key of its own, never the content-addressed one"""
+    return f'incoming/{upload.id}'
+
+
+def start_direct_upload(pool, kind, filename, size, content_type='', sha256=''):
+    """Open an upload the client PUTs straight to S3; returns (upload, url, headers)"""
+    if not storage.supports_direct_uploads():
+        raise UploadError('Direct uploads need the S3 storage backend; use a chunked upload')
+    fields = _clean(kind, filename, size, content_type, sha256)
+    if not fields['sha256']:
+        raise UploadError('sha256 required')
+    fields['content_type'] = fields['content_type'] or 'application/octet-stream'
+    upload = Upload.objects.create(pool=pool, direct=True, **fields)
+    url, headers = storage.presigned_put(incoming_name(upload), upload.content_type, upload.sha256,
+                                         settings.UPLOAD_PRESIGN_SECONDS)
+    return upload, url, headers
+
+
+def complete_direct_upload(upload):
+    """Check the object the client PUT and file it like a finished chunked upload.
+
+    Only metadata is read - the size and SHA-256 the store recorded - and
+    new content is copied to its content-addressed key inside the bucket.
+    The client must have uploaded the declared bytes itself before the
+    upload can point at an existing object with the same digest."""
+    if upload.status != 'uploading':
+        raise UploadError(f'Upload is {upload.status}', status=409)
+    if not upload.direct:
+        raise UploadError('Not a direct upload; PUT its chunks instead', status=409)
+    incoming = incoming_name(upload)
+    found = storage.head(incoming)
+    if found is None:
+        raise UploadError('Nothing has been uploaded yet', status=409)
+    if found != (upload.size, upload.sha256):
+        abort_upload(upload)
+        raise UploadError('Uploaded file does not match the declared size and sha256; the upload was discarded',
+                          status=422)
+
+    _complete(upload, _stored_file(upload, upload.sha256,
+                                   lambda name: storage.copy(incoming, name, upload.content_type)))
+    storage.delete(incoming)
+    return upload
+
+
+def abort_upload(upload):
+    Upload.objects.filter(pk=upload.pk, status='uploading').update(status='aborted', updated_at=timezone.now())
+    upload.status = 'aborted'
+    if upload.direct:
+        storage.delete(incoming_name(upload))
+    else:
+        _discard_staging(upload)
+
+
+def expire_stale_uploads(max_age):
+    """Abort uploads with no activity for max_age (a timedelta) and delete what they left behind"""
+    stale = Upload.objects.filter(status='uploading', updated_at__lt=timezone.now() - max_age)
+    count = 0
+    for upload in stale.only('id', 'status', 'direct').iterator():
+        abort_upload(upload)
+        count += 1
+    return count
+
+
+def upload_payload(upload):
+    return {
+        'uploadId': str(upload.id),
+        'kind': upload.kind,
+        'filename': upload.filename,
+        'size': upload.size,
+        'offset': upload.received,
+        'status': upload.status,
+        'direct': upload.direct,
+        'chunkSize': None if upload.direct else settings.UPLOAD_CHUNK_BYTES,
+        'sha256': upload.sha256 or None,
+        'path': upload.stored_file.name if upload.stored_file_id else None,
+    }
@@ -14,12 +14,13 @@ Including another URLconf
     1. Import the include() function: from django.urls import include, path
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
-from django.contrib import admin
+from django.apps import apps
+from django.conf import settings
+from django.conf.urls.static import static
 from django.urls import path
 from . import views, health
 
 urlpatterns = [
-    path('admin/', admin.site.urls),
     path('api/borrowers/signup', views.borrower_signup, name='borrower-signup'),
     path('api/borrowers/login', views.borrower_login, name='borrower-login'),
     path('api/investors/signup', views.investor_signup, name='investor-signup'),
@@ -36,14 +37,35 @@ urlpatterns = [
     path('api/pools/<int:pool_id>', views.get_pool_detail, name='get-pool-detail'),
     path('api/pools/<int:pool_id>/update', views.update_pool, name='update-pool'),
     path('api/pools/<int:pool_id>/delete', views.delete_pool, name='delete-pool'),
+    path('api/pools/<int:pool_id>/uploads', views.start_pool_upload, name='start-pool-upload'),
+    path('api/pools/<int:pool_id>/uploads/direct', views.start_pool_direct_upload, name='start-pool-direct-upload'),
+    path('api/uploads/<uuid:upload_id>', views.pool_upload, name='pool-upload'),
+    path('api/uploads/<uuid:upload_id>/complete', views.complete_pool_upload, name='complete-pool-upload'),
     # Investor endpoints
     path('api/investor/pools', views.get_investment_opportunities, name='get-investment-opportunities'),
+    path('api/investor/pools/search', views.search_investment_opportunities, name='search-investment-opportunities'),
+    path('api/investor/pools/nearby', views.get_nearby_opportunities, name='get-nearby-opportunities'),
+    path('api/investor/pools/map', views.get_map_opportunities, name='get-map-opportunities'),
     path('api/investor/pools/<int:pool_id>', views.get_investment_pool_detail, name='get-investment-pool-detail'),
     path('api/investor/pools/<int:pool_id>/invest', views.invest_in_pool, name='invest-in-pool'),
     path('api/investor/investments', views.get_my_investments, name='get-my-investments'),
     path('api/investor/dashboard', views.get_investor_dashboard, name='get-investor-dashboard'),
+    path('api/stats', views.get_marketplace_stats, name='marketplace-stats'),
     # Health check endpoints
+    path('api/health/live', health.liveness_check, name='liveness'),
+    path('api/health/ready', health.database_health_check, name='readiness'),
     path('api/health/database', health.database_health_check, name='database-health'),
     path('api/health/users', health.list_users, name='list-users'),
+    path('api/health/connections', health.connection_stats, name='connection-stats'),
+    path('api/health/ratelimits', health.ratelimit_stats, name='ratelimit-stats'),
+    path('api/health/email-checks', health.email_availability_stats, name='email-check-stats'),
     path('api/health/migrate', health.force_migrate, name='force-migrate'),
 ]
+
+# Uploaded files under MEDIA_ROOT, for local development (static() is a no-op unless DEBUG)
+urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+# API-only instances (server.settings_api) leave the admin out entirely
+if apps.is_installed('django.contrib.admin'):
+    from django.contrib import admin
+    urlpatterns.insert(0, path('admin/', admin.site.urls))
@@ -1,19 +1,39 @@
 import json
+import logging
 import uuid
 from datetime import datetime, timedelta
 from decimal import Decimal, InvalidOperation
-from django.http import JsonResponse, HttpRequest
+from functools import wraps
+from asgiref.sync import sync_to_async
+from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError, transaction
+from django.db.models import DecimalField
 from django.utils import timezone
-from django.core.mail import send_mail
+from django.utils.dateparse import parse_datetime
 from django.conf import settings
-from .models import Borrower, Investor, Pool, AuthToken, Investment, EmailVerification
-from django.contrib.auth.hashers import check_password
+from .models import Borrower, Investor, Pool, AuthToken, Investment, EmailVerification, Upload
+from .db.routers import replica_reads, pins_primary
+from .hashers import acheck_password, HasherBusy
+from .ratelimit import ratelimit
+from .email_registry import is_email_registered, ais_email_registered
+from .geo import LOCATION_FIELDS, in_box, nearby
+from .accounts import SignupError, account_payload, clean_signup, create_account, hash_signup_password
+from .pool_children import JSON_FIELDS, filter_by_risk
+from .search import INDEXED_FIELDS, query_words, search_pools
+from .serializers import (
+    INVESTMENT, MY_INVESTMENT, OPPORTUNITY, OPPORTUNITY_DETAIL, POOL, POOL_DETAIL, POOL_LIST, POOL_UPDATED,
+    aphoto_urls, photo_urls,
+)
+from .stats import POOL_FIELDS as STATS_FIELDS, marketplace_stats
+from .underwriting import INPUTS, filter_by_metrics, underwrite_pool
+from .uploads import (
+    UploadError, abort_upload, complete_direct_upload, start_direct_upload, start_upload, upload_payload,
+    write_chunk,
+)
 
-REQUIRED_FIELDS = {"firstName", "lastName", "email", "phone", "dateOfBirth", "password"}
-REQUIRED_INVESTOR_FIELDS = {"fullName", "email", "dateOfBirth", "phone", "ssn", "address1", "city", "state", "zip", "country", "password"}
+logger = logging.getLogger(__name__)
 
 def _create_auth_token(user, role):
     """Create a new authentication token for a user"""
@@ -32,6 +52,23 @@ def _create_auth_token(user, role):
         )
     return token.token
 
+def _start_login_session(request, user, role):
+    """Establish session (for same-origin requests) and create auth token (for cross-origin requests)"""
+    other_key = 'investor_id' if role == 'borrower' else 'borrower_id'
+    request.session[f'{role}_id'] = user.id
+    request.session['role'] = role
+    # Clear the other role's session data if it exists
+    if other_key in request.session:
+        del request.session[other_key]
+    request.session.save()  # Force save the session
+    return _create_auth_token(user, role)
+
+def _login_busy_response():
+    """Every password-check slot on this worker is taken; ask the client to retry"""
+    response = JsonResponse({'error': 'Too many logins in progress, please retry'}, status=503)
+    response['Retry-After'] = '1'
+    return response
+
 def _get_user_from_request(request):
     """Extract user from request using token or session"""
     # Try token-based auth first (for cross-origin requests)
@@ -84,7 +121,6 @@ def _parse_date(date_str: str):
 
 def _send_verification_email(email, code, user_type):
     """Send verification email to user"""
-    print(f"DEBUG: _send_verification_email called with email={email}, code={code}, user_type={user_type}")
     subject = "Verify your EquiPool account"
     message = f"""
     Welcome to EquiPool!
@@ -99,10 +135,10 @@ def _send_verification_email(email, code, user_type):
     The EquiPool Team
     """
     
+    # django.core.mail pulls in the stdlib email package; only pay for it when sending
+    from django.core.mail import send_mail
+
     try:
-        print(f"DEBUG: Attempting to send email from {settings.DEFAULT_FROM_EMAIL} to {email}")
-        print(f"DEBUG: Email backend: {settings.EMAIL_BACKEND}")
-        print(f"DEBUG: Email host: {settings.EMAIL_HOST}")
         send_mail(
             subject=subject,
             message=message,
@@ -110,12 +146,25 @@ def _send_verification_email(email, code, user_type):
             recipient_list=[email],
             fail_silently=False,
         )
-        print("DEBUG: Email sent successfully")
         return True
-    except Exception as e:
-        print(f"DEBUG: Failed to send email: {e}")
+    except Exception:
+        logger.exception('Could not send %s verification email via %s', user_type, settings.EMAIL_HOST)
         return False
 
+# SMTP is the slow part of the verification endpoints. Run it outside the
+# thread that owns the DB connection so concurrent requests on an ASGI worker
+# can overlap their email sends.
+_asend_verification_email = sync_to_async(_send_verification_email, thread_sensitive=False)
+
+def _async_csrf_exempt(view_func):
+    """csrf_exempt for coroutine views (Django 4.2's decorator wraps them in a sync function)"""
+    @wraps(view_func)
+    async def wrapper_view(*args, **kwargs):
+        return await view_func(*args, **kwargs)
+
+    wrapper_view.csrf_exempt = True
+    return wrapper_view
+
 @csrf_exempt  # For now; recommend enabling proper CSRF/token auth later
 def borrower_signup(request: HttpRequest):
     if request.method != "POST":
@@ -125,108 +174,24 @@ def borrower_signup(request: HttpRequest):
     except json.JSONDecodeError:
         return JsonResponse({"error": "Invalid JSON"}, status=400)
 
-    missing = REQUIRED_FIELDS - set(data.keys())
-    if missing:
-        return JsonResponse({"error": f"Missing fields: {', '.join(sorted(missing))}"}, status=400)
-
-    first_name = data.get("firstName", "").strip()
-    middle_name = data.get("middleName", "").strip()  # Optional
-    last_name = data.get("lastName", "").strip()
-    email = data.get("email", "").lower().strip()
-    phone = data.get("phone", "").strip()
-    dob_raw = data.get("dateOfBirth")
-    password = data.get("password")
-
-    if not first_name:
-        return JsonResponse({"error": "First name required"}, status=400)
-    if not last_name:
-        return JsonResponse({"error": "Last name required"}, status=400)
-    if not phone:
-        return JsonResponse({"error": "Phone number required"}, status=400)
-    
-    # Validate name fields
-    import re
-    name_pattern = r"[A-Za-zÀ-ÖØ-öø-ÿ'\- ]{1,100}"
-    if not re.fullmatch(name_pattern, first_name):
-        return JsonResponse({"error": "First name contains invalid characters"}, status=400)
-    if not re.fullmatch(name_pattern, last_name):
-        return JsonResponse({"error": "Last name contains invalid characters"}, status=400)
-    if middle_name and not re.fullmatch(name_pattern, middle_name):
-        return JsonResponse({"error": "Middle name contains invalid characters"}, status=400)
-    
-    # Validate phone number (basic validation)
-    phone_pattern = r"[\d\-\+\(\)\s]{10,20}"
-    if not re.fullmatch(phone_pattern, phone):
-        return JsonResponse({"error": "Invalid phone number format"}, status=400)
-    if not email or "@" not in email:
-        return JsonResponse({"error": "Valid email required"}, status=400)
-    if not password or len(password) < 8:
-        return JsonResponse({"error": "Password must be at least 8 characters"}, status=400)
     try:
-        dob = _parse_date(dob_raw)
-    except ValidationError as e:
+        fields = clean_signup('borrower', data)
+    except SignupError as e:
         return JsonResponse({"error": str(e)}, status=400)
 
-    # Ensure age >= 18
-    today = timezone.now().date()
+    # Account, token and session in one transaction (auto-login)
     try:
-        eighteenth_birthday = dob.replace(year=dob.year + 18)
-    except ValueError:
-        # Handle Feb 29 edge-case by subtracting one day before adding 18 years
-        from datetime import timedelta
-        eighteenth_birthday = (dob - timedelta(days=1)).replace(year=dob.year + 18)
-    if eighteenth_birthday > today:
-        return JsonResponse({"error": "You must be at least 18 years old"}, status=400)
-
-    try:
-        with transaction.atomic():  # Ensure database transaction
-            b = Borrower(
-                first_name=first_name,
-                middle_name=middle_name,
-                last_name=last_name,
-                email=email,
-                phone=phone,
-                date_of_birth=dob
-            )
-            b.set_password(password)
-            b.save()
-            
-            # Verify the save by querying back
-            saved_borrower = Borrower.objects.get(id=b.id)
-            
+        user, auth_token = create_account('borrower', fields, request=request)
     except IntegrityError as e:
         return JsonResponse({"error": "Email already registered"}, status=409)
     except Exception as e:
         return JsonResponse({"error": f"Database error: {str(e)}"}, status=500)
 
-    # Auto-login newly registered borrower: establish session and create token
-    try:
-        request.session['borrower_id'] = b.id
-        request.session['role'] = 'borrower'
-        if 'investor_id' in request.session:
-            del request.session['investor_id']
-        request.session.save()
-        auth_token = _create_auth_token(b, 'borrower')
-    except Exception:
-        auth_token = None
-
-    return JsonResponse({
-        "id": b.id,
-        "firstName": b.first_name,
-        "middleName": b.middle_name,
-        "lastName": b.last_name,
-        "fullName": b.full_name,  # Keep for compatibility
-        "email": b.email,
-        "phone": b.phone,
-        "dateOfBirth": b.date_of_birth.isoformat(),
-        "createdAt": b.created_at.isoformat(),
-        "role": "borrower",
-        "token": auth_token,
-        "authenticated": True,
-    }, status=201)
+    return JsonResponse(account_payload(user, 'borrower', auth_token), status=201)
 
-@csrf_exempt
-def borrower_login(request: HttpRequest):
+@_async_csrf_exempt
+@ratelimit('login', ip='30/m', account='10/m')
+async def borrower_login(request: HttpRequest):
     if request.method != 'POST':
         return JsonResponse({'error':'Method not allowed'}, status=405)
     try:
@@ -241,27 +206,21 @@ def borrower_login(request: HttpRequest):
         return JsonResponse({'error':'Email and password required'}, status=400)
         
     try:
-        b = Borrower.objects.get(email=email)
+        b = await Borrower.objects.aget(email=email)
     except Borrower.DoesNotExist:
         return JsonResponse({'error':'Invalid credentials'}, status=401)
     except Exception as e:
         return JsonResponse({'error':'Database error'}, status=500)
         
-    if not check_password(password, b.password_hash):
+    try:
+        password_ok = await acheck_password(b, password)
+    except HasherBusy:
+        return _login_busy_response()
+    if not password_ok:
         return JsonResponse({'error':'Invalid credentials'}, status=401)
     
-        
-    # Establish session (for same-origin requests)
-    request.session['borrower_id'] = b.id
-    request.session['role'] = 'borrower'
-    # Clear investor session data if it exists
-    if 'investor_id' in request.session:
-        del request.session['investor_id']
-    request.session.save()  # Force save the session
-    
-    # Create auth token (for cross-origin requests)
     try:
-        auth_token = _create_auth_token(b, 'borrower')
+        auth_token = await _astart_login_session(request, b, 'borrower')
     except Exception as e:
         return JsonResponse({'error':'Token creation failed'}, status=500)
     
@@ -331,6 +290,7 @@ def auth_me(request: HttpRequest):
     
     return JsonResponse({'authenticated': False}, status=401)
 
+@ratelimit('validate-email', ip='120/m')
 def validate_email(request: HttpRequest):
     """Check if an email is available (not used by Borrower or Investor).
     GET /api/validate/email?email=foo@example.com
@@ -341,78 +301,67 @@ def validate_email(request: HttpRequest):
     email = (request.GET.get('email') or '').strip().lower()
     if not email or '@' not in email:
         return JsonResponse({'error': 'Valid email required'}, status=400)
-    exists = Borrower.objects.filter(email=email).exists() or Investor.objects.filter(email=email).exists()
+    exists = is_email_registered(email)
     return JsonResponse({'available': not exists})
 
-@csrf_exempt
-def send_verification_email(request: HttpRequest):
+@_async_csrf_exempt
+@ratelimit('send-verification', ip='10/m', account='3/m')
+async def send_verification_email(request: HttpRequest):
     """Send verification email for signup process"""
-    print(f"DEBUG: send_verification_email called")
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
     
     try:
         data = json.loads(request.body.decode('utf-8'))
-        print(f"DEBUG: Received data: {data}")
     except json.JSONDecodeError:
-        print("DEBUG: Invalid JSON received")
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
     
     email = data.get('email', '').strip().lower()
     user_type = data.get('user_type', '').strip().lower()  # 'borrower' or 'investor'
     user_data = data.get('user_data', {})  # The signup form data
     
-    print(f"DEBUG: email={email}, user_type={user_type}, user_data keys={list(user_data.keys())}")
-    
     if not email or '@' not in email:
-        print("DEBUG: Invalid email")
         return JsonResponse({'error': 'Valid email required'}, status=400)
     
     if user_type not in ['borrower', 'investor']:
-        print("DEBUG: Invalid user type")
         return JsonResponse({'error': 'Invalid user type'}, status=400)
     
     if not user_data:
-        print("DEBUG: No user data provided")
         return JsonResponse({'error': 'User data required'}, status=400)
     
     # Check if email is already taken
-    exists = Borrower.objects.filter(email=email).exists() or Investor.objects.filter(email=email).exists()
+    exists = await ais_email_registered(email)
     if exists:
-        print("DEBUG: Email already registered")
         return JsonResponse({'error': 'Email already registered'}, status=409)
     
     try:
-        # Clean up any existing verification for this email
-        EmailVerification.objects.filter(email=email, user_type=user_type).delete()
-        print("DEBUG: Cleaned up existing verifications")
-        
-        # Create new verification
-        verification = EmailVerification.objects.create(
-            email=email,
-            user_type=user_type,
-            user_data=user_data
-        )
-        print(f"DEBUG: Created verification with code: {verification.code}")
+        # Reuse the pending verification so its wrong-code count carries over;
+        # only the code's HMAC is stored
+        verifications = EmailVerification.objects.filter(email=email, user_type=user_type)
+        verification = await verifications.filter(verified=False).order_by('-created_at').afirst()
+        if verification is None:
+            verification = EmailVerification(email=email, user_type=user_type)
+        verification.user_data = user_data
+        code = verification.set_code()
+        await verification.asave()
+        await verifications.exclude(pk=verification.pk).adelete()
         
         # Send email
-        print(f"DEBUG: Attempting to send email to {email}")
-        if _send_verification_email(email, verification.code, user_type):
-            print("DEBUG: Email sent successfully")
+        if await _asend_verification_email(email, code, user_type):
             return JsonResponse({
                 'success': True,
                 'message': 'Verification email sent',
                 'expires_in': 900  # 15 minutes
             })
         else:
-            print("DEBUG: Failed to send email")
             return JsonResponse({'error': 'Failed to send email'}, status=500)
             
     except Exception as e:
-        print(f"DEBUG: Exception occurred: {str(e)}")
+        logger.exception('Could not start %s email verification', user_type)
         return JsonResponse({'error': f'Server error: {str(e)}'}, status=500)
 
 @csrf_exempt
+@ratelimit('verify-code', ip='30/m', account='10/m')
 def verify_email_code(request: HttpRequest):
     """Verify the email verification code and create user account"""
     if request.method != 'POST':
@@ -430,40 +379,54 @@ def verify_email_code(request: HttpRequest):
     if not email or not code or not user_type:
         return JsonResponse({'error': 'Email, code, and user_type required'}, status=400)
     
+    if user_type not in ('borrower', 'investor'):
+        return JsonResponse({'error': 'Invalid user type'}, status=400)
+    
+    pending = EmailVerification.objects.filter(email=email, user_type=user_type, verified=False)
     try:
-        # Find valid verification
-        verification = EmailVerification.objects.filter(
-            email=email,
-            code=code,
-            user_type=user_type,
-            verified=False
-        ).first()
-        
-        if not verification:
-            return JsonResponse({'error': 'Invalid or expired verification code'}, status=400)
-        
-        if not verification.is_valid():
-            return JsonResponse({'error': 'Verification code has expired'}, status=400)
-        
-        # Mark verification as used
-        verification.verified = True
-        verification.save()
-        
-        # Create the user account based on user_type
-        user_data = verification.user_data
-        
-        if user_type == 'borrower':
-            return _create_borrower_account(user_data, email)
-        elif user_type == 'investor':
-            return _create_investor_account(user_data, email)
-        else:
-            return JsonResponse({'error': 'Invalid user type'}, status=400)
+        # Hash the password before taking the row lock, and only for a code that
+        # looks right; everything is checked again under the lock
+        signup = pending.order_by('-created_at').first()
+        fields = None
+        if signup is not None and not signup.locked and signup.is_valid() and signup.check_code(code):
+            try:
+                fields = hash_signup_password(clean_signup(user_type, signup.user_data, email=email))
+            except SignupError as e:
+                return JsonResponse({'error': str(e)}, status=400)
+
+        with transaction.atomic():
+            # One indexed lookup on (email, user_type); the row lock keeps
+            # concurrent guesses from slipping past the attempt limit
+            verification = pending.select_for_update().order_by('-created_at').first()
+            
+            if not verification:
+                return JsonResponse({'error': 'Invalid or expired verification code'}, status=400)
+            
+            if verification.locked:
+                response = JsonResponse({'error': 'Too many incorrect codes; please try again later'}, status=429)
+                response['Retry-After'] = str(verification.retry_after)
+                return response
+            
+            if not verification.is_valid():
+                return JsonResponse({'error': 'Verification code has expired'}, status=400)
+            
+            if not verification.check_code(code):
+                verification.record_failure()
+                return JsonResponse({'error': 'Invalid or expired verification code'}, status=400)
+            
+            if fields is None or verification.pk != signup.pk:
+                # A new code was issued between the two reads
+                return JsonResponse({'error': 'Invalid or expired verification code'}, status=400)
+
+            # Create the user account and mark the verification as used
+            return _create_verified_account(verification, user_type, fields)
             
     except Exception as e:
         return JsonResponse({'error': f'Server error: {str(e)}'}, status=500)
 
-@csrf_exempt
-def resend_verification_email(request: HttpRequest):
+@_async_csrf_exempt
+@ratelimit('resend-verification', ip='10/m', account='3/m')
+async def resend_verification_email(request: HttpRequest):
     """Resend verification email"""
     if request.method != 'POST':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
@@ -481,22 +444,21 @@ def resend_verification_email(request: HttpRequest):
     
     try:
         # Find existing verification
-        verification = EmailVerification.objects.filter(
+        verification = await EmailVerification.objects.filter(
             email=email,
             user_type=user_type,
             verified=False
-        ).first()
+        ).afirst()
         
         if not verification:
             return JsonResponse({'error': 'No pending verification found'}, status=404)
         
-        # Generate new code and update expiry
-        verification.code = EmailVerification.generate_code()
-        verification.expires_at = timezone.now() + timedelta(minutes=15)
-        verification.save()
+        # Generate new code and update expiry; wrong guesses still count until their window ends
+        code = verification.set_code()
+        await verification.asave(update_fields=['code_hash', 'attempts', 'attempts_reset_at', 'expires_at'])
         
         # Send email
-        if _send_verification_email(email, verification.code, user_type):
+        if await _asend_verification_email(email, code, user_type):
             return JsonResponse({
                 'success': True,
                 'message': 'Verification email resent',
@@ -508,119 +470,23 @@ def resend_verification_email(request: HttpRequest):
     except Exception as e:
         return JsonResponse({'error': f'Server error: {str(e)}'}, status=500)
 
-def _create_borrower_account(user_data, email):
-    """Helper function to create borrower account after email verification"""
-    try:
-        with transaction.atomic():
-            # Validate required fields
-            first_name = user_data.get("firstName", "").strip()
-            middle_name = user_data.get("middleName", "").strip()
-            last_name = user_data.get("lastName", "").strip()
-            phone = user_data.get("phone", "").strip()
-            dob_raw = user_data.get("dateOfBirth")
-            password = user_data.get("password")
-            
-            if not all([first_name, last_name, phone, dob_raw, password]):
-                return JsonResponse({"error": "Missing required fields"}, status=400)
-            
-            # Parse and validate date
-            dob = _parse_date(dob_raw)
-            
-            # Create borrower
-            b = Borrower(
-                first_name=first_name,
-                middle_name=middle_name,
-                last_name=last_name,
-                email=email,
-                phone=phone,
-                date_of_birth=dob,
-                email_verified=True  # Already verified via email
-            )
-            b.set_password(password)
-            b.save()
-            
-            # Create auth session
-            # Note: You might want to establish session here if needed
-            auth_token = _create_auth_token(b, 'borrower')
-            
-            return JsonResponse({
-                "id": b.id,
-                "firstName": b.first_name,
-                "middleName": b.middle_name,
-                "lastName": b.last_name,
-                "fullName": b.full_name,
-                "email": b.email,
-                "phone": b.phone,
-                "dateOfBirth": b.date_of_birth.isoformat(),
-                "createdAt": b.created_at.isoformat(),
-                "role": "borrower",
-                "token": auth_token,
-                "authenticated": True,
-                "email_verified": True
-            }, status=201)
-            
-    except Exception as e:
-        return JsonResponse({"error": f"Failed to create account: {str(e)}"}, status=500)
+def _create_verified_account(verification, user_type, fields):
+    """Create the account from the hashed signup data, consuming the verification in the same transaction"""
+    def consume_verification():
+        verification.verified = True
+        verification.save(update_fields=['verified'])
 
-def _create_investor_account(user_data, email):
-    """Helper function to create investor account after email verification"""
     try:
-        with transaction.atomic():
-            # Validate required fields
-            full_name = user_data.get("fullName", "").strip()
-            dob_raw = user_data.get("dateOfBirth")
-            phone = user_data.get("phone", "").strip()
-            ssn = user_data.get("ssn", "").strip()
-            address1 = user_data.get("address1", "").strip()
-            address2 = user_data.get("address2", "").strip()
-            city = user_data.get("city", "").strip()
-            state = user_data.get("state", "").strip()
-            zip_code = user_data.get("zip", "").strip()
-            country = user_data.get("country", "United States").strip()
-            password = user_data.get("password")
-            
-            if not all([full_name, dob_raw, phone, ssn, address1, city, state, zip_code, password]):
-                return JsonResponse({"error": "Missing required fields"}, status=400)
-            
-            # Parse and validate date
-            dob = _parse_date(dob_raw)
-            
-            # Create investor
-            i = Investor(
-                full_name=full_name,
-                email=email,
-                date_of_birth=dob,
-                phone=phone,
-                ssn=ssn,
-                address1=address1,
-                address2=address2,
-                city=city,
-                state=state,
-                zip_code=zip_code,
-                country=country,
-                email_verified=True  # Already verified via email
-            )
-            i.set_password(password)
-            i.save()
-            
-            # Create auth session
-            auth_token = _create_auth_token(i, 'investor')
-            
-            return JsonResponse({
-                "id": i.id,
-                "fullName": i.full_name,
-                "email": i.email,
-                "dateOfBirth": i.date_of_birth.isoformat(),
-                "createdAt": i.created_at.isoformat(),
-                "role": "investor",
-                "token": auth_token,
-                "authenticated": True,
-                "email_verified": True
-            }, status=201)
-            
+        user, auth_token = create_account(user_type, fields, email_verified=True, before_commit=consume_verification)
+    except IntegrityError:
+        return JsonResponse({"error": "Email already registered"}, status=409)
     except Exception as e:
         return JsonResponse({"error": f"Failed to create account: {str(e)}"}, status=500)
 
+    payload = account_payload(user, user_type, auth_token)
+    payload["email_verified"] = True
+    return JsonResponse(payload, status=201)
+
 @csrf_exempt
 def investor_signup(request: HttpRequest):
     if request.method != "POST":
@@ -630,115 +496,24 @@ def investor_signup(request: HttpRequest):
     except json.JSONDecodeError:
         return JsonResponse({"error": "Invalid JSON"}, status=400)
 
-    missing = REQUIRED_INVESTOR_FIELDS - set(data.keys())
-    if missing:
-        return JsonResponse({"error": f"Missing fields: {', '.join(sorted(missing))}"}, status=400)
-
-    # Extract and validate fields
-    full_name = data.get("fullName", "").strip()
-    email = data.get("email", "").lower().strip()
-    dob_raw = data.get("dateOfBirth")
-    phone = data.get("phone", "").strip()
-    ssn = data.get("ssn", "").strip()
-    address1 = data.get("address1", "").strip()
-    address2 = data.get("address2", "").strip()
-    city = data.get("city", "").strip()
-    state = data.get("state", "").strip()
-    zip_code = data.get("zip", "").strip()
-    country = data.get("country", "United States").strip()
-    password = data.get("password")
-
-    # Validation
-    if not full_name:
-        return JsonResponse({"error": "Full name required"}, status=400)
-    # Require first and last name and validate characters
-    name_parts = [p for p in full_name.split() if p]
-    if len(name_parts) < 2:
-        return JsonResponse({"error": "Please enter your full name (first and last)"}, status=400)
-    import re
-    if not re.fullmatch(r"[A-Za-zÀ-ÖØ-öø-ÿ'\- ]{2,255}", full_name):
-        return JsonResponse({"error": "Name contains invalid characters"}, status=400)
-    if not email or "@" not in email:
-        return JsonResponse({"error": "Valid email required"}, status=400)
-    if not password or len(password) < 8:
-        return JsonResponse({"error": "Password must be at least 8 characters"}, status=400)
-    if not phone:
-        return JsonResponse({"error": "Phone number required"}, status=400)
-    if not ssn:
-        return JsonResponse({"error": "SSN required"}, status=400)
-    if not address1:
-        return JsonResponse({"error": "Address required"}, status=400)
-    if not city:
-        return JsonResponse({"error": "City required"}, status=400)
-    if not state:
-        return JsonResponse({"error": "State required"}, status=400)
-    if not zip_code:
-        return JsonResponse({"error": "ZIP code required"}, status=400)
-
     try:
-        dob = _parse_date(dob_raw)
-    except ValidationError as e:
+        fields = clean_signup('investor', data)
+    except SignupError as e:
         return JsonResponse({"error": str(e)}, status=400)
-    # Ensure age >= 18
-    today = timezone.now().date()
-    try:
-        eighteenth_birthday = dob.replace(year=dob.year + 18)
-    except ValueError:
-        from datetime import timedelta
-        eighteenth_birthday = (dob - timedelta(days=1)).replace(year=dob.year + 18)
-    if eighteenth_birthday > today:
-        return JsonResponse({"error": "You must be at least 18 years old"}, status=400)
 
+    # Account, token and session in one transaction (auto-login)
     try:
-        with transaction.atomic():  # Ensure database transaction
-            i = Investor(
-                full_name=full_name,
-                email=email,
-                date_of_birth=dob,
-                phone=phone,
-                ssn=ssn,
-                address1=address1,
-                address2=address2,
-                city=city,
-                state=state,
-                zip_code=zip_code,
-                country=country
-            )
-            i.set_password(password)
-            i.save()
-            
-            # Verify the save by querying back
-            saved_investor = Investor.objects.get(id=i.id)
-            
+        user, auth_token = create_account('investor', fields, request=request)
     except IntegrityError as e:
         return JsonResponse({"error": "Email already registered"}, status=409)
     except Exception as e:
         return JsonResponse({"error": f"Database error: {str(e)}"}, status=500)
 
-    # Auto-login newly registered investor: establish session and create token
-    try:
-        request.session['investor_id'] = i.id
-        request.session['role'] = 'investor'
-        if 'borrower_id' in request.session:
-            del request.session['borrower_id']
-        request.session.save()
-        auth_token = _create_auth_token(i, 'investor')
-    except Exception:
-        auth_token = None
+    return JsonResponse(account_payload(user, 'investor', auth_token), status=201)
 
-    return JsonResponse({
-        "id": i.id,
-        "fullName": i.full_name,
-        "email": i.email,
-        "dateOfBirth": i.date_of_birth.isoformat(),
-        "createdAt": i.created_at.isoformat(),
-        "role": "investor",
-        "token": auth_token,
-        "authenticated": True,
-    }, status=201)
-
-@csrf_exempt
-def investor_login(request: HttpRequest):
+@_async_csrf_exempt
+@ratelimit('login', ip='30/m', account='10/m')
+async def investor_login(request: HttpRequest):
     if request.method != 'POST':
         return JsonResponse({'error':'Method not allowed'}, status=405)
     try:
@@ -753,23 +528,18 @@ def investor_login(request: HttpRequest):
         return JsonResponse({'error':'Email and password required'}, status=400)
     
     try:
-        i = Investor.objects.get(email=email)
+        i = await Investor.objects.aget(email=email)
     except Investor.DoesNotExist:
         return JsonResponse({'error':'Invalid credentials'}, status=401)
     
-    if not check_password(password, i.password_hash):
+    try:
+        password_ok = await acheck_password(i, password)
+    except HasherBusy:
+        return _login_busy_response()
+    if not password_ok:
         return JsonResponse({'error':'Invalid credentials'}, status=401)
     
-    # Establish session (for same-origin requests)
-    request.session['investor_id'] = i.id
-    request.session['role'] = 'investor'
-    # Clear borrower session data if it exists
-    if 'borrower_id' in request.session:
-        del request.session['borrower_id']
-    request.session.save()  # Force save the session
-    
-    # Create auth token (for cross-origin requests)
-    auth_token = _create_auth_token(i, 'investor')
+    auth_token = await _astart_login_session(request, i, 'investor')
     
     response = JsonResponse({
         'id': i.id,
@@ -799,6 +569,11 @@ def _require_investor_auth(request):
     
     return user, None
 
+# Auth helpers touch the session store and token table synchronously; async
+# views call them through these wrappers.
+_arequire_investor_auth = sync_to_async(_require_investor_auth)
+_astart_login_session = sync_to_async(_start_login_session)
+
 def _safe_decimal(value, default=None):
     """Safely convert value to Decimal, return default if invalid"""
     if value is None or value == '':
@@ -966,6 +741,7 @@ def create_pool(request: HttpRequest):
     other_property_loans = _safe_decimal(data.get('otherPropertyLoans'))
     credit_card_debt = _safe_decimal(data.get('creditCardDebt'))
     monthly_debt_payments = _safe_decimal(data.get('monthlyDebtPayments'))
+    monthly_income = _safe_decimal(data.get('monthlyIncome'))
     
     # Handle liabilities array
     liabilities = data.get('liabilities', [])
@@ -983,54 +759,57 @@ def create_pool(request: HttpRequest):
                 processed_liabilities.append(processed_liability)
     
     try:
-        pool = Pool.objects.create(
-            borrower=borrower,
-            pool_type=pool_type,
-            # Personal information
-            first_name=first_name,
-            middle_name=middle_name,
-            last_name=last_name,
-            email=email,
-            phone=phone,
-            date_of_birth=date_of_birth,
-            prior_first_name=prior_first_name,
-            prior_middle_name=prior_middle_name,
-            prior_last_name=prior_last_name,
-            ssn=ssn,
-            fico_score=fico_score,
-            # Mailing address
-            address_line_1=address_line_1,
-            address_line_2=address_line_2,
-            mailing_city=mailing_city,
-            mailing_state=mailing_state,
-            mailing_zip_code=mailing_zip_code,
-            # Property information
-            address_line=address_line,
-            city=city,
-            state=state,
-            zip_code=zip_code,
-            primary_address_choice=primary_address_choice,
-            percent_owned=percent_owned,
-            co_owner=co_owner,
-            co_owners=co_owners,
-            property_value=property_value,
-            property_link=property_link_single,
-            property_links=property_links,
-            mortgage_balance=mortgage_balance,
-            existing_loans=existing_loans,
-            amount=amount,
-            roi_rate=roi_rate,
-            loan_type=loan_type,
-            term=term,
-            term_months=term_months,
-            is_custom_term=is_custom_term,
-            custom_term_months=custom_term_months,
-            other_property_loans=other_property_loans,
-            credit_card_debt=credit_card_debt,
-            monthly_debt_payments=monthly_debt_payments,
-            liabilities=processed_liabilities,
-            status='active'  # Set as active when created
-        )
+        with transaction.atomic():  # the pool and the child rows mirroring its lists (signals.py)
+            pool = Pool.objects.create(
+                borrower=borrower,
+                pool_type=pool_type,
+                # Personal information
+                first_name=first_name,
+                middle_name=middle_name,
+                last_name=last_name,
+                email=email,
+                phone=phone,
+                date_of_birth=date_of_birth,
+                prior_first_name=prior_first_name,
+                prior_middle_name=prior_middle_name,
+                prior_last_name=prior_last_name,
+                ssn=ssn,
+                fico_score=fico_score,
+                # Mailing address
+                address_line_1=address_line_1,
+                address_line_2=address_line_2,
+                mailing_city=mailing_city,
+                mailing_state=mailing_state,
+                mailing_zip_code=mailing_zip_code,
+                # Property information
+                address_line=address_line,
+                city=city,
+                state=state,
+                zip_code=zip_code,
+                primary_address_choice=primary_address_choice,
+                percent_owned=percent_owned,
+                co_owner=co_owner,
+                co_owners=co_owners,
+                property_value=property_value,
+                property_link=property_link_single,
+                property_links=property_links,
+                mortgage_balance=mortgage_balance,
+                existing_loans=existing_loans,
+                amount=amount,
+                roi_rate=roi_rate,
+                loan_type=loan_type,
+                term=term,
+                term_months=term_months,
+                is_custom_term=is_custom_term,
+                custom_term_months=custom_term_months,
+                other_property_loans=other_property_loans,
+                credit_card_debt=credit_card_debt,
+                monthly_debt_payments=monthly_debt_payments,
+                liabilities=processed_liabilities,
+                monthly_income=monthly_income,
+                status='active'  # Set as active when created
+            )
+            underwrite_pool(pool)
         
         return JsonResponse({
             'id': pool.id,
@@ -1056,24 +835,14 @@ def get_pools(request: HttpRequest):
     if auth_error:
         return auth_error
     
-    pools = Pool.objects.filter(borrower=borrower).order_by('-created_at')
-    
-    pools_data = []
-    for pool in pools:
-        pools_data.append({
-            'id': pool.id,
-            'poolType': pool.pool_type,
-            'amount': str(pool.amount),
-            'roiRate': str(pool.roi_rate),
-            'term': pool.term,
-            'termMonths': pool.term_months,
-            'status': pool.status,
-            'fundingProgress': pool.funding_progress,
-            'createdAt': pool.created_at.isoformat(),
-            'address': f"{pool.address_line}, {pool.city}, {pool.state} {pool.zip_code}",
-            'propertyValue': str(pool.property_value) if pool.property_value else None,
-            'mortgageBalance': str(pool.mortgage_balance) if pool.mortgage_balance else None,
-        })
+    try:
+        names = POOL.names('borrower', request.GET.get('fields'), POOL_LIST)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    pools = POOL.prepare(Pool.objects.filter(borrower=borrower), names).order_by('-created_at')
+    render = POOL.renderer(names)
+    pools_data = photo_urls([render(pool) for pool in pools])
     
     return JsonResponse({'pools': pools_data}, status=200)
 
@@ -1088,80 +857,157 @@ def get_pool_detail(request: HttpRequest, pool_id: int):
         return auth_error
     
     try:
-        pool = Pool.objects.get(id=pool_id, borrower=borrower)
+        names = POOL.names('borrower', request.GET.get('fields'), POOL_DETAIL)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    try:
+        pool = POOL.prepare(Pool.objects.filter(borrower=borrower), names).get(id=pool_id)
     except Pool.DoesNotExist:
         return JsonResponse({'error': 'Pool not found'}, status=404)
     
-    return JsonResponse({
-        'id': pool.id,
-        'poolType': pool.pool_type,
-        'status': pool.status,
-        'amount': str(pool.amount),
-        'roiRate': str(pool.roi_rate),
-        'term': pool.term,
-        'termMonths': pool.term_months,
-        'customTermMonths': pool.custom_term_months,
-        'fundingProgress': pool.funding_progress,
-        'createdAt': pool.created_at.isoformat(),
-        'updatedAt': pool.updated_at.isoformat(),
-        
-        # Property details
-        'addressLine': pool.address_line,
-        'city': pool.city,
-        'state': pool.state,
-        'zipCode': pool.zip_code,
-        'percentOwned': str(pool.percent_owned),
-        'coOwner': pool.co_owner,
-        'propertyValue': str(pool.property_value) if pool.property_value else None,
-        'propertyLink': pool.property_link,
-        'mortgageBalance': str(pool.mortgage_balance) if pool.mortgage_balance else None,
-        
-        # Liability information
-        'otherPropertyLoans': str(pool.other_property_loans) if pool.other_property_loans else None,
-        'creditCardDebt': str(pool.credit_card_debt) if pool.credit_card_debt else None,
-        'monthlyDebtPayments': str(pool.monthly_debt_payments) if pool.monthly_debt_payments else None,
-        
-        # Documents
-        'homeInsuranceDoc': pool.home_insurance_doc,
-        'taxReturnDoc': pool.tax_return_doc,
-        'appraisalDoc': pool.appraisal_doc,
-        'propertyPhotos': pool.property_photos,
-    }, status=200)
+    return JsonResponse(photo_urls([POOL.renderer(names)(pool)])[0], status=200)
 
-def get_investment_opportunities(request: HttpRequest):
+@replica_reads
+async def get_investment_opportunities(request: HttpRequest):
     """Get all active pools for investors to browse"""
     if request.method != 'GET':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
     
     # Check authentication
-    investor, auth_error = _require_investor_auth(request)
+    investor, auth_error = await _arequire_investor_auth(request)
     if auth_error:
         return auth_error
     
-    # Get all active pools from all borrowers
-    pools = Pool.objects.filter(status='active').order_by('-created_at')
+    # Get all active pools from all borrowers, optionally capped on debt and
+    # underwriting metrics (?maxLiabilities=, ?maxLtv= etc.)
+    try:
+        names = POOL.names('investor', request.GET.get('fields'), OPPORTUNITY)
+        pools = POOL.prepare(Pool.objects.filter(status='active'), names).order_by('-created_at')
+        pools = filter_by_metrics(filter_by_risk(pools, request.GET), request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
     
-    pools_data = []
-    for pool in pools:
-        pools_data.append({
-            'id': pool.id,
-            'poolType': pool.pool_type,
-            'amount': str(pool.amount),
-            'roiRate': str(pool.roi_rate),
-            'term': pool.term,
-            'termMonths': pool.term_months,
-            'status': pool.status,
-            'fundingProgress': pool.funding_progress,
-            'createdAt': pool.created_at.isoformat(),
-            'address': f"{pool.address_line}, {pool.city}, {pool.state} {pool.zip_code}",
-            'propertyValue': str(pool.property_value) if pool.property_value else None,
-            'mortgageBalance': str(pool.mortgage_balance) if pool.mortgage_balance else None,
-            'borrowerName': pool.borrower.full_name,  # Add borrower info for investors
-            'percentOwned': str(pool.percent_owned),
-        })
+    render = POOL.renderer(names)
+    pools_data = await aphoto_urls([render(pool) async for pool in pools])
     
     return JsonResponse({'pools': pools_data}, status=200)
 
+PAGE_SIZE = 20
+PAGE_SIZE_MAX = 100
+MAP_LIMIT = 200
+MAP_LIMIT_MAX = 1000
+
+def _page_params(request):
+    """(page, page_size) from ?page=&pageSize=; raises ValueError"""
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        page_size = min(max(int(request.GET.get('pageSize', PAGE_SIZE)), 1), PAGE_SIZE_MAX)
+    except ValueError:
+        raise ValueError('page and pageSize must be integers')
+    return page, page_size
+
+def _opportunities(pool_ids, names, extra=None):
+    """The active pools in pool_ids rendered with names, in that order.
+
+    extra: {pool id: fields to add to its payload}"""
+    pools = POOL.prepare(Pool.objects.filter(status='active'), names).in_bulk(pool_ids)
+    render = POOL.renderer(names)
+    pools_data = [
+        {**render(pools[pool_id]), **(extra or {}).get(pool_id, {})}
+        for pool_id in pool_ids
+        if pool_id in pools  # else deleted or taken off the market since the match
+    ]
+    return photo_urls(pools_data)
+
+def search_investment_opportunities(request: HttpRequest):
+    """Search active pools by address, best match first (see search.py).
+
+    GET /api/investor/pools/search?q=austin tx&page=1&pageSize=20
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    investor, auth_error = _require_investor_auth(request)
+    if auth_error:
+        return auth_error
+
+    query = request.GET.get('q', '')
+    if not query_words(query):
+        return JsonResponse({'error': 'q is required'}, status=400)
+    try:
+        page, page_size = _page_params(request)
+        names = POOL.names('investor', request.GET.get('fields'), OPPORTUNITY)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    # One extra match tells whether there is another page
+    matches = search_pools(query, page_size + 1, (page - 1) * page_size)
+    has_more = len(matches) > page_size
+    matches = matches[:page_size]
+    pools_data = _opportunities([pool_id for pool_id, _ in matches], names,
+                                {pool_id: {'rank': round(rank, 4)} for pool_id, rank in matches})
+
+    return JsonResponse({'pools': pools_data, 'page': page, 'pageSize': page_size, 'hasMore': has_more}, status=200)
+
+def get_nearby_opportunities(request: HttpRequest):
+    """Active pools within a radius, nearest first (see geo.py).
+
+    GET /api/investor/pools/nearby?lat=30.27&lon=-97.74&radiusKm=25&page=1&pageSize=20
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    investor, auth_error = _require_investor_auth(request)
+    if auth_error:
+        return auth_error
+
+    try:
+        page, page_size = _page_params(request)
+        names = POOL.names('investor', request.GET.get('fields'), OPPORTUNITY)
+        matches = nearby(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    start = (page - 1) * page_size
+    page_matches = matches[start:start + page_size]
+    pools_data = _opportunities([pool_id for pool_id, _ in page_matches], names,
+                                {pool_id: {'distanceKm': km} for pool_id, km in page_matches})
+
+    return JsonResponse({
+        'pools': pools_data,
+        'count': len(matches),
+        'page': page,
+        'pageSize': page_size,
+        'hasMore': start + page_size < len(matches),
+    }, status=200)
+
+def get_map_opportunities(request: HttpRequest):
+    """Active pools inside a map viewport, newest first (see geo.py).
+
+    GET /api/investor/pools/map?south=30.1&west=-97.9&north=30.5&east=-97.5&limit=200
+    count is every pool in the box; at most limit of them are returned.
+    """
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    investor, auth_error = _require_investor_auth(request)
+    if auth_error:
+        return auth_error
+
+    try:
+        limit = min(max(int(request.GET.get('limit', MAP_LIMIT)), 1), MAP_LIMIT_MAX)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    try:
+        names = POOL.names('investor', request.GET.get('fields'), OPPORTUNITY)
+        pool_ids = in_box(request.GET)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    return JsonResponse({'pools': _opportunities(pool_ids[:limit], names), 'count': len(pool_ids)}, status=200)
+
+@replica_reads
 def get_investment_pool_detail(request: HttpRequest, pool_id: int):
     """Get detailed information for a specific investment opportunity"""
     if request.method != 'GET':
@@ -1172,53 +1018,21 @@ def get_investment_pool_detail(request: HttpRequest, pool_id: int):
     if auth_error:
         return auth_error
     
+    try:
+        names = POOL.names('investor', request.GET.get('fields'), OPPORTUNITY_DETAIL)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
     try:
         # Investors can view any active pool, not just their own
-        pool = Pool.objects.get(id=pool_id, status='active')
+        pool = POOL.prepare(Pool.objects.filter(status='active'), names).get(id=pool_id)
     except Pool.DoesNotExist:
         return JsonResponse({'error': 'Investment opportunity not found'}, status=404)
     
-    return JsonResponse({
-        'id': pool.id,
-        'poolType': pool.pool_type,
-        'status': pool.status,
-        'amount': str(pool.amount),
-        'roiRate': str(pool.roi_rate),
-        'term': pool.term,
-        'termMonths': pool.term_months,
-        'customTermMonths': pool.custom_term_months,
-        'fundingProgress': pool.funding_progress,
-        'createdAt': pool.created_at.isoformat(),
-        'updatedAt': pool.updated_at.isoformat(),
-        
-        # Property details
-        'addressLine': pool.address_line,
-        'city': pool.city,
-        'state': pool.state,
-        'zipCode': pool.zip_code,
-        'percentOwned': str(pool.percent_owned),
-        'coOwner': pool.co_owner,
-        'propertyValue': str(pool.property_value) if pool.property_value else None,
-        'propertyLink': pool.property_link,
-        'mortgageBalance': str(pool.mortgage_balance) if pool.mortgage_balance else None,
-        
-        # Borrower information (limited for privacy)
-        'borrowerName': pool.borrower.full_name,
-        'borrowerEmail': pool.borrower.email,  # Investors might need this for contact
-        
-        # Risk assessment information
-        'otherPropertyLoans': str(pool.other_property_loans) if pool.other_property_loans else None,
-        'creditCardDebt': str(pool.credit_card_debt) if pool.credit_card_debt else None,
-        'monthlyDebtPayments': str(pool.monthly_debt_payments) if pool.monthly_debt_payments else None,
-        
-        # Documents (if available)
-        'homeInsuranceDoc': pool.home_insurance_doc,
-        'taxReturnDoc': pool.tax_return_doc,
-        'appraisalDoc': pool.appraisal_doc,
-        'propertyPhotos': pool.property_photos,
-    }, status=200)
+    return JsonResponse(photo_urls([POOL.renderer(names)(pool)])[0], status=200)
 
 @csrf_exempt
+@pins_primary
 def invest_in_pool(request: HttpRequest, pool_id: int):
     """Allow an investor to invest in a pool"""
     if request.method != 'POST':
@@ -1230,7 +1044,7 @@ def invest_in_pool(request: HttpRequest, pool_id: int):
         return auth_error
     
     try:
-        pool = Pool.objects.get(id=pool_id, status='active')
+        pool = Pool.objects.defer(*JSON_FIELDS).get(id=pool_id, status='active')
     except Pool.DoesNotExist:
         return JsonResponse({'error': 'Pool not found or not available for investment'}, status=404)
     
@@ -1290,6 +1104,7 @@ def invest_in_pool(request: HttpRequest, pool_id: int):
     except Exception as e:
         return JsonResponse({'error': f'Investment failed: {str(e)}'}, status=500)
 
+@replica_reads
 def get_my_investments(request: HttpRequest):
     """Get all investments for the authenticated investor"""
     if request.method != 'GET':
@@ -1300,62 +1115,42 @@ def get_my_investments(request: HttpRequest):
     if auth_error:
         return auth_error
     
-    investments = Investment.objects.filter(investor=investor).select_related('pool', 'pool__borrower').order_by('-invested_at')
-    
-    investments_data = []
-    for investment in investments:
-        pool = investment.pool
-        investments_data.append({
-            'id': investment.id,
-            'amount': str(investment.amount),
-            'status': investment.status,
-            'investedAt': investment.invested_at.isoformat(),
-            'pool': {
-                'id': pool.id,
-                'poolType': pool.pool_type,
-                'status': pool.status,
-                'amount': str(pool.amount),
-                'roiRate': str(pool.roi_rate),
-                'term': pool.term,
-                'termMonths': pool.term_months,
-                'createdAt': pool.created_at.isoformat(),
-                'addressLine': pool.address_line,
-                'city': pool.city,
-                'state': pool.state,
-                'zipCode': pool.zip_code,
-                'percentOwned': str(pool.percent_owned),
-                'coOwner': pool.co_owner,
-                'propertyValue': str(pool.property_value) if pool.property_value else None,
-                'propertyLink': pool.property_link,
-                'mortgageBalance': str(pool.mortgage_balance) if pool.mortgage_balance else None,
-                'borrowerName': pool.borrower.full_name,
-                'borrowerEmail': pool.borrower.email
-            }
-        })
+    try:
+        names = INVESTMENT.names('investor', request.GET.get('fields'), MY_INVESTMENT)
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+
+    investments = INVESTMENT.prepare(Investment.objects.filter(investor=investor), names).order_by('-invested_at')
+    render = INVESTMENT.renderer(names)
+    investments_data = [render(investment) for investment in investments]
     
     return JsonResponse({'investments': investments_data}, status=200)
 
 
-def get_investor_dashboard(request: HttpRequest):
+async def get_investor_dashboard(request: HttpRequest):
     """Get dashboard metrics for the authenticated investor"""
     if request.method != 'GET':
         return JsonResponse({'error': 'Method not allowed'}, status=405)
     
     # Check authentication
-    investor, auth_error = _require_investor_auth(request)
+    investor, auth_error = await _arequire_investor_auth(request)
     if auth_error:
         return auth_error
     
-    # Get all investments for this investor
-    investments = Investment.objects.filter(investor=investor).select_related('pool')
+    # Get all investments for this investor (one query, reused for every metric)
+    investments = [
+        inv async for inv in Investment.objects.filter(investor=investor).select_related('pool')
+        .defer(*(f'pool__{field}' for field in JSON_FIELDS))
+    ]
+    active_investments = [inv for inv in investments if inv.status == 'active']
     
     # Calculate metrics
     total_invested = sum(investment.amount for investment in investments)
-    active_pools_count = investments.filter(status='active').count()
+    active_pools_count = len(active_investments)
     
     # Calculate ROI (simplified - this would be more complex in real scenarios)
     # For now, we'll use the weighted average of pool ROI rates
-    if investments.exists():
+    if investments:
         total_investment_amount = sum(inv.amount for inv in investments)
         weighted_roi = sum(inv.amount * inv.pool.roi_rate for inv in investments) / total_investment_amount if total_investment_amount > 0 else 0
     else:
@@ -1363,18 +1158,16 @@ def get_investor_dashboard(request: HttpRequest):
     
     # Calculate pending payouts (simplified - would need actual payout schedule)
     # For now, we'll calculate expected returns from active investments
-    active_investments = investments.filter(status='active')
     pending_payout_amount = 0
     next_payout_date = None
     
-    if active_investments.exists():
+    if active_investments:
         # Calculate expected returns (principal + interest)
         for investment in active_investments:
             expected_return = investment.amount * (1 + investment.pool.roi_rate / 100)
             pending_payout_amount += expected_return
         
         # For demo purposes, set next payout date as next month
-        from datetime import datetime, timedelta
         next_payout_date = (datetime.now() + timedelta(days=30)).strftime('%B %d')
     
     dashboard_data = {
@@ -1390,10 +1183,96 @@ def get_investor_dashboard(request: HttpRequest):
     return JsonResponse(dashboard_data, status=200)
 
 
+def get_marketplace_stats(request: HttpRequest):
+    """Marketplace totals: active pool volume, average ROI by pool type, funding by state (see stats.py)"""
+    if request.method != 'GET':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+    return JsonResponse(marketplace_stats(), status=200)
+
+def _pool_changes(data):
+    """{column: value} for the pool fields in an update_pool body; raises ValueError"""
+    changes = {}
+    # Simple string fields
+    if 'poolType' in data:
+        changes['pool_type'] = data['poolType']
+    if 'addressLine' in data:
+        changes['address_line'] = data['addressLine']
+    if 'city' in data:
+        changes['city'] = data['city']
+    if 'state' in data:
+        changes['state'] = data['state']
+    if 'zipCode' in data:
+        changes['zip_code'] = data['zipCode']
+    if 'coOwner' in data:
+        co_owner = data.get('coOwner')
+        changes['co_owner'] = (co_owner.strip() if isinstance(co_owner, str) else co_owner) or None
+    if 'propertyLink' in data:
+        prop_link = data.get('propertyLink')
+        changes['property_link'] = (prop_link.strip() if isinstance(prop_link, str) else prop_link) or None
+    if 'term' in data:
+        changes['term'] = data['term']
+        # If term is not custom, clear custom months unless explicitly provided
+        if changes['term'] != 'custom' and 'customTermMonths' not in data:
+            changes['custom_term_months'] = None
+    if 'customTermMonths' in data:
+        ctm = data['customTermMonths']
+        try:
+            changes['custom_term_months'] = int(ctm) if ctm is not None else None
+        except (TypeError, ValueError):
+            raise ValueError('customTermMonths must be a whole number of months')
+
+    # Decimal/numeric fields via helper
+    if 'percentOwned' in data:
+        val = _safe_decimal(data.get('percentOwned'))
+        if val is not None:
+            changes['percent_owned'] = val
+    if 'propertyValue' in data:
+        changes['property_value'] = _safe_decimal(data.get('propertyValue'))
+    if 'mortgageBalance' in data:
+        changes['mortgage_balance'] = _safe_decimal(data.get('mortgageBalance'))
+    if 'amount' in data:
+        amt = _safe_decimal(data.get('amount'))
+        if amt is not None:
+            changes['amount'] = amt
+    if 'roiRate' in data:
+        rate = _safe_decimal(data.get('roiRate'))
+        if rate is not None:
+            changes['roi_rate'] = rate
+    if 'otherPropertyLoans' in data:
+        changes['other_property_loans'] = _safe_decimal(data.get('otherPropertyLoans'))
+    if 'creditCardDebt' in data:
+        changes['credit_card_debt'] = _safe_decimal(data.get('creditCardDebt'))
+    if 'monthlyDebtPayments' in data:
+        changes['monthly_debt_payments'] = _safe_decimal(data.get('monthlyDebtPayments'))
+    if 'monthlyIncome' in data:
+        changes['monthly_income'] = _safe_decimal(data.get('monthlyIncome'))
+    return changes
+
+def _stored_value(column, value):
+    """value as the pool column will hold it (decimals to its places), to answer with"""
+    field = Pool._meta.get_field(column)
+    if isinstance(field, DecimalField) and value is not None:
+        return value.quantize(Decimal(1).scaleb(-field.decimal_places))
+    return value
+
+# What update_pool reads besides the columns it was sent: the version it checks, and
+# what the post-save signals read for marketplace stats, the search index and location
+UPDATE_POOL_READS = ('updated_at', *STATS_FIELDS, *INDEXED_FIELDS, *LOCATION_FIELDS)
+
 @csrf_exempt
 def update_pool(request: HttpRequest, pool_id: int):
-    """Update pool details for the authenticated borrower"""
-    if request.method != 'PUT':
+    """Update some of a pool's details for the authenticated borrower.
+
+    PUT or PATCH /api/pools/<id>/update with only the fields to change. Only the
+    columns whose values differ are written (save(update_fields=...)), so an
+    update can't overwrite anything else changed meanwhile, and only the derived
+    data those columns feed - stats, search index, location, underwriting - is
+    redone. With "updatedAt" (from an earlier response) in the body, the update
+    applies only if the pool hasn't changed since: 409 with the current
+    updatedAt otherwise. "Prefer: return=minimal" returns 204 without a body,
+    with the pool's new updatedAt in X-Updated-At, instead of the whole pool.
+    """
+    if request.method not in ('PUT', 'PATCH'):
         return JsonResponse({'error': 'Method not allowed'}, status=405)
 
     # Check authentication (supports Bearer token or session)
@@ -1405,99 +1284,50 @@ def update_pool(request: HttpRequest, pool_id: int):
         data = json.loads(request.body.decode('utf-8'))
     except json.JSONDecodeError:
         return JsonResponse({'error': 'Invalid JSON'}, status=400)
-
-    # Get pool and verify ownership
     try:
-        pool = Pool.objects.get(id=pool_id, borrower=borrower)
-    except Pool.DoesNotExist:
-        return JsonResponse({'error': 'Pool not found'}, status=404)
+        names = POOL.names('borrower', request.GET.get('fields'), POOL_UPDATED)
+        changes = _pool_changes(data)
+        expected = None
+        if data.get('updatedAt'):
+            expected = parse_datetime(str(data['updatedAt']))
+            if expected is None or timezone.is_naive(expected):
+                raise ValueError('updatedAt must be a timestamp with a time zone, as the pool was returned')
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    minimal = 'return=minimal' in request.headers.get('Prefer', '')
 
     # Allow updates regardless of status for now (can restrict in future if needed)
 
-    # Map and validate fields
     try:
-        # Simple string fields
-        if 'poolType' in data:
-            pool.pool_type = data['poolType']
-        if 'addressLine' in data:
-            pool.address_line = data['addressLine']
-        if 'city' in data:
-            pool.city = data['city']
-        if 'state' in data:
-            pool.state = data['state']
-        if 'zipCode' in data:
-            pool.zip_code = data['zipCode']
-        if 'coOwner' in data:
-            co_owner = data.get('coOwner')
-            pool.co_owner = (co_owner.strip() if isinstance(co_owner, str) else co_owner) or None
-        if 'propertyLink' in data:
-            prop_link = data.get('propertyLink')
-            pool.property_link = (prop_link.strip() if isinstance(prop_link, str) else prop_link) or None
-        if 'term' in data:
-            pool.term = data['term']
-            # If term is not custom, clear custom months unless explicitly provided
-            if pool.term != 'custom' and 'customTermMonths' not in data:
-                pool.custom_term_months = None
-        if 'customTermMonths' in data:
-            ctm = data['customTermMonths']
-            pool.custom_term_months = int(ctm) if ctm is not None else None
-
-        # Decimal/numeric fields via helper
-        if 'percentOwned' in data:
-            val = _safe_decimal(data.get('percentOwned'))
-            if val is not None:
-                pool.percent_owned = val
-        if 'propertyValue' in data:
-            pool.property_value = _safe_decimal(data.get('propertyValue'))
-        if 'mortgageBalance' in data:
-            pool.mortgage_balance = _safe_decimal(data.get('mortgageBalance'))
-        if 'amount' in data:
-            amt = _safe_decimal(data.get('amount'))
-            if amt is not None:
-                pool.amount = amt
-        if 'roiRate' in data:
-            rate = _safe_decimal(data.get('roiRate'))
-            if rate is not None:
-                pool.roi_rate = rate
-        if 'otherPropertyLoans' in data:
-            pool.other_property_loans = _safe_decimal(data.get('otherPropertyLoans'))
-        if 'creditCardDebt' in data:
-            pool.credit_card_debt = _safe_decimal(data.get('creditCardDebt'))
-        if 'monthlyDebtPayments' in data:
-            pool.monthly_debt_payments = _safe_decimal(data.get('monthlyDebtPayments'))
-
-        pool.save()
+        with transaction.atomic():
+            # Get pool and verify ownership: the row locked, and only the columns this needs
+            try:
+                pool = (Pool.objects.select_for_update().only(*changes, *UPDATE_POOL_READS)
+                        .get(id=pool_id, borrower=borrower))
+            except Pool.DoesNotExist:
+                return JsonResponse({'error': 'Pool not found'}, status=404)
+            if expected is not None and pool.updated_at != expected:
+                return JsonResponse({'error': 'Pool was changed since updatedAt',
+                                     'updatedAt': pool.updated_at.isoformat()}, status=409)
+
+            changed = [column for column, value in changes.items() if getattr(pool, column) != value]
+            for column in changed:
+                setattr(pool, column, _stored_value(column, changes[column]))
+            if changed:
+                pool.save(update_fields=[*changed, 'updated_at'])
+                if not set(INPUTS).isdisjoint(changed):
+                    underwrite_pool(pool)
+
+        if minimal:
+            # No body; the new updatedAt, for the next conditional update, comes as a header
+            response = HttpResponse(status=204)
+            response['Preference-Applied'] = 'return=minimal'
+            response['X-Updated-At'] = pool.updated_at.isoformat()
+            return response
 
         # Return updated pool details similar to get_pool_detail
-        return JsonResponse({
-            'id': pool.id,
-            'poolType': pool.pool_type,
-            'status': pool.status,
-            'amount': str(pool.amount),
-            'roiRate': str(pool.roi_rate),
-            'term': pool.term,
-            'termMonths': pool.term_months,
-            'customTermMonths': pool.custom_term_months,
-            'fundingProgress': pool.funding_progress,
-            'createdAt': pool.created_at.isoformat(),
-            'updatedAt': pool.updated_at.isoformat(),
-            'addressLine': pool.address_line,
-            'city': pool.city,
-            'state': pool.state,
-            'zipCode': pool.zip_code,
-            'percentOwned': str(pool.percent_owned),
-            'coOwner': pool.co_owner,
-            'propertyValue': str(pool.property_value) if pool.property_value else None,
-            'propertyLink': pool.property_link,
-            'mortgageBalance': str(pool.mortgage_balance) if pool.mortgage_balance else None,
-            'otherPropertyLoans': str(pool.other_property_loans) if pool.other_property_loans else None,
-            'creditCardDebt': str(pool.credit_card_debt) if pool.credit_card_debt else None,
-            'monthlyDebtPayments': str(pool.monthly_debt_payments) if pool.monthly_debt_payments else None,
-            'homeInsuranceDoc': pool.home_insurance_doc,
-            'taxReturnDoc': pool.tax_return_doc,
-            'appraisalDoc': pool.appraisal_doc,
-            'propertyPhotos': pool.property_photos,
-        }, status=200)
+        pool = POOL.prepare(Pool.objects.filter(pk=pool.pk), names).get()
+        return JsonResponse(photo_urls([POOL.renderer(names)(pool)])[0], status=200)
 
     except Exception as e:
         return JsonResponse({'error': str(e)}, status=500)
@@ -1537,4 +1367,116 @@ def delete_pool(request: HttpRequest, pool_id: int):
         return JsonResponse({'message': 'Pool deleted successfully'}, status=200)
         
     except Exception as e:
-        return JsonResponse({'error': str(e)}, status=500)
\ No newline at end of file
+        return JsonResponse({'error': str(e)}, status=500)
+
+@csrf_exempt
+def start_pool_upload(request: HttpRequest, pool_id: int):
+    """Open a chunked upload of a document or photo for one of the borrower's pools"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    borrower, auth_error = _require_borrower_auth(request)
+    if auth_error:
+        return auth_error
+
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+    try:
+        pool = Pool.objects.only('id').get(id=pool_id, borrower=borrower)
+    except Pool.DoesNotExist:
+        return JsonResponse({'error': 'Pool not found'}, status=404)
+
+    try:
+        upload = start_upload(pool, data.get('kind'), data.get('filename'), data.get('size'),
+                              data.get('contentType', ''), data.get('sha256', ''))
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse(upload_payload(upload), status=201)
+
+
+@csrf_exempt
+def pool_upload(request: HttpRequest, upload_id):
+    """GET: progress (the offset to resume from). PUT: the next chunk, streamed. DELETE: abort."""
+    if request.method not in ('GET', 'PUT', 'DELETE'):
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    borrower, auth_error = _require_borrower_auth(request)
+    if auth_error:
+        return auth_error
+
+    try:
+        upload = Upload.objects.select_related('stored_file').get(id=upload_id, pool__borrower=borrower)
+    except Upload.DoesNotExist:
+        return JsonResponse({'error': 'Upload not found'}, status=404)
+
+    if request.method == 'PUT':
+        try:
+            content_length = int(request.META.get('CONTENT_LENGTH') or 0)
+            # The request itself is the stream; reading request.body would buffer the whole chunk
+            write_chunk(upload, request, request.headers.get('Content-Range'), content_length)
+        except ValueError:
+            return JsonResponse({'error': 'Invalid Content-Length'}, status=400)
+        except UploadError as e:
+            return JsonResponse({'error': str(e), 'offset': upload.received}, status=e.status)
+    elif request.method == 'DELETE':
+        abort_upload(upload)
+    return JsonResponse(upload_payload(upload), status=200)
+
+
+@csrf_exempt
+def start_pool_direct_upload(request: HttpRequest, pool_id: int):
+    """Open an upload that the client PUTs straight to S3 with the returned URL and headers"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    borrower, auth_error = _require_borrower_auth(request)
+    if auth_error:
+        return auth_error
+
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+    except json.JSONDecodeError:
+        return JsonResponse({'error': 'Invalid JSON'}, status=400)
+
+    try:
+        pool = Pool.objects.only('id').get(id=pool_id, borrower=borrower)
+    except Pool.DoesNotExist:
+        return JsonResponse({'error': 'Pool not found'}, status=404)
+
+    try:
+        upload, url, headers = start_direct_upload(pool, data.get('kind'), data.get('filename'), data.get('size'),
+                                                   data.get('contentType', ''), data.get('sha256', ''))
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse({
+        **upload_payload(upload),
+        'uploadUrl': url,
+        'uploadMethod': 'PUT',
+        'uploadHeaders': headers,
+        'expiresIn': settings.UPLOAD_PRESIGN_SECONDS,
+    }, status=201)
+
+
+@csrf_exempt
+def complete_pool_upload(request: HttpRequest, upload_id):
+    """Once the client's PUT to storage has succeeded: verify the object and add it to the pool"""
+    if request.method != 'POST':
+        return JsonResponse({'error': 'Method not allowed'}, status=405)
+
+    borrower, auth_error = _require_borrower_auth(request)
+    if auth_error:
+        return auth_error
+
+    try:
+        upload = Upload.objects.select_related('stored_file').get(id=upload_id, pool__borrower=borrower)
+    except Upload.DoesNotExist:
+        return JsonResponse({'error': 'Upload not found'}, status=404)
+
+    try:
+        complete_direct_upload(upload)
+    except UploadError as e:
+        return JsonResponse({'error': str(e)}, status=e.status)
+    return JsonResponse(upload_payload(upload), status=200)
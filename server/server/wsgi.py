@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'server.settings')
 
 application = get_wsgi_application()
+
+# Load registered emails into this worker's Bloom filter while it starts serving
+from server.email_registry import start_filter_build  # noqa: E402
+
+start_filter_build()